@@ -0,0 +1,38 @@
+"""
+Runs benchmarks of runtime. Run from src/main/python:
+
+    python -m benchmarks --output results.json --baseline baseline.json
+"""
+import argparse
+import sys
+
+from . import runner, trees, networks_bench
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmarks of FNN runtime')
+    parser.add_argument('-k', '--filter', help='Run only benchmarks which names contain this string')
+    parser.add_argument('-o', '--output', help='Save results to JSON file')
+    parser.add_argument('-b', '--baseline', help='Compare results with JSON file saved by previous run')
+    parser.add_argument('-t', '--threshold', type=float, default=1.2, help='Ratio of times treated as regression')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Number of measurements')
+    parser.add_argument('--min-time', type=float, default=0.05, help='Minimal duration of measurement in seconds')
+    args = parser.parse_args(argv)
+
+    benchmarks = runner.discover([trees, networks_bench])
+    results = runner.run(benchmarks, args.filter, args.repeat, args.min_time)
+    if args.output is not None:
+        runner.save(results, args.output)
+    if args.baseline is not None:
+        regressions = runner.compare(results, runner.load(args.baseline), args.threshold)
+        for (name, key, before, after, ratio) in regressions:
+            print('Regression: {} [{}] {:.6f} ms -> {:.6f} ms ({:.2f}x)'.format(
+                name, key, before * 1000, after * 1000, ratio
+            ))
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
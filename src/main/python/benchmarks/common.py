@@ -0,0 +1,61 @@
+import torch
+
+from runtime.discrete import encode
+from runtime.modules.trainable import TrainableLayer, _build_tree
+from runtime.trees import stack, make_tuple
+from runtime.types import TypeSpec, LitSpec, ProdSpec, ExtSpec
+
+BATCH_SIZES = [1, 64, 1024]
+
+DEPTHS = [1, 3, 5]
+
+N = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        ExtSpec('N'),
+    ]),
+])
+
+DEFINED_TYPES = {'N': N}
+
+
+def random_tree(batch, depth):
+    """
+    Creates a tree of type N unwrapped to `depth` levels with random contents
+
+    :param batch: Number of rows
+    :param depth: Depth of type
+    :return: SumTree
+    """
+    def random_tensor(type_params, from_type, to_type, from_size, to_size):
+        return torch.rand(batch, to_size)
+
+    return _build_tree(DEFINED_TYPES, {}, N, N, depth * 2, random_tensor)
+
+
+def random_tuple(batch, depth, size=1):
+    return make_tuple([random_tree(batch, depth) for _ in range(size)])
+
+
+def nat(value):
+    """
+    Value of natural number for `runtime.discrete.encode`
+    """
+    result = (0, 2, None)
+    for _ in range(value):
+        result = (1, 2, (result,))
+    return result
+
+
+def random_nats(batch, depth):
+    """
+    Creates strict trees of natural numbers in [0, depth]
+
+    :return: SumTree
+    """
+    values = torch.randint(0, depth + 1, (batch,)).tolist()
+    return stack([encode(nat(value)) for value in values])
+
+
+def trainable(depth):
+    return TrainableLayer(DEFINED_TYPES, [ExtSpec('N')], ExtSpec('N'), depth, depth)
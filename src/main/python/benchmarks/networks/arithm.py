@@ -0,0 +1,132 @@
+# Networks for plusOne, plus and plusRequired from src/main/fnn/examples/arithm.fnn
+# Written in the format of PyTorchWriter, imports point to the runtime next to benchmarks
+
+import torch
+from runtime import trees
+from runtime import loss
+from runtime.modules import ConstantLayer, VariableLayer, AnonymousNetLayer, ConstructorLayer, GuardedLayer, \
+    ApplicationLayer, RecursiveLayer, TrainableLayer, ZeroLayer
+from runtime.data import DataPointer, DataBag
+from runtime.types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec
+from runtime.patterns import VarPattern, LitPattern, ConstructorPattern
+
+DEFINED_TYPES = {}
+TrainableLayer = TrainableLayer.bind_defined_types(DEFINED_TYPES)
+ZeroLayer = ZeroLayer.bind_defined_types(DEFINED_TYPES)
+
+# Defined Types
+
+N = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        ExtSpec('N'),
+    ]),
+])
+DEFINED_TYPES['N'] = N
+
+
+# Defined Nets
+Z_net = ConstantLayer(type_spec=N, position=0)
+
+S_net = ConstructorLayer(to_type=N, position=1)
+
+plusOne_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    TrainableLayer([ExtSpec('N')], ExtSpec('N'), to_depth=2),
+                    VariableLayer.Data(0),
+                ], call=[1], data=[1], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('N')),
+    pointer=DataPointer(0, 0)
+)
+
+plus_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        TrainableLayer([ExtSpec('N')], ExtSpec('N')),
+                        VariableLayer.Data(0),
+                    ], call=[1], data=[1], nets=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        TrainableLayer([ExtSpec('N')], ExtSpec('N'), to_depth=2),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                                ApplicationLayer(
+                                    operands=[
+                                        TrainableLayer([ExtSpec('N')], ExtSpec('N')),
+                                        VariableLayer.Data(1),
+                                    ], call=[1], data=[1], nets=[0]
+                                ),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[1], data=[1], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
+plusRequired_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                ]), 
+                VariableLayer.Data(0)
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[0, 1], data=[1], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
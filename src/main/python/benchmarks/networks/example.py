@@ -0,0 +1,54 @@
+# Network for src/main/fnn/examples/example.fnn, instantiated with Bool:
+#     @type if = Bool -> Bool -> Bool -> Bool;
+# Written in the format of PyTorchWriter, imports point to the runtime next to benchmarks
+
+import torch
+from runtime import trees
+from runtime import loss
+from runtime.modules import ConstantLayer, VariableLayer, AnonymousNetLayer, ConstructorLayer, GuardedLayer, \
+    ApplicationLayer, RecursiveLayer, TrainableLayer, ZeroLayer
+from runtime.data import DataPointer, DataBag
+from runtime.types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec
+from runtime.patterns import VarPattern, LitPattern, ConstructorPattern
+
+DEFINED_TYPES = {}
+TrainableLayer = TrainableLayer.bind_defined_types(DEFINED_TYPES)
+ZeroLayer = ZeroLayer.bind_defined_types(DEFINED_TYPES)
+
+# Defined Types
+
+Bool = TypeSpec(operands=[
+    LitSpec(),
+    LitSpec(),
+])
+DEFINED_TYPES['Bool'] = Bool
+
+
+# Defined Nets
+True_net = ConstantLayer(type_spec=Bool, position=0)
+
+False_net = ConstantLayer(type_spec=Bool, position=1)
+
+if_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                VarPattern(),
+                VarPattern(),
+            ]), 
+            VariableLayer.Data(0)
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(1),
+                VarPattern(),
+                VarPattern(),
+            ]), 
+            VariableLayer.Data(1)
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('Bool')),
+    pointer=DataPointer(0, 0)
+)
+
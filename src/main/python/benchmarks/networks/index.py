@@ -0,0 +1,243 @@
+# Networks for concat, singleton and reverse from src/main/fnn/examples/index.fnn
+# Written in the format of PyTorchWriter, imports point to the runtime next to benchmarks.
+# getRequired is tail recursive and getOrDefault uses it's results, they are left out
+
+import torch
+from runtime import trees
+from runtime import loss
+from runtime.modules import ConstantLayer, VariableLayer, AnonymousNetLayer, ConstructorLayer, GuardedLayer, \
+    ApplicationLayer, RecursiveLayer, TrainableLayer, ZeroLayer
+from runtime.data import DataPointer, DataBag
+from runtime.types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec
+from runtime.patterns import VarPattern, LitPattern, ConstructorPattern
+
+DEFINED_TYPES = {}
+TrainableLayer = TrainableLayer.bind_defined_types(DEFINED_TYPES)
+ZeroLayer = ZeroLayer.bind_defined_types(DEFINED_TYPES)
+
+# Defined Types
+
+List = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        VarSpec('a'),
+        ExtSpec('List', a=VarSpec('a')),
+    ]),
+])
+DEFINED_TYPES['List'] = List
+
+
+# Defined Nets
+Empty_net = ConstantLayer(type_spec=List, position=0)
+
+Cons_net = ConstructorLayer(to_type=List, position=1)
+
+concat_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        TrainableLayer([ExtSpec('List', a=VarSpec('a'))], ExtSpec('List', a=VarSpec('a'))),
+                        VariableLayer.Data(0),
+                    ], call=[1], data=[1], nets=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        TrainableLayer(
+                            [VarSpec('a'), ExtSpec('List', a=VarSpec('a'))], ExtSpec('List', a=VarSpec('a'))
+                        ),
+                        VariableLayer.Data(0),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(1),
+                                VariableLayer.Data(2),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('List', a=VarSpec('a'))),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('List', a=VarSpec('a'))), DataPointer(0, 0)
+)
+
+concatRequired_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                ]), 
+                VariableLayer.Data(0)
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(Cons_net),
+                        VariableLayer.Data(0),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(1),
+                                VariableLayer.Data(2),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('List', a=VarSpec('a'))),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('List', a=VarSpec('a'))), DataPointer(0, 0)
+)
+
+singleton_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    TrainableLayer([VarSpec('a')], ExtSpec('List', a=VarSpec('a')), to_depth=2),
+                    VariableLayer.Data(0),
+                ], call=[1], data=[1], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('List', a=VarSpec('a'))),
+    pointer=DataPointer(0, 0)
+)
+
+singletonRequired_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(Cons_net),
+                    VariableLayer.Data(0),
+                    VariableLayer.External(Empty_net),
+                ], call=[0, 1, 2], constants=[2], data=[1, 2], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('List', a=VarSpec('a'))),
+    pointer=DataPointer(0, 0)
+)
+
+reverse_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(Empty_net),
+                    ], call=[0], constants=[0], data=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(concat_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.External(Cons_net),
+                                VariableLayer.Data(0),
+                                VariableLayer.External(Empty_net),
+                            ], call=[0, 1, 2], constants=[2], data=[1, 2], nets=[0]
+                        ),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1], data=[1], nets=[0]
+                        ),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('List', a=VarSpec('a'))),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('List', a=VarSpec('a'))), DataPointer(0, 0)
+)
+
+reverseRequired_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(Empty_net),
+                    ], call=[0], constants=[0], data=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(concatRequired_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.External(Cons_net),
+                                VariableLayer.Data(0),
+                                VariableLayer.External(Empty_net),
+                            ], call=[0, 1, 2], constants=[2], data=[1, 2], nets=[0]
+                        ),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1], data=[1], nets=[0]
+                        ),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('List', a=VarSpec('a'))),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('List', a=VarSpec('a'))), DataPointer(0, 0)
+)
@@ -0,0 +1,411 @@
+# Networks for plus, mul, pow, reduce, prod, size, max and height from src/main/fnn/examples/recursive.fnn
+# Written in the format of PyTorchWriter, imports point to the runtime next to benchmarks.
+# sum is left out: it's nested @let with lambdas only renames it's arguments
+
+import torch
+from runtime import trees
+from runtime import loss
+from runtime.modules import ConstantLayer, VariableLayer, AnonymousNetLayer, ConstructorLayer, GuardedLayer, \
+    ApplicationLayer, RecursiveLayer, TrainableLayer, ZeroLayer
+from runtime.data import DataPointer, DataBag
+from runtime.types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec
+from runtime.patterns import VarPattern, LitPattern, ConstructorPattern
+
+DEFINED_TYPES = {}
+TrainableLayer = TrainableLayer.bind_defined_types(DEFINED_TYPES)
+ZeroLayer = ZeroLayer.bind_defined_types(DEFINED_TYPES)
+
+# Defined Types
+
+N = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        ExtSpec('N'),
+    ]),
+])
+DEFINED_TYPES['N'] = N
+
+List = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        VarSpec('a'),
+        ExtSpec('List', a=VarSpec('a')),
+    ]),
+])
+DEFINED_TYPES['List'] = List
+
+Tree = TypeSpec(operands=[
+    ProdSpec(operands=[
+        VarSpec('a'),
+    ]),
+    ProdSpec(operands=[
+        ExtSpec('Tree', a=VarSpec('a')),
+        ExtSpec('Tree', a=VarSpec('a')),
+    ]),
+])
+DEFINED_TYPES['Tree'] = Tree
+
+
+# Defined Nets
+Z_net = ConstantLayer(type_spec=N, position=0)
+
+S_net = ConstructorLayer(to_type=N, position=1)
+
+Nil_net = ConstantLayer(type_spec=List, position=0)
+
+Cons_net = ConstructorLayer(to_type=List, position=1)
+
+Leaf_net = ConstructorLayer(to_type=Tree, position=0)
+
+Node_net = ConstructorLayer(to_type=Tree, position=1)
+
+plus_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                ]), 
+                VariableLayer.Data(0)
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[0, 1], data=[1], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
+mul_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(Z_net),
+                    ], call=[0], constants=[0], data=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(plus_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                        VariableLayer.Data(1),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
+pow_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    LitPattern(0),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        VariableLayer.External(Z_net),
+                    ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(mul_net),
+                        VariableLayer.Data(0),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
+reduce_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    LitPattern(0),
+                ]), 
+                VariableLayer.Data(0)
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.Net(1),
+                        VariableLayer.Data(1),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Net(1),
+                                VariableLayer.Data(0),
+                                VariableLayer.Data(2),
+                            ], call=[0, 1, 2, 3], data=[2, 3], nets=[0, 1]
+                        ),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(VarSpec('b')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(VarSpec('b')), DataPointer(0, 0)
+)
+
+prod_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(reduce_net),
+                    VariableLayer.External(mul_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(S_net),
+                            VariableLayer.External(Z_net),
+                        ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                    ),
+                    VariableLayer.Data(0),
+                ], call=[0, 1, 2, 3], data=[2, 3], nets=[0, 1]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('N')),
+    pointer=DataPointer(0, 0)
+)
+
+size_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(0, operands=[
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        VariableLayer.External(Z_net),
+                    ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(plus_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                            ], call=[0, 1], data=[1], nets=[0]
+                        ),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1], data=[1], nets=[0]
+                        ),
+                    ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
+max_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    LitPattern(0),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(Z_net),
+                    ], call=[0], constants=[0], data=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                    LitPattern(0),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        VariableLayer.Data(0),
+                    ], call=[0, 1], data=[1], nets=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        VariableLayer.Data(0),
+                    ], call=[0, 1], data=[1], nets=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.Net(0),
+                                VariableLayer.Data(0),
+                                VariableLayer.Data(1),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[0, 1], data=[1], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
+
+height_net = RecursiveLayer(
+    GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(0, operands=[
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(Z_net),
+                    ], call=[0], constants=[0], data=[0]
+                )
+            ),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                ]), 
+                ApplicationLayer(
+                    operands=[
+                        VariableLayer.External(S_net),
+                        ApplicationLayer(
+                            operands=[
+                                VariableLayer.External(max_net),
+                                ApplicationLayer(
+                                    operands=[
+                                        VariableLayer.Net(0),
+                                        VariableLayer.Data(0),
+                                    ], call=[0, 1], data=[1], nets=[0]
+                                ),
+                                ApplicationLayer(
+                                    operands=[
+                                        VariableLayer.Net(0),
+                                        VariableLayer.Data(1),
+                                    ], call=[0, 1], data=[1], nets=[0]
+                                ),
+                            ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                        ),
+                    ], call=[0, 1], data=[1], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(ExtSpec('N')),
+        pointer=DataPointer(0, 1)
+    ), ZeroLayer(ExtSpec('N')), DataPointer(0, 0)
+)
@@ -0,0 +1,104 @@
+# Networks for permute and required from src/main/fnn/examples/tuple.fnn, the module is named tuples,
+# so it doesn't shadow the builtin
+# Written in the format of PyTorchWriter, imports point to the runtime next to benchmarks
+
+import torch
+from runtime import trees
+from runtime import loss
+from runtime.modules import ConstantLayer, VariableLayer, AnonymousNetLayer, ConstructorLayer, GuardedLayer, \
+    ApplicationLayer, RecursiveLayer, TrainableLayer, ZeroLayer
+from runtime.data import DataPointer, DataBag
+from runtime.types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec
+from runtime.patterns import VarPattern, LitPattern, ConstructorPattern
+
+DEFINED_TYPES = {}
+TrainableLayer = TrainableLayer.bind_defined_types(DEFINED_TYPES)
+ZeroLayer = ZeroLayer.bind_defined_types(DEFINED_TYPES)
+
+# Defined Types
+
+Bool = TypeSpec(operands=[
+    LitSpec(),
+    LitSpec(),
+])
+DEFINED_TYPES['Bool'] = Bool
+
+Tuple = TypeSpec(operands=[
+    ProdSpec(operands=[
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+        VarSpec('a'),
+    ]),
+])
+DEFINED_TYPES['Tuple'] = Tuple
+
+
+# Defined Nets
+False_net = ConstantLayer(type_spec=Bool, position=0)
+
+True_net = ConstantLayer(type_spec=Bool, position=1)
+
+MkTuple_net = ConstructorLayer(to_type=Tuple, position=0)
+
+permute_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    TrainableLayer([ExtSpec('Tuple', a=VarSpec('a'))], ExtSpec('Tuple', a=VarSpec('a'))),
+                    VariableLayer.Data(0),
+                ], call=[1], data=[1], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('Tuple', a=VarSpec('a'))),
+    pointer=DataPointer(0, 0)
+)
+
+required_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                    VarPattern(),
+                ]),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkTuple_net),
+                    VariableLayer.Data(8),
+                    VariableLayer.Data(9),
+                    VariableLayer.Data(5),
+                    VariableLayer.Data(6),
+                    VariableLayer.Data(2),
+                    VariableLayer.Data(3),
+                    VariableLayer.Data(1),
+                    VariableLayer.Data(5),
+                    VariableLayer.Data(0),
+                    VariableLayer.Data(4),
+                ], call=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10], data=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('Tuple', a=VarSpec('a'))),
+    pointer=DataPointer(0, 0)
+)
@@ -0,0 +1,419 @@
+# Networks for moves of the tape and transitions from src/main/fnn/examples/turing.fnn, instantiated with Alphabet
+# Written in the format of PyTorchWriter, imports point to the runtime next to benchmarks.
+# machine is left out: it's tail recursive inside @case, and results of recursive calls of TailRecursiveLayer
+# are None in cases of GuardedLayer
+
+import torch
+from runtime import trees
+from runtime import loss
+from runtime.modules import ConstantLayer, VariableLayer, AnonymousNetLayer, ConstructorLayer, GuardedLayer, \
+    ApplicationLayer, RecursiveLayer, TrainableLayer, ZeroLayer
+from runtime.data import DataPointer, DataBag
+from runtime.types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec
+from runtime.patterns import VarPattern, LitPattern, ConstructorPattern
+
+DEFINED_TYPES = {}
+TrainableLayer = TrainableLayer.bind_defined_types(DEFINED_TYPES)
+ZeroLayer = ZeroLayer.bind_defined_types(DEFINED_TYPES)
+
+# Defined Types
+
+LList = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        ExtSpec('LList', a=VarSpec('a')),
+        VarSpec('a'),
+    ]),
+])
+DEFINED_TYPES['LList'] = LList
+
+RList = TypeSpec(operands=[
+    ProdSpec(operands=[
+        VarSpec('a'),
+        ExtSpec('RList', a=VarSpec('a')),
+    ]),
+    LitSpec(),
+])
+DEFINED_TYPES['RList'] = RList
+
+Tape = TypeSpec(operands=[
+    ProdSpec(operands=[
+        ExtSpec('LList', a=VarSpec('a')),
+        VarSpec('a'),
+        ExtSpec('RList', a=VarSpec('a')),
+    ]),
+])
+DEFINED_TYPES['Tape'] = Tape
+
+EvalState = TypeSpec(operands=[
+    LitSpec(),
+    ProdSpec(operands=[
+        VarSpec('st'),
+    ]),
+])
+DEFINED_TYPES['EvalState'] = EvalState
+
+Move = TypeSpec(operands=[
+    LitSpec(),
+    LitSpec(),
+    LitSpec(),
+])
+DEFINED_TYPES['Move'] = Move
+
+TransRes = TypeSpec(operands=[
+    ProdSpec(operands=[
+        ExtSpec('EvalState', st=VarSpec('s')),
+        VarSpec('a'),
+        ExtSpec('Move'),
+    ]),
+])
+DEFINED_TYPES['TransRes'] = TransRes
+
+State = TypeSpec(operands=[
+    LitSpec(),
+])
+DEFINED_TYPES['State'] = State
+
+Alphabet = TypeSpec(operands=[
+    LitSpec(),
+    LitSpec(),
+    LitSpec(),
+])
+DEFINED_TYPES['Alphabet'] = Alphabet
+
+
+# Defined Nets
+LEmpty_net = ConstantLayer(type_spec=LList, position=0)
+
+LCons_net = ConstructorLayer(to_type=LList, position=1)
+
+RCons_net = ConstructorLayer(to_type=RList, position=0)
+
+REmpty_net = ConstantLayer(type_spec=RList, position=1)
+
+MkTape_net = ConstructorLayer(to_type=Tape, position=0)
+
+Stop_net = ConstantLayer(type_spec=EvalState, position=0)
+
+Continue_net = ConstructorLayer(to_type=EvalState, position=1)
+
+Left_net = ConstantLayer(type_spec=Move, position=0)
+
+Stay_net = ConstantLayer(type_spec=Move, position=1)
+
+Right_net = ConstantLayer(type_spec=Move, position=2)
+
+MkRes_net = ConstructorLayer(to_type=TransRes, position=0)
+
+Start_net = ConstantLayer(type_spec=State, position=0)
+
+Blank_net = ConstantLayer(type_spec=Alphabet, position=0)
+
+Zero_net = ConstantLayer(type_spec=Alphabet, position=1)
+
+One_net = ConstantLayer(type_spec=Alphabet, position=2)
+
+moveLeft_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                ConstructorPattern(0, operands=[
+                    LitPattern(0),
+                    VarPattern(),
+                    VarPattern(),
+                ]),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkTape_net),
+                    VariableLayer.External(LEmpty_net),
+                    VariableLayer.External(Blank_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(RCons_net),
+                            VariableLayer.Data(0),
+                            VariableLayer.Data(1),
+                        ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                    ),
+                ], call=[0, 1, 2, 3], constants=[1, 2], data=[1, 2, 3], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                ConstructorPattern(0, operands=[
+                    ConstructorPattern(1, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                    VarPattern(),
+                    VarPattern(),
+                ]),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkTape_net),
+                    VariableLayer.Data(0),
+                    VariableLayer.Data(1),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(RCons_net),
+                            VariableLayer.Data(2),
+                            VariableLayer.Data(3),
+                        ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                    ),
+                ], call=[0, 1, 2, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('Tape', a=ExtSpec('Alphabet'))),
+    pointer=DataPointer(0, 0)
+)
+
+moveRight_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    VarPattern(),
+                    LitPattern(1),
+                ]),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkTape_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(LCons_net),
+                            VariableLayer.Data(0),
+                            VariableLayer.Data(1),
+                        ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                    ),
+                    VariableLayer.External(Blank_net),
+                    VariableLayer.External(REmpty_net),
+                ], call=[0, 1, 2, 3], constants=[2, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                ConstructorPattern(0, operands=[
+                    VarPattern(),
+                    VarPattern(),
+                    ConstructorPattern(0, operands=[
+                        VarPattern(),
+                        VarPattern(),
+                    ]),
+                ]),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkTape_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(LCons_net),
+                            VariableLayer.Data(0),
+                            VariableLayer.Data(1),
+                        ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                    ),
+                    VariableLayer.Data(2),
+                    VariableLayer.Data(3),
+                ], call=[0, 1, 2, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('Tape', a=ExtSpec('Alphabet'))),
+    pointer=DataPointer(0, 0)
+)
+
+makeMove_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+                LitPattern(1),
+            ]), 
+            VariableLayer.Data(0)
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+                LitPattern(0),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(moveLeft_net),
+                    VariableLayer.Data(0),
+                ], call=[0, 1], data=[1], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                VarPattern(),
+                LitPattern(2),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(moveRight_net),
+                    VariableLayer.Data(0),
+                ], call=[0, 1], data=[1], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('Tape', a=ExtSpec('Alphabet'))),
+    pointer=DataPointer(0, 0)
+)
+
+transitionRequired_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                LitPattern(0),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkRes_net),
+                    VariableLayer.External(Stop_net),
+                    VariableLayer.External(Blank_net),
+                    VariableLayer.External(Stay_net),
+                ], call=[0, 1, 2, 3], constants=[1, 2, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                LitPattern(1),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkRes_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(Continue_net),
+                            VariableLayer.External(Start_net),
+                        ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                    ),
+                    VariableLayer.External(One_net),
+                    VariableLayer.External(Stay_net),
+                ], call=[0, 1, 2, 3], constants=[2, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                LitPattern(2),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkRes_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(Continue_net),
+                            VariableLayer.External(Start_net),
+                        ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                    ),
+                    VariableLayer.External(Zero_net),
+                    VariableLayer.External(Stay_net),
+                ], call=[0, 1, 2, 3], constants=[2, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('TransRes', s=ExtSpec('State'), a=ExtSpec('Alphabet'))),
+    pointer=DataPointer(0, 0)
+)
+
+transitionSimple_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                LitPattern(0),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkRes_net),
+                    VariableLayer.External(Stop_net),
+                    ApplicationLayer(
+                        operands=[
+                            TrainableLayer([ExtSpec('Alphabet')], ExtSpec('Alphabet')),
+                            VariableLayer.External(Blank_net),
+                        ], call=[1], constants=[1], data=[1], nets=[0]
+                    ),
+                    VariableLayer.External(Stay_net),
+                ], call=[0, 1, 2, 3], constants=[1, 3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                LitPattern(1),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkRes_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(Continue_net),
+                            VariableLayer.External(Start_net),
+                        ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                    ),
+                    ApplicationLayer(
+                        operands=[
+                            TrainableLayer([ExtSpec('Alphabet')], ExtSpec('Alphabet')),
+                            VariableLayer.External(Zero_net),
+                        ], call=[1], constants=[1], data=[1], nets=[0]
+                    ),
+                    VariableLayer.External(Right_net),
+                ], call=[0, 1, 2, 3], constants=[3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                LitPattern(2),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    VariableLayer.External(MkRes_net),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.External(Continue_net),
+                            VariableLayer.External(Start_net),
+                        ], call=[0, 1], constants=[1], data=[1], nets=[0]
+                    ),
+                    ApplicationLayer(
+                        operands=[
+                            TrainableLayer([ExtSpec('Alphabet')], ExtSpec('Alphabet')),
+                            VariableLayer.External(One_net),
+                        ], call=[1], constants=[1], data=[1], nets=[0]
+                    ),
+                    VariableLayer.External(Right_net),
+                ], call=[0, 1, 2, 3], constants=[3], data=[1, 2, 3], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('TransRes', s=ExtSpec('State'), a=ExtSpec('Alphabet'))),
+    pointer=DataPointer(0, 0)
+)
+
+transitionHard_net = GuardedLayer(
+    cases=[
+        GuardedLayer.Case(
+            ConstructorPattern(0, operands=[
+                LitPattern(0),
+                VarPattern(),
+            ]), 
+            ApplicationLayer(
+                operands=[
+                    TrainableLayer(
+                        [ExtSpec('Alphabet')], ExtSpec('TransRes', s=ExtSpec('State'), a=ExtSpec('Alphabet')),
+                        from_depth=2, to_depth=4
+                    ),
+                    VariableLayer.Data(0),
+                ], call=[1], data=[1], nets=[0]
+            )
+        ),
+    ],
+    mismatch_handler=ZeroLayer(ExtSpec('TransRes', s=ExtSpec('State'), a=ExtSpec('Alphabet'))),
+    pointer=DataPointer(0, 0)
+)
@@ -0,0 +1,73 @@
+"""
+End-to-end benchmarks of networks from src/main/fnn/examples. Results of forward calls are forced, so lazy
+children are measured too
+"""
+import torch
+
+from runtime.loss import StructuredLoss
+from runtime.trees import SumTree, make_tuple
+
+from .common import BATCH_SIZES, DEPTHS, random_nats
+from .networks import arithm, example, recursive
+
+
+class If:
+    params = [BATCH_SIZES]
+    param_names = ['batch']
+
+    def setup(self, batch):
+        values = [torch.eye(2)[torch.randint(0, 2, (batch,))] for _ in range(3)]
+        self.args = make_tuple([SumTree(value, [None, None]) for value in values])
+
+    def time_forward(self, batch):
+        example.if_net.call(self.args).force()
+
+
+class ArithmeticBenchmark:
+    params = [BATCH_SIZES, DEPTHS]
+    param_names = ['batch', 'depth']
+
+    def setup(self, batch, depth):
+        self.x = random_nats(batch, depth)
+        self.y = random_nats(batch, depth)
+        self.loss = StructuredLoss()
+
+
+class PlusRequired(ArithmeticBenchmark):
+
+    def time_forward(self, batch, depth):
+        arithm.plusRequired_net.call(self.x, self.y).force()
+
+
+class PlusOne(ArithmeticBenchmark):
+
+    def setup(self, batch, depth):
+        super().setup(batch, depth)
+        self.expected = arithm.S_net.call([self.x])
+
+    def time_forward(self, batch, depth):
+        arithm.plusOne_net.call([self.x]).force()
+
+    def time_backward(self, batch, depth):
+        arithm.plusOne_net.zero_grad()
+        self.loss(arithm.plusOne_net.call([self.x]), self.expected).backward()
+
+
+class Plus(ArithmeticBenchmark):
+
+    def setup(self, batch, depth):
+        super().setup(batch, depth)
+        self.expected = arithm.plusRequired_net.call(self.x, self.y)
+
+    def time_forward(self, batch, depth):
+        arithm.plus_net.call(self.x, self.y).force()
+
+    def time_backward(self, batch, depth):
+        arithm.plus_net.zero_grad()
+        self.loss(arithm.plus_net.call(self.x, self.y), self.expected).backward()
+
+
+class Mul(ArithmeticBenchmark):
+
+    def time_forward(self, batch, depth):
+        recursive.mul_net.call(self.x, self.y).force()
@@ -0,0 +1,126 @@
+import inspect
+import itertools
+import json
+import platform
+import time
+
+import torch
+
+
+def discover(modules):
+    """
+    Finds benchmarks in modules. Benchmark is a class with attributes `params` and `param_names` and
+    methods `time_*`, optional method `setup` is called with the same parameters before measurement
+
+    :param modules: List of modules
+    :return: List of tuples - name, class and name of method
+    """
+    benchmarks = []
+    for module in modules:
+        for (class_name, cls) in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for method in sorted(name for name in dir(cls) if name.startswith('time_')):
+                name = module.__name__.split('.')[-1] + '.' + class_name + '.' + method
+                benchmarks.append((name, cls, method))
+    return benchmarks
+
+
+def measure(cls, method, params, repeat=5, min_time=0.05):
+    """
+    Measures time of one call of benchmark
+
+    :return: Minimal time of call in seconds
+    """
+    instance = cls()
+    if hasattr(instance, 'setup'):
+        instance.setup(*params)
+    func = getattr(instance, method)
+
+    # Find number of calls which takes at least min_time
+    number = 1
+    while True:
+        elapsed = _time(func, params, number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        samples.append(_time(func, params, number) / number)
+    return min(samples)
+
+
+def _time(func, params, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(*params)
+    return time.perf_counter() - start
+
+
+def run(benchmarks, pattern=None, repeat=5, min_time=0.05, log=print):
+    """
+    Runs benchmarks
+
+    :param benchmarks: Result of `discover`
+    :param pattern: Substring of names of benchmarks to run
+    :return: Dictionary with results: name of benchmark -> parameters -> time in seconds
+    """
+    results = {}
+    for (name, cls, method) in benchmarks:
+        if pattern is not None and pattern not in name:
+            continue
+        names = getattr(cls, 'param_names', [])
+        results[name] = {}
+        for params in itertools.product(*getattr(cls, 'params', [])):
+            key = ','.join(str(param_name) + '=' + str(param) for (param_name, param) in zip(names, params))
+            seconds = measure(cls, method, params, repeat, min_time)
+            results[name][key] = seconds
+            log('{:<60} {:<20} {:>12.6f} ms'.format(name, key, seconds * 1000))
+    return results
+
+
+# Version of measurements. Results of other versions aren't comparable, e.g. before version 2 lazy children of
+# results weren't measured, so baselines of them should be regenerated
+FORMAT = 2
+
+
+def save(results, path):
+    with open(path, 'w') as output:
+        json.dump({
+            'format': FORMAT,
+            'machine': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'torch': torch.__version__,
+                'threads': torch.get_num_threads(),
+            },
+            'results': results,
+        }, output, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as source:
+        data = json.load(source)
+    if data.get('format', 1) != FORMAT:
+        raise ValueError('Results in ' + path + ' have format ' + str(data.get('format', 1)) + ', not ' +
+                         str(FORMAT) + ', regenerate them')
+    return data['results']
+
+
+def compare(results, baseline, threshold=1.2):
+    """
+    Compares results with baseline
+
+    :param threshold: Minimal ratio of times that is considered a regression
+    :return: List of tuples - name, parameters, baseline time, current time and their ratio
+    """
+    regressions = []
+    for (name, times) in results.items():
+        for (key, seconds) in times.items():
+            before = baseline.get(name, {}).get(key)
+            if before is None or before == 0:
+                continue
+            ratio = seconds / before
+            if ratio > threshold:
+                regressions.append((name, key, before, seconds, ratio))
+    return regressions
@@ -0,0 +1,100 @@
+"""
+Benchmarks of primitives of TensorTrees. Children of results may be lazy, so results are forced by `force`,
+otherwise only the root of a result would be measured
+"""
+from runtime.data import DataBag, DataPointer
+from runtime.loss import StructuredLoss
+from runtime.trees import SumTree, stack, make_tuple
+
+from .common import BATCH_SIZES, DEPTHS, random_tree, random_tuple, trainable
+
+
+class TreeBenchmark:
+    params = [BATCH_SIZES, DEPTHS]
+    param_names = ['batch', 'depth']
+
+    def setup(self, batch, depth):
+        self.a = random_tree(batch, depth)
+        self.b = random_tree(batch, depth)
+
+
+class Stack(TreeBenchmark):
+
+    def setup(self, batch, depth):
+        self.trees = [random_tree(1, depth) for _ in range(batch)]
+
+    def time_stack(self, batch, depth):
+        stack(self.trees).force()
+
+
+class Flatten(TreeBenchmark):
+
+    def time_flatten(self, batch, depth):
+        self.a.flatten()
+
+
+class Pointwise(TreeBenchmark):
+
+    def time_add(self, batch, depth):
+        (self.a + self.b).force()
+
+    def time_mul(self, batch, depth):
+        (self.a * self.b).force()
+
+
+class MakeTuple(TreeBenchmark):
+
+    def time_make_tuple(self, batch, depth):
+        make_tuple([self.a, self.b]).force()
+
+
+class Matmul(TreeBenchmark):
+
+    def setup(self, batch, depth):
+        self.data = random_tuple(batch, depth)
+        self.weights = trainable(depth).weights
+        # Weights of the tuple for a Sum layer and of it's product for a Prod layer
+        self.sum_matrix = self.weights.tree.tensor
+        self.prod_matrix = self.weights.children[0].tree.children[0].tensor
+
+    def time_sum_matmul(self, batch, depth):
+        self.data.matmul(self.sum_matrix, SumTree).force()
+
+    def time_prod_matmul(self, batch, depth):
+        product = self.data.children[0]
+        product.matmul(self.prod_matrix, product.__class__).force()
+
+    def time_typed_tree_mul(self, batch, depth):
+        self.data.typed_tree_mul(self.weights.tree).force()
+
+    def time_operator_typed_tree_mul(self, batch, depth):
+        self.weights.typed_tree_mul(self.data).force()
+
+
+class DataBagOperations(TreeBenchmark):
+
+    def setup(self, batch, depth):
+        self.bag = DataBag(random_tuple(batch, depth, size=4), [])
+        self.other = DataBag(random_tuple(batch, depth, size=2), [])
+        self.pointer = DataPointer(2, 0)
+
+    def time_split(self, batch, depth):
+        for bag in self.bag.split(self.pointer):
+            bag.data.force()
+
+    def time_append(self, batch, depth):
+        self.bag.append(self.other).data.force()
+
+
+class Loss(TreeBenchmark):
+
+    def setup(self, batch, depth):
+        super().setup(batch, depth)
+        self.a.tensor.requires_grad_(True)
+        self.loss = StructuredLoss()
+
+    def time_loss(self, batch, depth):
+        self.loss(self.a, self.b)
+
+    def time_loss_backward(self, batch, depth):
+        self.loss(self.a, self.b).backward()
@@ -0,0 +1,124 @@
+import threading
+from contextlib import contextmanager
+
+import torch
+
+
+class Arena:
+    """
+    Buffers for temporary tensors of forward propagation without gradients. Buffers are grouped by type, device
+    and number of elements, rounded up to a power of two. Buffers given in a scope are reused only after the end
+    of the outermost scope, so temporary tensors must not outlive the forward propagation, which requested them
+    """
+
+    def __init__(self):
+        self._free = {}
+        self._used = []
+
+    def take(self, size, dtype, device):
+        """
+        :param size: Sizes of dimensions
+        :return: Uninitialised tensor
+        """
+        numel = 1
+        for dim in size:
+            numel *= dim
+        bucket = 1 << max(numel - 1, 0).bit_length()
+        # Inference tensors can't be modified outside inference mode
+        key = (bucket, dtype, device, torch.is_inference_mode_enabled())
+        free = self._free.get(key)
+        buffer = free.pop() if free else torch.empty(bucket, dtype=dtype, device=device)
+        self._used.append((key, buffer))
+        return buffer[:numel].view(size)
+
+    def release(self):
+        for (key, buffer) in self._used:
+            self._free.setdefault(key, []).append(buffer)
+        self._used = []
+
+    def clear(self):
+        self._free = {}
+        self._used = []
+
+
+# Types, which are too imprecise for accumulation of long sums and products
+LOW_PRECISION = {torch.float16, torch.bfloat16}
+
+_local = threading.local()
+
+
+def _state():
+    if not hasattr(_local, 'arena'):
+        _local.arena = Arena()
+        _local.depth = 0
+    return _local
+
+
+@contextmanager
+def arena():
+    """
+    Scope of a forward propagation, in which temporary tensors are taken from the arena of the current thread,
+    when gradients are disabled. Scopes can be nested
+
+    :return: Arena
+    """
+    state = _state()
+    state.depth += 1
+    try:
+        yield state.arena
+    finally:
+        state.depth -= 1
+        if state.depth == 0:
+            state.arena.release()
+
+
+def clear_arena():
+    """
+    Frees buffers of the arena of the current thread
+    """
+    _state().arena.clear()
+
+
+def accumulation_dtype(dtype):
+    """
+    :param dtype: Type of stored tensors
+    :return: Type, in which reductions of such tensors are computed
+    """
+    return torch.float32 if dtype in LOW_PRECISION else dtype
+
+
+def _allocate(size, like, temporary):
+    if len(size) == 1 and isinstance(size[0], (tuple, list, torch.Size)):
+        size = tuple(size[0])
+    state = _state()
+    if temporary and state.depth > 0 and not torch.is_grad_enabled():
+        return state.arena.take(size, like.dtype, like.device)
+    return None
+
+
+def zeros(*size, like, temporary=False):
+    """
+    Creates tensor of zeros with type and device of another tensor
+
+    :param size: Sizes of dimensions
+    :param like: Tensor, which type and device are used
+    :param temporary: The tensor is used only inside the current forward propagation and isn't kept by it's
+        result, e.g. it's concatenated or multiplied at once, so it can be taken from the arena
+    :return: Tensor
+    """
+    tensor = _allocate(size, like, temporary)
+    if tensor is None:
+        return like.new_zeros(*size)
+    return tensor.zero_()
+
+
+def ones(*size, like, temporary=False):
+    """
+    Creates tensor of ones with type and device of another tensor, see `zeros`
+
+    :return: Tensor
+    """
+    tensor = _allocate(size, like, temporary)
+    if tensor is None:
+        return like.new_ones(*size)
+    return tensor.fill_(1)
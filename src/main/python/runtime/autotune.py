@@ -0,0 +1,185 @@
+import time
+
+import torch
+
+from .config import current_config, save_config
+
+
+class Trial:
+    """
+    Measurement of one configuration on calibration batches
+    """
+
+    def __init__(self, config, seconds, rows, deviation):
+        self.config = config
+        self.seconds = seconds
+        self.rows = rows
+        self.deviation = deviation
+
+    def throughput(self):
+        """
+        :return: Rows per second, None if the trial wasn't timed
+        """
+        if self.seconds is None:
+            return None
+        return float('inf') if self.seconds == 0 else self.rows / self.seconds
+
+    def __repr__(self):
+        return 'Trial(' + repr(self.config) + ', throughput=' + str(self.throughput()) + ', deviation=' + \
+               str(self.deviation) + ')'
+
+
+class TuningResult:
+    """
+    Chosen configuration and all measured trials, the first trial is the reference
+    """
+
+    def __init__(self, config, trials):
+        self.config = config
+        self.trials = trials
+
+    def reference(self):
+        return self.trials[0]
+
+    def best(self):
+        return next(trial for trial in reversed(self.trials) if trial.config == self.config)
+
+    def speedup(self):
+        """
+        :return: Throughput of the chosen configuration relative to the reference
+        """
+        return self.best().throughput() / self.reference().throughput()
+
+    def __repr__(self):
+        return 'TuningResult(' + repr(self.config) + ', speedup=' + str(self.speedup()) + ', trials=' + \
+               str(len(self.trials)) + ')'
+
+
+class Autotuner:
+    """
+    Chooses execution knobs of a network on calibration batches. Knobs are tuned one after another: every
+    candidate value is timed, it's accepted if it's faster than the current configuration and results differ
+    from results of the reference configuration by at most `tolerance`. Limits of depth of recursion change
+    semantics of programs, so they aren't tuned by default.
+
+    Batches are evaluated without gradients, time of a configuration is the minimum of `repeats` runs
+    """
+
+    TOLERANCE = 1e-3
+
+    REPEATS = 3
+
+    CANDIDATES = {
+        'prod_eps': [1e-5, 1e-4, 1e-3, 1e-2],
+        'operator_eps': [1e-6, 1e-5, 1e-4, 1e-3, 1e-2],
+        'select_rows': [False, True],
+        'case_eps': [1e-4, 1e-3, 1e-2],
+    }
+
+    def __init__(self, tolerance=None, repeats=None, candidates=None):
+        self.tolerance = self.TOLERANCE if tolerance is None else tolerance
+        self.repeats = self.REPEATS if repeats is None else repeats
+        self.candidates = self.CANDIDATES if candidates is None else candidates
+
+    def tune(self, net, batches, base=None, model_path=None):
+        """
+        Tunes the configuration and sets it as `runtime_config` of the network
+
+        :param net: FunctionalModule
+        :param batches: List of arguments of calls - TensorTrees, lists of them as arguments of
+            `FunctionalModule.call` or tuples of them
+        :param base: Reference RuntimeConfig, by default - configuration of the network or the current one
+        :param model_path: If set, the chosen configuration is saved next to the model
+        :return: TuningResult
+        """
+        if base is None:
+            base = getattr(net, 'runtime_config', None) or current_config()
+        batches = [batch if isinstance(batch, tuple) else (batch,) for batch in batches]
+        rows = sum(_rows(batch) for batch in batches)
+        previous = getattr(net, 'runtime_config', None)
+        try:
+            with torch.no_grad():
+                net.runtime_config = base
+                # Warm up caches of constants and weights
+                self._run(net, batches)
+                expected = self._run(net, batches)
+                reference = Trial(base, self._time(net, batches), rows, 0.0)
+                trials = [reference]
+                best = reference
+                for (knob, values) in self.candidates.items():
+                    for value in values:
+                        config = best.config.replace(**{knob: value})
+                        if config == best.config:
+                            continue
+                        net.runtime_config = config
+                        difference = max(
+                            [deviation(a, b) for (a, b) in zip(expected, self._run(net, batches))], default=0.0
+                        )
+                        # Configurations with too large deviation aren't timed
+                        seconds = self._time(net, batches) if difference <= self.tolerance else None
+                        trial = Trial(config, seconds, rows, difference)
+                        trials.append(trial)
+                        if trial.seconds is not None and trial.seconds < best.seconds:
+                            best = trial
+        except BaseException:
+            net.runtime_config = previous
+            raise
+        net.runtime_config = best.config
+        if model_path is not None:
+            save_config(net, model_path)
+        return TuningResult(best.config, trials)
+
+    def _run(self, net, batches):
+        return [net.call(*batch) for batch in batches]
+
+    def _time(self, net, batches):
+        seconds = None
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            self._run(net, batches)
+            elapsed = time.perf_counter() - start
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+        return seconds
+
+
+def _rows(arguments):
+    # Arguments of a call are TensorTrees or one list of them
+    first = arguments[0][0] if isinstance(arguments[0], list) else arguments[0]
+    return first.rows()
+
+
+def autotune(net, batches, model_path=None, tolerance=None):
+    """
+    Tunes execution knobs of the network with the default Autotuner, see `Autotuner.tune`
+
+    :return: TuningResult
+    """
+    return Autotuner(tolerance).tune(net, batches, model_path=model_path)
+
+
+def deviation(expected, actual):
+    """
+    :param expected: TensorTree
+    :param actual: TensorTree
+    :return: The largest absolute difference of elements of trees, nodes present only in one of them are compared
+        with zeros. Nodes of different shapes are infinitely different
+    """
+    if expected.tensor.size() != actual.tensor.size():
+        return float('inf')
+    result = (expected.tensor - actual.tensor).abs().max().item() if expected.tensor.numel() > 0 else 0.0
+    for (expected_child, actual_child) in zip(expected.children, actual.children):
+        if expected_child is None and actual_child is None:
+            continue
+        if expected_child is None or actual_child is None:
+            result = max(result, _magnitude(expected_child if actual_child is None else actual_child))
+        else:
+            result = max(result, deviation(expected_child, actual_child))
+    return result
+
+
+def _magnitude(tree):
+    result = tree.tensor.abs().max().item() if tree.tensor.numel() > 0 else 0.0
+    for child in tree.children:
+        if child is not None:
+            result = max(result, _magnitude(child))
+    return result
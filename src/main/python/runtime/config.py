@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+class RuntimeConfig:
+    """
+    Execution knobs of the runtime. The configuration of the current thread is used by all layers and trees,
+    a network can have it's own configuration, which is activated by `FunctionalModule.call`:
+
+    prod_eps - elements of weights of products with smaller magnitude don't route children;
+    operator_eps - children of OperatorTrees with smaller presence in all rows aren't multiplied;
+    case_eps - rows with smaller presence of a case aren't evaluated by it, if select_rows is set;
+    select_rows - cases of GuardedLayers evaluate only rows, which match their patterns;
+    recursion_depth and tail_recursion_depth - limits of depth of recursion
+    """
+
+    PROD_EPS = 1e-3
+    OPERATOR_EPS = 1e-4
+    CASE_EPS = 1e-3
+    SELECT_ROWS = False
+    RECURSION_DEPTH = 50
+    TAIL_RECURSION_DEPTH = 200
+
+    FIELDS = ('prod_eps', 'operator_eps', 'case_eps', 'select_rows', 'recursion_depth', 'tail_recursion_depth')
+
+    def __init__(self, prod_eps=None, operator_eps=None, case_eps=None, select_rows=None, recursion_depth=None,
+                 tail_recursion_depth=None):
+        self.prod_eps = self.PROD_EPS if prod_eps is None else prod_eps
+        self.operator_eps = self.OPERATOR_EPS if operator_eps is None else operator_eps
+        self.case_eps = self.CASE_EPS if case_eps is None else case_eps
+        self.select_rows = self.SELECT_ROWS if select_rows is None else select_rows
+        self.recursion_depth = self.RECURSION_DEPTH if recursion_depth is None else recursion_depth
+        self.tail_recursion_depth = self.TAIL_RECURSION_DEPTH if tail_recursion_depth is None \
+            else tail_recursion_depth
+
+    def replace(self, **changes):
+        """
+        :return: Copy of the configuration with changed knobs
+        """
+        return RuntimeConfig(**{**self.to_dict(), **changes})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @staticmethod
+    def from_dict(values):
+        unknown = set(values) - set(RuntimeConfig.FIELDS)
+        if len(unknown) > 0:
+            raise ValueError('Unknown knobs of runtime: ' + ', '.join(sorted(unknown)))
+        return RuntimeConfig(**values)
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+
+    @staticmethod
+    def load(path):
+        with open(path) as file:
+            return RuntimeConfig.from_dict(json.load(file))
+
+    def __eq__(self, o):
+        return isinstance(o, RuntimeConfig) and self.to_dict() == o.to_dict()
+
+    def __repr__(self):
+        return 'RuntimeConfig(' + ', '.join(field + '=' + str(getattr(self, field)) for field in self.FIELDS) + ')'
+
+
+_DEFAULT = RuntimeConfig()
+
+# Configuration of a model is saved next to it, in the file with the path of the model and this suffix
+SUFFIX = '.runtime.json'
+
+_local = threading.local()
+
+
+def current_config():
+    """
+    :return: RuntimeConfig of the current thread
+    """
+    config = getattr(_local, 'config', None)
+    return _DEFAULT if config is None else config
+
+
+@contextmanager
+def using_config(config):
+    """
+    Activates the configuration in the current thread
+
+    :param config: RuntimeConfig, None keeps the current one
+    :return: The active RuntimeConfig
+    """
+    if config is None:
+        yield current_config()
+        return
+    previous = getattr(_local, 'config', None)
+    _local.config = config
+    try:
+        yield config
+    finally:
+        _local.config = previous
+
+
+def config_path(model_path):
+    """
+    :param model_path: Path of a saved model
+    :return: Path of it's configuration
+    """
+    return str(model_path) + SUFFIX
+
+
+def save_config(net, model_path):
+    """
+    Saves configuration of the network next to the model
+    """
+    config = getattr(net, 'runtime_config', None) or current_config()
+    config.save(config_path(model_path))
+
+
+def load_config(net, model_path):
+    """
+    Sets configuration of the network from the file next to the model, if it exists
+
+    :param net: FunctionalModule
+    :param model_path: Path of the saved model
+    :return: RuntimeConfig or None
+    """
+    path = config_path(model_path)
+    if not os.path.exists(path):
+        return None
+    net.runtime_config = RuntimeConfig.load(path)
+    return net.runtime_config
+
+
+def set_default_config(config):
+    """
+    Replaces the configuration of threads, which don't have their own one
+    """
+    global _DEFAULT
+    _DEFAULT = config
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+class ConstantCache:
+    """
+    Keeps a constant TensorTree, which doesn't depend on data, and gives it for any number of rows.
+
+    The tree is built once with one row for every type and device. Other numbers of rows are served as broadcast
+    views of it, which don't allocate memory. Views for the last SIZE numbers of rows, types and devices are kept,
+    so repeated calls don't create trees at all. Served trees are shared, so they must not be modified in place
+    """
+
+    SIZE = 16   # Number of kept views
+
+    def __init__(self, build):
+        """
+        :param build: Function `build(dtype)` which creates a tree with one row
+        """
+        self.build = build
+        self._rows = {}
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rows, like=None):
+        """
+        :param rows: Number of rows
+        :param like: Tensor, which type and device are used, e.g. tensor of input. By default - the default type
+            of torch on CPU
+        :return: TensorTree
+        """
+        if like is None:
+            dtype, device = torch.get_default_dtype(), torch.device('cpu')
+        else:
+            dtype, device = like.dtype, like.device
+        key = (rows, dtype, device)
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+                return tree
+            row = self._rows.get((dtype, device))
+        # Trees built in inference mode can't be used by autograd later, so they are always built as normal tensors,
+        # which can be used in both modes
+        with torch.inference_mode(False):
+            if row is None:
+                row = self.build(dtype)
+                if row.tensor.device != device:
+                    row = row.to(device)
+            tree = broadcast_rows(row, rows)
+        with self._lock:
+            self._rows[(dtype, device)] = row
+            self._trees[key] = tree
+            if len(self._trees) > self.SIZE:
+                self._trees.popitem(last=False)
+        return tree
+
+    def __getstate__(self):
+        # Views and the lock are recreated after unpickling
+        return {'build': self.build}
+
+    def __setstate__(self, state):
+        self.__init__(state['build'])
+
+    def clear(self):
+        with self._lock:
+            self._rows = {}
+            self._trees = OrderedDict()
+
+
+def broadcast_rows(tree, rows):
+    """
+    Repeats the only row of the tree without copying
+
+    :param tree: TensorTree with one row
+    :param rows: Number of rows
+    :return: TensorTree, which tensors have zero stride of rows
+    """
+    return tree.apply(lambda tensor: tensor.as_strided((rows, tensor.size()[1]), (0, tensor.stride()[1])))
@@ -0,0 +1,249 @@
+import torch
+
+from .config import current_config
+from .modules import AnonymousNetLayer, ApplicationLayer, GuardedLayer, RecursiveLayer, TrainableLayer, \
+    VariableLayer
+from .modules.recursive import LimitedRecursiveLayer, TailRecursiveLayer
+from .modules.trainable import _build_operator, _build_tree, _weight_mask_entries
+from .profiling import module_names, describe_module
+from .types import create_tuple_type, create_unit_type
+
+
+class LayerCost:
+    """
+    Cost of one TrainableLayer. FLOPs and bytes of activations are given for one row of input and one evaluation,
+    `multiplier` is the number of evaluations of the layer in one forward call. Parameters, which are shared with
+    a layer counted before, e.g. a layer used in two places, aren't counted again
+    """
+
+    ACTIVATION_FLOPS = 8    # Approximate number of operations of structured sigmoid per element
+
+    def __init__(self, name, parameters, masked_parameters, weight_nodes, flops, activation_elements, multiplier=1):
+        self.name = name
+        self.parameters = parameters
+        self.masked_parameters = masked_parameters
+        self.weight_nodes = weight_nodes
+        self.flops = flops
+        self.activation_elements = activation_elements
+        self.multiplier = multiplier
+
+    def __repr__(self):
+        return 'LayerCost(' + self.name + ', parameters=' + str(self.parameters) + ', flops=' + str(self.flops) + \
+               ', multiplier=' + str(self.multiplier) + ')'
+
+
+class CostReport:
+    """
+    Predicted cost of a network
+    """
+
+    def __init__(self, layers, element_size):
+        self.layers = layers
+        self.element_size = element_size
+
+    def parameters(self):
+        """
+        :return: Number of trainable parameters, including masked out ones
+        """
+        return sum(layer.parameters for layer in self.layers)
+
+    def masked_parameters(self):
+        """
+        :return: Number of trainable parameters which aren't always zero
+        """
+        return sum(layer.masked_parameters for layer in self.layers)
+
+    def parameter_bytes(self):
+        return self.parameters() * self.element_size
+
+    def flops_per_row(self):
+        return sum(layer.flops * layer.multiplier for layer in self.layers)
+
+    def activation_bytes_per_row(self):
+        """
+        :return: Heuristic number of bytes of activations kept for backward propagation for one row of input.
+            Only results of TrainableLayers are counted, trees created by other layers, e.g. selected rows of
+            GuardedLayer cases, constructed objects and results of pointwise operations, aren't, so it isn't
+            a bound of memory of the network
+        """
+        return sum(layer.activation_elements * layer.multiplier for layer in self.layers) * self.element_size
+
+    def table(self):
+        """
+        :return: Costs of layers as a text table
+        """
+        width = max([len('Layer')] + [len(layer.name) for layer in self.layers])
+        header = '{:<{w}} {:>12} {:>12} {:>14} {:>10}'.format(
+            'Layer', 'Parameters', 'Masked', 'FLOPs per row', 'Multiplier', w=width
+        )
+        lines = [header, '-' * len(header)]
+        for layer in self.layers:
+            lines.append('{:<{w}} {:>12} {:>12} {:>14} {:>10}'.format(
+                layer.name, layer.parameters, layer.masked_parameters, layer.flops, layer.multiplier, w=width
+            ))
+        lines.append('Parameters: ' + str(self.parameters()) + ' (' + str(self.parameter_bytes()) + ' bytes)')
+        lines.append('FLOPs per row: ' + str(self.flops_per_row()))
+        lines.append('Activation bytes per row: ' + str(self.activation_bytes_per_row()))
+        return '\n'.join(lines)
+
+
+class _Shape:
+    """
+    Replaces tensor of a node of trees while they are built for analysis
+    """
+
+    def __init__(self, from_size, to_size, masked, trainable):
+        self.from_size = from_size
+        self.to_size = to_size
+        self.masked = masked
+        self.trainable = trainable
+
+
+def trainable_cost(defined_types, arguments, to_type, from_depth=1, to_depth=1, ensemble=None, name='trainable'):
+    """
+    Predicts cost of TrainableLayer with specified arguments without creating it.
+    Arguments are the same as arguments of the constructor of TrainableLayer
+
+    :return: LayerCost
+    """
+    members = 1 if ensemble is None else ensemble
+    from_type = create_tuple_type(arguments)
+    result_type = create_tuple_type([to_type])
+
+    def weight_shape(type_params, this_from_type, this_to_type, from_size, to_size):
+        entries, _ = _weight_mask_entries(type_params, this_from_type, this_to_type, from_size, to_size)
+        # Updated parameters only if we have Sum->Sum or Prod->Prod layers
+        return _Shape(from_size, to_size, len(entries), type(this_from_type) == type(this_to_type))
+
+    def bias_shape(type_params, this_from_type, this_to_type, from_size, to_size):
+        return _Shape(from_size, to_size, from_size * to_size, True)
+
+    weights = _build_operator(
+        defined_types, {}, from_type, result_type, from_depth * 2, to_depth * 2, weight_shape
+    )
+    bias = _build_tree(defined_types, {}, create_unit_type(), result_type, to_depth * 2, bias_shape)
+
+    weight_nodes = list(_operator_shapes(weights))
+    bias_nodes = list(_tree_shapes(bias))
+    parameters = 0
+    masked = 0
+    flops = 0
+    intermediate = 0
+    for shape in weight_nodes:
+        if shape.trainable:
+            parameters += shape.from_size * shape.to_size * members
+            masked += shape.masked * members
+        # Every node of weights is multiplied by the matching node of input at most once
+        flops += 2 * shape.from_size * shape.to_size
+        intermediate += shape.to_size
+    outputs = 0
+    for shape in bias_nodes:
+        parameters += shape.from_size * shape.to_size * members
+        masked += shape.masked * members
+        outputs += shape.to_size
+    # Addition of bias and activation
+    flops += outputs * (1 + LayerCost.ACTIVATION_FLOPS)
+    return LayerCost(name, parameters, masked, len(weight_nodes), flops, intermediate + 2 * outputs)
+
+
+def _operator_shapes(operator):
+    yield from _tree_shapes(operator.tree)
+    for child in operator.children:
+        if child is not None:
+            yield from _operator_shapes(child)
+
+
+def _tree_shapes(tree):
+    yield tree.tensor
+    for child in tree.children:
+        if child is not None:
+            yield from _tree_shapes(child)
+
+
+def estimate(net, recursion_depth=None, dtype=torch.float32):
+    """
+    Predicts cost of a network by walking it's modules, doesn't evaluate the network.
+
+    Body of a recursive network is counted `recursion_depth` times, by default - the limit of depth of recursion.
+    All cases of GuardedLayer are counted, as all of them are evaluated. Costs of layers which aren't
+    TrainableLayers are ignored, so activations are a heuristic, not a bound, see `activation_bytes_per_row`.
+    Networks passed as arguments are counted only where they are called directly. Every parameter is counted
+    once, even if it's shared by many layers or a layer is called in many places
+
+    :param net: FunctionalModule
+    :param recursion_depth: Expected depth of recursion
+    :param dtype: Type of parameters and activations
+    :return: CostReport
+    """
+    names = module_names(net)
+    layers = []
+    _visit(net, 1, recursion_depth, names, layers, set(), set())
+    return CostReport(layers, torch.empty(0, dtype=dtype).element_size())
+
+
+def _visit(module, multiplier, recursion_depth, names, layers, visiting, counted):
+    """
+    :param counted: Set of ids of parameters, which are already counted
+    """
+    if id(module) in visiting:
+        return
+    visiting.add(id(module))
+    try:
+        if isinstance(module, TrainableLayer):
+            cost = trainable_cost(
+                module.defined_types, module.arguments, module.to_type.operands[0].operands[0],
+                module.from_depth // 2, module.to_depth // 2, module.ensemble, describe_module(names, module)
+            )
+            cost.multiplier = multiplier
+            parameters = list(module.parameters())
+            if len(parameters) > 0 and all(id(parameter) in counted for parameter in parameters):
+                # Parameters are shared with a layer counted before, only computations are repeated
+                cost.parameters = 0
+                cost.masked_parameters = 0
+            counted.update(id(parameter) for parameter in parameters)
+            layers.append(cost)
+        elif isinstance(module, (RecursiveLayer, LimitedRecursiveLayer, TailRecursiveLayer)):
+            if recursion_depth is not None:
+                depth = recursion_depth
+            elif isinstance(module, TailRecursiveLayer) or getattr(module, 'is_tail_recursive', False):
+                depth = current_config().tail_recursion_depth
+            else:
+                depth = current_config().recursion_depth
+            _visit(module.net, multiplier * depth, recursion_depth, names, layers, visiting, counted)
+        elif isinstance(module, ApplicationLayer):
+            for (i, operand) in enumerate(module.operands):
+                if i == 0 or i in module.constants:
+                    # The called network and constants are evaluated, the called network may be a layer itself
+                    net = operand.net if isinstance(operand, VariableLayer.External) else operand
+                    _visit(net, multiplier, recursion_depth, names, layers, visiting, counted)
+                elif i in module.call:
+                    _visit(operand, multiplier, recursion_depth, names, layers, visiting, counted)
+        elif isinstance(module, GuardedLayer):
+            for case in module.cases:
+                _visit(case.net, multiplier, recursion_depth, names, layers, visiting, counted)
+        elif isinstance(module, AnonymousNetLayer):
+            _visit(module.net, multiplier, recursion_depth, names, layers, visiting, counted)
+    finally:
+        visiting.remove(id(module))
+
+
+def pick_batch_size(net, memory_budget, training=True, recursion_depth=None, dtype=torch.float32, max_batch_size=None):
+    """
+    Picks the largest power of two batch size, for which parameters and activations predicted by `estimate` fit
+    into memory budget
+
+    :param net: FunctionalModule
+    :param memory_budget: Number of bytes available for the network
+    :param training: If true, memory for gradients and activations kept for backward propagation is reserved
+    :param recursion_depth: Expected depth of recursion, see `estimate`
+    :param max_batch_size: Maximal batch size
+    :return: Batch size, at least 1
+    """
+    report = estimate(net, recursion_depth, dtype)
+    fixed = report.parameter_bytes() * (2 if training else 1)
+    per_row = max(1, report.activation_bytes_per_row())
+    batch_size = 1
+    while (max_batch_size is None or batch_size * 2 <= max_batch_size) \
+            and fixed + batch_size * 2 * per_row <= memory_budget:
+        batch_size *= 2
+    return batch_size
@@ -73,12 +73,13 @@ class DataBag:
         :param pointer: DataPointer
         :return: Pair of DataBags
         """
+        like = self.data.tensor
         if len(self.data.children) == 0:
-            data_before = make_tuple([])
-            data_after = make_tuple([])
+            data_before = make_tuple([], like)
+            data_after = make_tuple([], like)
         else:
-            data_before = make_tuple(self.data.children[0].children[0:pointer.data])
-            data_after = make_tuple(self.data.children[0].children[pointer.data:])
+            data_before = make_tuple(self.data.children[0].children[0:pointer.data], like)
+            data_after = make_tuple(self.data.children[0].children[pointer.data:], like)
         nets_before = self.nets[0:pointer.nets]
         nets_after = self.nets[pointer.nets:]
 
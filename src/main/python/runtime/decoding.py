@@ -0,0 +1,191 @@
+import torch
+
+from .discrete import decode
+from .trees import SumTree, ProdTree
+
+
+class BeamDecoder:
+    """
+    Finds the most probable values of every row of a TensorTree, e.g. of a result of a network.
+
+    Score of a value is the sum of logarithms of probabilities of all it's choices: the chosen alternative of every
+    sum and presence or absence of every operand of products. Alternatives of a sum are scored by the values of
+    the tree as they are. Operands of products are combined pairwise, only `beam` best combinations are kept on
+    every level, so the search is approximate for deep trees. All rows are decoded at once
+    """
+
+    EPS = 1e-12     # Minimal probability, protects logarithms from zeros
+
+    BEAM = 4        # Default width of beam
+
+    def __init__(self, beam=None):
+        """
+        :param beam: Width of beam or list of widths for levels of the tree, the last width is used for deeper levels
+        """
+        if beam is None:
+            beam = self.BEAM
+        self.widths = beam if isinstance(beam, (list, tuple)) else [beam]
+
+    def top_k(self, tree, k):
+        """
+        :param tree: SumTree
+        :param k: Number of values
+        :return: Tuple - tensor [rows, k'] with scores in descending order and list of k' strict SumTrees,
+            the i-th tree contains the i-th best value of every row. k' is less than k only if the type has less
+            than k values
+        """
+        with torch.no_grad():
+            beam = self._search_sum(tree, 0, k)
+            rows = tree.rows()
+            active = torch.ones(rows, dtype=torch.bool, device=tree.tensor.device)
+            trees = []
+            for rank in range(beam.scores.size()[1]):
+                selected = torch.full((rows,), rank, dtype=torch.long, device=tree.tensor.device)
+                trees.append(_build_sum(beam, tree, selected, active))
+            return beam.scores, trees
+
+    def top_k_values(self, tree, k):
+        """
+        :param tree: SumTree
+        :param k: Number of values
+        :return: List with list of pairs (score, value) for every row, values are in the format of `discrete.decode`
+        """
+        scores, trees = self.top_k(tree, k)
+        values = [decode(strict) for strict in trees]
+        return [
+            [(score, values[rank][row]) for (rank, score) in enumerate(row_scores)]
+            for (row, row_scores) in enumerate(scores.tolist())
+        ]
+
+    def _width(self, level):
+        return self.widths[min(level, len(self.widths) - 1)]
+
+    def _search_sum(self, tree, level, width):
+        tensor = tree.tensor.detach()
+        rows, columns = tensor.size()
+        if columns == 0:
+            return _SumBeam(tensor.new_zeros(rows, 1), None, None, [])
+        log_p = tensor.clamp(min=self.EPS).log()
+        parts = []
+        constructors = []
+        operands = []
+        children = []
+        for (column, child) in enumerate(tree.children):
+            if child is None:
+                children.append(None)
+                parts.append(log_p[:, column:column + 1])
+                constructors.append(column)
+                operands.append(0)
+                continue
+            child_beam = self._search_prod(child, level + 1)
+            children.append(child_beam)
+            candidates = child_beam.scores.size()[1]
+            parts.append(log_p[:, column:column + 1] + child_beam.scores)
+            constructors.extend([column] * candidates)
+            operands.extend(range(candidates))
+        scores = torch.cat(parts, 1)
+        scores, index = scores.topk(min(width, scores.size()[1]), 1)
+        constructors = torch.tensor(constructors, dtype=torch.long, device=tensor.device)[index]
+        operands = torch.tensor(operands, dtype=torch.long, device=tensor.device)[index]
+        return _SumBeam(scores, constructors, operands, children)
+
+    def _search_prod(self, tree, level):
+        width = self._width(level)
+        tensor = tree.tensor.detach()
+        rows = tensor.size()[0]
+        log_present = tensor.clamp(min=self.EPS).log()
+        log_absent = (1 - tensor).clamp(min=self.EPS).log()
+        scores = tensor.new_zeros(rows, 1)
+        steps = []
+        children = []
+        for (column, child) in enumerate(tree.children):
+            absent = log_absent[:, column:column + 1]
+            present = log_present[:, column:column + 1]
+            if child is None:
+                # Present operand of unknown structure
+                children.append(None)
+                options = torch.cat([absent, present], 1)
+            else:
+                child_beam = self._search_sum(child, level + 1, self._width(level + 1))
+                children.append(child_beam)
+                options = torch.cat([absent, present + child_beam.scores], 1)
+            # Combine best combinations of previous operands with options of this one
+            size = options.size()[1]
+            combined = (scores.unsqueeze(2) + options.unsqueeze(1)).view(rows, -1)
+            scores, index = combined.topk(min(width, combined.size()[1]), 1)
+            steps.append((torch.div(index, size, rounding_mode='floor'), index % size))
+        return _ProdBeam(scores, steps, children)
+
+
+class _SumBeam:
+    """
+    Best values of a SumTree: scores [rows, width] and for every value it's constructor and index of the value of
+    the operand in the beam of the child
+    """
+
+    def __init__(self, scores, constructors, operands, children):
+        self.scores = scores
+        self.constructors = constructors
+        self.operands = operands
+        self.children = children
+
+
+class _ProdBeam:
+    """
+    Best values of a ProdTree: scores [rows, width] and for every operand a pair of backpointers - index of
+    the combination of previous operands and option of this operand: 0 is absence, i > 0 is the (i - 1)-th value
+    of the child
+    """
+
+    def __init__(self, scores, steps, children):
+        self.scores = scores
+        self.steps = steps
+        self.children = children
+
+
+def _gather(tensor, index):
+    return tensor.gather(1, index.view(-1, 1)).view(-1)
+
+
+def _build_sum(beam, tree, selected, active):
+    rows = selected.size()[0]
+    tensor = tree.tensor
+    columns = tensor.size()[1]
+    if beam.constructors is None:
+        return SumTree(tensor.new_zeros(rows, 0), [])
+    constructors = _gather(beam.constructors, selected)
+    operands = _gather(beam.operands, selected)
+    new_tensor = tensor.new_zeros(rows, columns).scatter_(1, constructors.view(-1, 1), 1)
+    new_tensor *= active.view(-1, 1)
+    new_children = []
+    for (column, child_beam) in enumerate(beam.children):
+        if child_beam is None:
+            new_children.append(None)
+            continue
+        chosen = constructors == column
+        # Indices of other constructors may be out of the beam of this child
+        child_selected = torch.where(chosen, operands, torch.zeros_like(operands))
+        new_children.append(_build_prod(child_beam, tree.children[column], child_selected, active & chosen))
+    return SumTree(new_tensor, new_children)
+
+
+def _build_prod(beam, tree, selected, active):
+    rows = selected.size()[0]
+    options = [None] * len(beam.steps)
+    for column in reversed(range(len(beam.steps))):
+        previous, option = beam.steps[column]
+        options[column] = _gather(option, selected)
+        selected = _gather(previous, selected)
+    columns = []
+    new_children = []
+    for (column, child_beam) in enumerate(beam.children):
+        present = (options[column] > 0) & active
+        columns.append(present)
+        if child_beam is None:
+            new_children.append(None)
+        else:
+            child_selected = (options[column] - 1).clamp(min=0)
+            new_children.append(_build_sum(child_beam, tree.children[column], child_selected, present))
+    if len(columns) == 0:
+        return ProdTree(tree.tensor.new_zeros(rows, 0), [])
+    return ProdTree(torch.stack(columns, 1).to(tree.tensor.dtype), new_children)
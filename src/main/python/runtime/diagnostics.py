@@ -0,0 +1,165 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+import torch
+from torch.overrides import TorchFunctionMode
+
+from .errors import DiagnosticsBudgetExceeded
+from .profiling import instrument_modules, module_names, describe_module
+
+_RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIPPED_FILES = {os.path.join(_RUNTIME_DIR, 'diagnostics.py'), os.path.join(_RUNTIME_DIR, 'profiling.py')}
+
+# Operations which copy values of tensors to the host and wait for all preceding operations
+_SYNC_FUNCTIONS = {
+    torch.Tensor.item,
+    torch.Tensor.tolist,
+    torch.Tensor.numpy,
+    torch.Tensor.nonzero,
+    torch.Tensor.__bool__,
+    torch.Tensor.__int__,
+    torch.Tensor.__float__,
+    torch.Tensor.__index__,
+}
+
+
+class SyncAuditor:
+    """
+    Counts host synchronisations (`.item()`, conversion to bool in conditionals, `.tolist()`, ...) and small
+    tensor operations, whose results have less than `threshold` elements, and attributes every event to the
+    line of the runtime where it happened and to the module which was executed. Only operations of the thread
+    which started auditing are counted.
+
+    Usage in a test:
+
+        with SyncAuditor(net, sync_budget=0, small_op_budget=100) as auditor:
+            net.call(tree)
+        print(auditor.report())
+
+    If budgets are given, DiagnosticsBudgetExceeded is raised when the context exits
+    """
+
+    THRESHOLD = 256     # Operations with results smaller than this number of elements are small
+
+    SYNC = 'host syncs'
+    SMALL_OP = 'small ops'
+
+    def __init__(self, net=None, threshold=None, sync_budget=None, small_op_budget=None):
+        if threshold is None:
+            threshold = self.THRESHOLD
+        self.threshold = threshold
+        self.budgets = {self.SYNC: sync_budget, self.SMALL_OP: small_op_budget}
+        self.counts = Counter()
+        self._names = module_names(net)
+        self._modules = []
+        self._thread = None
+        self._mode = None
+        self._context = None
+
+    def __enter__(self):
+        if self._thread is not None:
+            raise RuntimeError('Auditor is already active')
+        self._thread = threading.get_ident()
+        self._context = instrument_modules(self._wrap)
+        self._context.__enter__()
+        self._mode = _AuditMode(self)
+        self._mode.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._mode.__exit__(exc_type, exc_val, exc_tb)
+        self._context.__exit__(exc_type, exc_val, exc_tb)
+        self._mode = None
+        self._context = None
+        self._thread = None
+        self._modules = []
+        if exc_type is None:
+            self.check()
+
+    def _wrap(self, cls, forward):
+        auditor = self
+
+        def audited_forward(module, data_bag):
+            if threading.get_ident() != auditor._thread:
+                return forward(module, data_bag)
+            auditor._modules.append(module)
+            try:
+                return forward(module, data_bag)
+            finally:
+                auditor._modules.pop()
+
+        return audited_forward
+
+    def _record(self, kind, func):
+        module = describe_module(self._names, self._modules[-1]) if len(self._modules) > 0 else None
+        self.counts[(kind, _call_site(), module, _function_name(func))] += 1
+
+    def total(self, kind):
+        """
+        :param kind: `SyncAuditor.SYNC` or `SyncAuditor.SMALL_OP`
+        :return: Number of events of this kind
+        """
+        return sum(count for ((event_kind, _, _, _), count) in self.counts.items() if event_kind == kind)
+
+    def check(self):
+        """
+        Raises DiagnosticsBudgetExceeded if number of events of some kind exceeds it's budget
+        """
+        for (kind, budget) in self.budgets.items():
+            if budget is not None and self.total(kind) > budget:
+                raise DiagnosticsBudgetExceeded(kind, self.total(kind), budget)
+
+    def report(self, limit=None):
+        """
+        :param limit: Maximal number of rows
+        :return: Events grouped by call sites as a text table
+        """
+        rows = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+        lines = [
+            self.SYNC + ': ' + str(self.total(self.SYNC)),
+            self.SMALL_OP + ': ' + str(self.total(self.SMALL_OP)),
+        ]
+        for ((kind, site, module, function), count) in rows:
+            lines.append('{:>8}  {:<10} {:<20} {} in {}'.format(count, kind, function, site, module or '-'))
+        return '\n'.join(lines)
+
+
+class _AuditMode(TorchFunctionMode):
+
+    def __init__(self, auditor):
+        super().__init__()
+        self.auditor = auditor
+
+    def __torch_function__(self, func, types, args=(), kwargs=None):
+        if kwargs is None:
+            kwargs = {}
+        result = func(*args, **kwargs)
+        if threading.get_ident() != self.auditor._thread:
+            return result
+        if func in _SYNC_FUNCTIONS:
+            self.auditor._record(SyncAuditor.SYNC, func)
+        elif isinstance(result, torch.Tensor) and getattr(func, '__name__', None) != '__get__':
+            # Getters of attributes, e.g. `.data` or `.grad`, aren't operations
+            if result.numel() < self.auditor.threshold:
+                self.auditor._record(SyncAuditor.SMALL_OP, func)
+        return result
+
+
+def _call_site():
+    # The innermost frame in the runtime, except of instrumentation itself
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_RUNTIME_DIR) and filename not in _SKIPPED_FILES:
+            path = os.path.relpath(filename, os.path.dirname(_RUNTIME_DIR))
+            return path + ':' + str(frame.f_lineno) + ' (' + frame.f_code.co_name + ')'
+        frame = frame.f_back
+    return '<outside of runtime>'
+
+
+def _function_name(func):
+    return getattr(func, '__qualname__', None) or getattr(func, '__name__', None) or repr(func)
@@ -0,0 +1,548 @@
+import torch
+
+from .config import current_config, using_config
+from .data import DataBag, DataPointer
+from .folding import FoldedLayer
+from .modules import AnonymousNetLayer, ApplicationLayer, ConstantLayer, ConstructorLayer, GuardedLayer, \
+    RecursiveLayer, TrainableLayer, VariableLayer
+from .patterns import ConstructorPattern, LitPattern, VarPattern
+from .trees import SumTree, ProdTree, make_tuple
+from .types import ExtSpec, LitSpec, substitute
+
+
+# Values of data types are encoded as tuples (constructor, number of constructors, operands),
+# where operands is a tuple of values or None if the constructor has no operands.
+# Missing operand is encoded as None
+
+
+def decode(tree):
+    """
+    Decodes values of all rows of strict TensorTree, e.g. result of `TensorTree.strict()`
+
+    :param tree: Strict SumTree
+    :return: List of values
+    """
+    node = _to_lists(tree)
+    return [_decode_sum(node, row, None) for row in range(tree.rows())]
+
+
+def encode(value):
+    """
+    Encodes value to a strict TensorTree with one row
+
+    :param value: Value
+    :return: SumTree
+    """
+    return _encode_rows([value])
+
+
+class DiscreteEngine:
+    """
+    Evaluates network on strict inputs as the functional program it was compiled from.
+
+    Equal rows of input are evaluated once. Distinct rows are decoded to values and evaluated in lockstep:
+    only the matching case of GuardedLayer is executed, constructors and constants are evaluated directly.
+    Evaluations stop at TrainableLayers, which are evaluated by the network for distinct arguments of all rows
+    at once and hardened, results are cached for every distinct argument.
+
+    Rows that can't be evaluated exactly fall back to the usual evaluation followed by `strict()`:
+    inputs which aren't strict, several matching cases, calls of mismatch or depth handlers, tail recursion,
+    ensembles, results of TrainableLayers that differ from their strict version by more than `saturation` and
+    results of GuardedLayers with several cases, which contain operands truncated by the depth of TrainableLayers:
+    cases which don't match are multiplied by zero and added, so their children fill truncated operands,
+    see `TensorTree.cadd`. Inputs are assumed to be complete: a constructor without children has no operands.
+    Depth of recursion is counted for calls of the row itself.
+    Rows are evaluated as if every row was passed to the network alone.
+    """
+
+    def __init__(self, net, saturation=1e-3):
+        self.net = net
+        self.saturation = saturation
+        self.evaluated = 0
+        self.fallbacks = 0
+        self._cache = {}
+        # Handlers of modules which compute values at once
+        self._values = {
+            ConstantLayer: self._constant,
+            ConstructorLayer: self._constructor,
+            VariableLayer.Data: self._data,
+            VariableLayer.Net: self._net,
+            VariableLayer.External: self._external,
+        }
+        # Handlers of modules which evaluate other modules, they are generators, see `_drive`
+        self._handlers = {
+            AnonymousNetLayer: self._anonymous,
+            ApplicationLayer: self._application,
+            GuardedLayer: self._guarded,
+            RecursiveLayer: self._recursive,
+            TrainableLayer: self._trainable,
+            FoldedLayer: self._folded,
+            _Recursion: self._recursion,
+        }
+
+    def run(self, *trees):
+        """
+        Evaluates the network
+
+        :param trees: TensorTrees - arguments of the network, passed as to `FunctionalModule.call`
+        :return: List of values - results for every row
+        """
+        if len(trees) == 1 and isinstance(trees[0], list):
+            trees = trees[0]
+            wrap = True
+        else:
+            wrap = len(trees) > 1
+        rows = trees[0].rows()
+        if rows == 0:
+            return []
+        # Knobs of the network, e.g. case_eps, apply to the interpreter as to calls of the network
+        with torch.no_grad(), using_config(getattr(self.net, 'runtime_config', None)):
+            first, inverse = _distinct_rows(trees)
+            inputs = [_to_lists(tree.select_rows(first)) for tree in trees]
+
+            results = [_FALLBACK] * len(inputs[0][0])
+            tasks = {}
+            for index in range(len(results)):
+                try:
+                    values = [_decode_sum(node, index, 0.0) for node in inputs]
+                except (_Fallback, RecursionError):
+                    continue
+                if not wrap:
+                    # The only tree is a tuple of arguments
+                    _, _, operands = values[0]
+                    if not isinstance(operands, tuple):
+                        continue
+                    values = list(operands)
+                tasks[index] = self._evaluate(self.net, _Bag(values, []))
+            self._drive(tasks, results)
+
+            fallback = [index for (index, result) in enumerate(results) if result is _FALLBACK]
+            if len(fallback) > 0:
+                index = first[torch.tensor(fallback, dtype=torch.long, device=first.device)]
+                selected = [tree.select_rows(index) for tree in trees]
+                result = self.net.call(selected) if wrap else self.net.call(selected[0])
+                for (distinct, value) in zip(fallback, decode(result.strict())):
+                    results[distinct] = value
+
+        fallback = set(fallback)
+        row_results = []
+        fallback_rows = 0
+        for distinct in inverse.tolist():
+            row_results.append(results[distinct])
+            if distinct in fallback:
+                fallback_rows += 1
+        self.evaluated += rows - fallback_rows
+        self.fallbacks += fallback_rows
+        return row_results
+
+    def check(self, *trees):
+        """
+        Checks that results of this engine are equal to results of the network followed by `strict()`
+
+        :param trees: TensorTrees - arguments of the network
+        :return: True if results are equal
+        """
+        with torch.no_grad():
+            expected = decode(self.net.call(*trees).strict())
+        return self.run(*trees) == expected
+
+    def clear_cache(self):
+        """
+        Clears cached results of TrainableLayers. Should be called after change of weights
+        """
+        self._cache = {}
+
+    def _drive(self, tasks, results):
+        """
+        Runs evaluations of rows in lockstep. An evaluation stops at a TrainableLayer, which result isn't cached,
+        stopped evaluations are resumed when all of them stop, after the layers are evaluated for all requested
+        arguments at once
+
+        :param tasks: Dict with generators of results by indices of rows
+        :param results: List of results, which is filled for rows that don't fall back
+        """
+        waiting = {}
+        for (index, task) in tasks.items():
+            self._resume(index, task, None, results, waiting)
+        while len(waiting) > 0:
+            requests = {}
+            for (_, (module, values)) in waiting.values():
+                requests.setdefault(module, {})[values] = None
+            for (module, arguments) in requests.items():
+                self._evaluate_trainable(module, list(arguments))
+            current, waiting = waiting, {}
+            for (index, (task, (module, values))) in current.items():
+                self._resume(index, task, self._cache[(id(module), values)], results, waiting)
+
+    @staticmethod
+    def _resume(index, task, value, results, waiting):
+        try:
+            request = task.send(value)
+        except StopIteration as stop:
+            results[index] = _complete(stop.value)
+        except (_Fallback, RecursionError):
+            pass
+        else:
+            waiting[index] = (task, request)
+
+    def _evaluate(self, module, bag):
+        handler = self._values.get(type(module))
+        if handler is not None:
+            return handler(module, bag)
+        handler = self._handlers.get(type(module))
+        if handler is None:
+            raise _Fallback()
+        return (yield from handler(module, bag))
+
+    def _anonymous(self, module, bag):
+        return (yield from self._evaluate(module.net, bag))
+
+    def _application(self, module, bag):
+        called = []
+        for (i, operand) in enumerate(module.operands):
+            if i in module.call:
+                operand = yield from self._evaluate(operand, bag)
+            called.append(operand)
+        for i in range(1, len(called)):
+            if i in module.constants:
+                called[i] = yield from self._evaluate(called[i], bag)
+
+        net = called[0]
+        pointer = getattr(net, 'pointer', None)
+        if pointer is None:
+            raise _Fallback()
+        data = [called[i] for i in range(1, len(called)) if i in module.data]
+        nets = [called[i] for i in range(1, len(called)) if i in module.nets]
+        before, _ = bag.split(pointer)
+        return (yield from self._evaluate(net, before.append(_Bag(data, nets))))
+
+    def _constant(self, module, bag):
+        return module.position, module.length, None
+
+    def _constructor(self, module, bag):
+        return module.position, module.length, tuple(bag.values)
+
+    def _guarded(self, module, bag):
+        before, after = bag.split(module.pointer)
+        argument = (0, 1, tuple(after.values))
+        matched = None
+        for case in module.cases:
+            bound = []
+            if _match(case.pattern, argument, bound):
+                if matched is not None:
+                    # Results of several cases are mixed
+                    raise _Fallback()
+                matched = (case, bound)
+        if matched is None:
+            # Mismatch handler returns zero object
+            raise _Fallback()
+        case, bound = matched
+        result = yield from self._evaluate(case.net, before.append(_Bag(bound, after.nets)))
+        if len(module.cases) > 1 and _has_missing(result):
+            # Children of other cases fill truncated operands
+            raise _Fallback()
+        return result
+
+    def _recursive(self, module, bag):
+        if module.is_tail_recursive:
+            # Recursive calls return nothing inside the loop of TailRecursiveLayer, so cases with them are dropped
+            raise _Fallback()
+        recursion = _Recursion(
+            module.net, DataPointer(module.pointer.data, module.pointer.nets + 1), current_config().recursion_depth
+        )
+        return (yield from self._evaluate(recursion, _Bag(bag.values, [recursion, *bag.nets])))
+
+    def _recursion(self, recursion, bag):
+        recursion.calls += 1
+        if recursion.calls > recursion.limit:
+            # Depth handler returns zero object
+            raise _Fallback()
+        return (yield from self._evaluate(recursion.net, bag))
+
+    def _trainable(self, module, bag):
+        if module.ensemble is not None:
+            # Rows of ensembles are grouped by members
+            raise _Fallback()
+        values = tuple(bag.values)
+        key = (id(module), values)
+        if key in self._cache:
+            result = self._cache[key]
+        else:
+            result = yield module, values
+        if result is None:
+            raise _Fallback()
+        return result
+
+    def _evaluate_trainable(self, module, arguments):
+        """
+        Evaluates TrainableLayer for distinct arguments at once and caches hardened results,
+        None is cached for arguments which can't be evaluated exactly
+        """
+        result_type = _result_type(module)
+        rows = []
+        for values in arguments:
+            self._cache[(id(module), values)] = None
+            if result_type is not None and all(isinstance(value, tuple) for value in values):
+                rows.append(values)
+        if len(rows) == 0:
+            return
+        like = module.bias.tensor
+        tree = make_tuple([_encode_rows(list(column), like) for column in zip(*rows)])
+        result = _to_lists(module.forward(DataBag(tree, [], len(rows))))
+        spec, types = result_type
+        for (row, values) in enumerate(rows):
+            try:
+                self._cache[(id(module), values)] = _decode_sum(result, row, self.saturation, spec, types)
+            except _Fallback:
+                pass
+
+    def _data(self, module, bag):
+        return bag.values[module.position]
+
+    def _net(self, module, bag):
+        return bag.nets[module.position]
+
+    def _external(self, module, bag):
+        return module.net
+
+    def _folded(self, module, bag):
+        return (yield from self._evaluate(module.module, bag))
+
+
+class _Fallback(Exception):
+    """
+    Row can't be evaluated exactly
+    """
+    pass
+
+
+class _Missing:
+    """
+    Operand which is present, but it's value is truncated, e.g. by the depth of results of TrainableLayer
+    """
+
+    def __repr__(self):
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+
+# Result of a row which falls back
+_FALLBACK = object()
+
+
+class _Bag:
+    """
+    DataBag of one row with decoded values
+    """
+
+    def __init__(self, values, nets):
+        self.values = values
+        self.nets = nets
+
+    def split(self, pointer):
+        return (
+            _Bag(self.values[:pointer.data], self.nets[:pointer.nets]),
+            _Bag(self.values[pointer.data:], self.nets[pointer.nets:])
+        )
+
+    def append(self, bag):
+        return _Bag([*self.values, *bag.values], [*self.nets, *bag.nets])
+
+
+class _Recursion:
+    """
+    Reference of recursive network on itself
+    """
+
+    def __init__(self, net, pointer, limit):
+        self.net = net
+        self.pointer = pointer
+        self.limit = limit
+        self.calls = 0
+
+
+def _match(pattern, value, bound):
+    if isinstance(pattern, VarPattern):
+        bound.append(value)
+        return True
+    if value is None or value is _MISSING:
+        # Presence of missing operand depends on it's content
+        raise _Fallback()
+    constructor, _, operands = value
+    if isinstance(pattern, LitPattern):
+        return constructor == pattern.position
+    if isinstance(pattern, ConstructorPattern):
+        if constructor != pattern.position:
+            return False
+        if not isinstance(operands, tuple):
+            raise _Fallback()
+        for (operand_pattern, operand) in zip(pattern.operands, operands):
+            if not _match(operand_pattern, operand, bound):
+                return False
+        return True
+    raise _Fallback()
+
+
+def _to_lists(tree):
+    # Converts tensors of the tree to lists once, so rows are decoded without tensor operations
+    children = [None if child is None else _to_lists(child) for child in tree.children]
+    return tree.tensor.detach().tolist(), children
+
+
+def _decode_sum(node, row, tolerance, spec=None, types=None):
+    """
+    Decodes value of a row of SumTree. If tolerance is None, the tree is assumed to be strict, otherwise
+    _Fallback is raised if the row differs from a strict one by more than tolerance, and operands which are present
+    without children are decoded as _MISSING.
+
+    :param spec: TypeSpec of the value, if it's known, chosen constructors with operands and without children
+        are decoded with _MISSING operands. Otherwise such constructors are assumed to have no operands
+    :param types: Tuple - defined types and values of type variables
+    """
+    rows, children = node
+    values = rows[row]
+    if len(values) == 0:
+        raise _Fallback()
+    constructor = max(range(len(values)), key=values.__getitem__)
+    if tolerance is not None:
+        for (column, value) in enumerate(values):
+            expected = 1.0 if column == constructor else 0.0
+            if abs(value - expected) > tolerance:
+                raise _Fallback()
+    child = children[constructor]
+    operand_spec = None if spec is None else spec.operands[constructor]
+    if child is None:
+        if operand_spec is not None and not isinstance(operand_spec, LitSpec):
+            # Children of the constructor are truncated
+            return constructor, len(values), _MISSING
+        return constructor, len(values), None
+    return constructor, len(values), _decode_prod(child, row, tolerance, operand_spec, types)
+
+
+def _decode_prod(node, row, tolerance, spec=None, types=None):
+    rows, children = node
+    operands = []
+    for (position, (value, child)) in enumerate(zip(rows[row], children)):
+        present = value > 0.5
+        if tolerance is not None and abs(value - (1.0 if present else 0.0)) > tolerance:
+            raise _Fallback()
+        if not present:
+            operands.append(None)
+        elif child is None:
+            # Structure of operand is unknown
+            operands.append(None if tolerance is None else _MISSING)
+        else:
+            operand_spec, operand_types = _operand_type(spec, position, types)
+            operands.append(_decode_sum(child, row, tolerance, operand_spec, operand_types))
+    return tuple(operands)
+
+
+def _operand_type(spec, position, types):
+    """
+    :return: Tuple - TypeSpec of an operand of product and defined types with values of it's type variables,
+        Nones if the type is unknown
+    """
+    if spec is None:
+        return None, None
+    defined_types, params = types
+    operand = substitute(spec.operands[position], params)
+    if not isinstance(operand, ExtSpec) or operand.name not in defined_types:
+        return None, None
+    return defined_types[operand.name], (defined_types, {**params, **operand.args})
+
+
+def _result_type(module):
+    """
+    :return: Tuple - TypeSpec of results of TrainableLayer and types for `_decode_sum`, None if it's unknown
+    """
+    spec, types = _operand_type(module.to_type.operands[0], 0, (module.defined_types, {}))
+    return None if spec is None else (spec, types)
+
+
+def _has_missing(value):
+    if value is _MISSING:
+        return True
+    if value is None:
+        return False
+    _, _, operands = value
+    if operands is _MISSING:
+        return True
+    return operands is not None and any(_has_missing(operand) for operand in operands)
+
+
+def _complete(value):
+    # Missing operands are decoded from results of the network as absent
+    if value is None or value is _MISSING:
+        return None
+    constructor, size, operands = value
+    if not isinstance(operands, tuple):
+        return constructor, size, None
+    return constructor, size, tuple(_complete(operand) for operand in operands)
+
+
+def _encode_rows(values, like=None):
+    """
+    Encodes values to rows of a strict SumTree, operands of other rows are filled by zeros
+
+    :param values: List of values or Nones for rows of zeros
+    :param like: Tensor, which type and device are used
+    :return: SumTree
+    """
+    size = next(value[1] for value in values if value is not None)
+    tensor = _new_zeros(len(values), size, like)
+    chosen = [(row, value[0]) for (row, value) in enumerate(values) if value is not None]
+    tensor[[row for (row, _) in chosen], [column for (_, column) in chosen]] = 1
+    children = []
+    for column in range(size):
+        operands = [
+            value[2] if value is not None and value[0] == column and isinstance(value[2], tuple) else None
+            for value in values
+        ]
+        children.append(None if all(row is None for row in operands) else _encode_product(operands, like))
+    return SumTree(tensor, children)
+
+
+def _encode_product(operands, like):
+    width = next(len(row) for row in operands if row is not None)
+    presence = [
+        [0.0 if row is None or row[position] is None else 1.0 for position in range(width)] for row in operands
+    ]
+    tensor = _new_zeros(len(operands), width, like)
+    tensor.copy_(torch.tensor(presence))
+    children = []
+    for position in range(width):
+        values = [
+            row[position] if row is not None and isinstance(row[position], tuple) else None for row in operands
+        ]
+        children.append(None if all(value is None for value in values) else _encode_rows(values, like))
+    return ProdTree(tensor, children)
+
+
+def _new_zeros(rows, columns, like):
+    return torch.zeros(rows, columns) if like is None else like.new_zeros(rows, columns)
+
+
+def _distinct_rows(trees):
+    """
+    :return: Tuple - tensor with indices of the first rows with distinct contents and list with index of
+        distinct contents for every row
+    """
+    tensors = []
+    for tree in trees:
+        _collect_tensors(tree, tensors)
+    rows = tensors[0].size()[0]
+    columns = torch.cat([tensor.reshape(rows, -1).to(tensors[0].dtype) for tensor in tensors], 1)
+    _, inverse = torch.unique(columns, dim=0, return_inverse=True)
+    distinct = int(inverse.max().item()) + 1
+    positions = torch.arange(rows, device=inverse.device)
+    first = torch.full((distinct,), rows, dtype=torch.long, device=inverse.device)
+    first = first.scatter_reduce(0, inverse, positions, 'amin')
+    return first, inverse
+
+
+def _collect_tensors(tree, tensors):
+    tensors.append(tree.tensor)
+    for child in tree.children:
+        if child is not None:
+            _collect_tensors(child, tensors)
@@ -0,0 +1,262 @@
+import os
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.utils.data.distributed import DistributedSampler
+
+from .loader import tree_loader
+
+
+class GradientBuckets:
+    """
+    Averages gradients of parameters of a network between processes.
+
+    Small parameters of TrainableLayers are grouped into a few contiguous buffers, so every buffer is reduced
+    by one all-reduce. Buffer is reduced as soon as gradients of all it's parameters are computed, so
+    communication overlaps with the rest of backward propagation. Buffers are always reduced in the same
+    order, so processes with different unused parameters don't deadlock
+    """
+
+    BUCKET_SIZE = 1 << 18   # Number of elements in a buffer
+
+    def __init__(self, module, bucket_size=None, process_group=None):
+        if bucket_size is None:
+            bucket_size = self.BUCKET_SIZE
+        self.process_group = process_group
+        self.buckets = []
+        self.next_bucket = 0
+        self.active = False
+
+        # Gradients of the last parameters are usually computed first
+        parameters = [param for param in module.parameters() if param.requires_grad]
+        parameters.reverse()
+        current = []
+        current_size = 0
+        for param in parameters:
+            if len(current) > 0 and (current_size + param.numel() > bucket_size or param.dtype != current[0].dtype):
+                self.buckets.append(_Bucket(current))
+                current = []
+                current_size = 0
+            current.append(param)
+            current_size += param.numel()
+        if len(current) > 0:
+            self.buckets.append(_Bucket(current))
+
+        for bucket in self.buckets:
+            for (index, param) in enumerate(bucket.parameters):
+                param.register_hook(self._make_hook(bucket, index))
+
+    def prepare(self):
+        """
+        Should be called before every backward propagation
+        """
+        for bucket in self.buckets:
+            bucket.reset()
+        self.next_bucket = 0
+        self.active = True
+
+    def finish(self):
+        """
+        Waits for reduction of all buffers and stores averaged gradients in parameters.
+        Should be called after every backward propagation
+        """
+        self.active = False
+        # Parameters that weren't used in this process have zero gradients
+        for bucket in self.buckets[self.next_bucket:]:
+            bucket.fill_missing()
+        self._launch(len(self.buckets))
+
+        world_size = dist.get_world_size(self.process_group)
+        for bucket in self.buckets:
+            bucket.handle.wait()
+            bucket.buffer.div_(world_size)
+            bucket.store()
+
+    def _make_hook(self, bucket, index):
+        def hook(grad):
+            if self.active:
+                bucket.put(index, grad)
+                if bucket.pending == 0:
+                    self._launch_ready()
+            return grad
+        return hook
+
+    def _launch_ready(self):
+        last = self.next_bucket
+        while last < len(self.buckets) and self.buckets[last].pending == 0:
+            last += 1
+        self._launch(last)
+
+    def _launch(self, last):
+        for bucket in self.buckets[self.next_bucket:last]:
+            bucket.handle = dist.all_reduce(bucket.buffer, group=self.process_group, async_op=True)
+        self.next_bucket = max(self.next_bucket, last)
+
+
+class _Bucket:
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.offsets = []
+        size = 0
+        for param in parameters:
+            self.offsets.append(size)
+            size += param.numel()
+        first = parameters[0]
+        self.buffer = torch.zeros(size, dtype=first.dtype, device=first.device)
+        self.ready = [False] * len(parameters)
+        self.pending = len(parameters)
+        self.handle = None
+
+    def reset(self):
+        self.ready = [False] * len(self.parameters)
+        self.pending = len(self.parameters)
+        self.handle = None
+
+    def put(self, index, grad):
+        self._slot(index).copy_(grad.reshape(-1))
+        if not self.ready[index]:
+            self.ready[index] = True
+            self.pending -= 1
+
+    def fill_missing(self):
+        for (index, ready) in enumerate(self.ready):
+            if not ready:
+                self._slot(index).zero_()
+                self.ready[index] = True
+        self.pending = 0
+
+    def store(self):
+        for (index, param) in enumerate(self.parameters):
+            averaged = self._slot(index).view_as(param)
+            if param.grad is None:
+                param.grad = averaged.clone()
+            else:
+                param.grad.copy_(averaged)
+
+    def _slot(self, index):
+        return self.buffer.narrow(0, self.offsets[index], self.parameters[index].numel())
+
+
+def broadcast_parameters(module, src=0, process_group=None):
+    """
+    Copies parameters of the module from one process to all others, so all replicas start equal
+
+    :param module: Module
+    :param src: Rank of the source process
+    :param process_group: Process group
+    """
+    parameters = list(module.parameters())
+    if len(parameters) == 0:
+        return
+    with torch.no_grad():
+        flat = torch.cat([param.detach().reshape(-1) for param in parameters])
+        dist.broadcast(flat, src, group=process_group)
+        offset = 0
+        for param in parameters:
+            param.copy_(flat.narrow(0, offset, param.numel()).view_as(param))
+            offset += param.numel()
+
+
+class DataParallelTrainer:
+    """
+    Trains a network in many processes. Every process computes gradients on it's shard of data, gradients
+    are averaged between processes before every step of optimizer
+    """
+
+    def __init__(self, net, loss, optimizer, bucket_size=None, process_group=None):
+        self.net = net
+        self.loss = loss
+        self.optimizer = optimizer
+        self.bucket_size = bucket_size
+        self.process_group = process_group
+        broadcast_parameters(net, process_group=process_group)
+        self.buckets = GradientBuckets(net, bucket_size, process_group)
+
+    def rebuild(self, optimizer):
+        """
+        Should be called after parameters of the network are replaced, e.g. by `select_members`: buffers of
+        gradients are created for the new parameters, the old ones aren't reduced anymore
+
+        :param optimizer: Optimizer of the new parameters
+        """
+        self.optimizer = optimizer
+        self.buckets = GradientBuckets(self.net, self.bucket_size, self.process_group)
+
+    def step(self, inputs, expected):
+        """
+        Makes one step of training
+
+        :param inputs: List of TensorTrees - arguments of the network
+        :param expected: Expected result
+        :return: Value of loss in this process
+        """
+        self.optimizer.zero_grad()
+        self.buckets.prepare()
+        result = self.net.call(*inputs)
+        loss = self.loss(result, expected)
+        loss.backward()
+        self.buckets.finish()
+        self.optimizer.step()
+        return loss.item()
+
+
+def distributed_loader(dataset, batch_size=1, shuffle=True, seed=0, process_group=None, **kwargs):
+    """
+    Creates loader that gives every process it's own shard of the dataset
+
+    :param dataset: TreeDataset or any Dataset of TensorTrees
+    :param batch_size: Number of rows in a batch of one process
+    :param shuffle: Shuffle rows every epoch
+    :param seed: Seed of shuffling, should be equal in all processes
+    :param kwargs: Arguments of `tree_loader`
+    :return: Tuple - loader and sampler. Call `sampler.set_epoch(epoch)` before every epoch
+    """
+    sampler = DistributedSampler(
+        dataset,
+        num_replicas=dist.get_world_size(process_group),
+        rank=dist.get_rank(process_group),
+        shuffle=shuffle,
+        seed=seed
+    )
+    return tree_loader(dataset, batch_size, sampler=sampler, **kwargs), sampler
+
+
+def init_process_group(rank, world_size, master_addr='127.0.0.1', master_port=29500, threads=None):
+    """
+    Initialises gloo process group of this process. Address and port are always taken from arguments,
+    not from MASTER_ADDR and MASTER_PORT variables of the environment
+
+    :param rank: Rank of this process
+    :param world_size: Number of processes
+    :param master_addr: Address of the process with rank 0
+    :param master_port: Port of the process with rank 0
+    :param threads: Number of threads used by this process
+    """
+    if threads is not None:
+        torch.set_num_threads(threads)
+    init_method = 'tcp://{}:{}'.format(master_addr, master_port)
+    dist.init_process_group('gloo', init_method=init_method, rank=rank, world_size=world_size)
+
+
+def launch(func, world_size, *args, master_port=29500):
+    """
+    Runs function in `world_size` local processes connected by gloo process group.
+    Cores of this host are divided equally between processes.
+
+    :param func: Function, called as `func(rank, world_size, *args)`
+    :param world_size: Number of processes
+    :param args: Other arguments of function
+    :param master_port: Free port used for connection of processes
+    """
+    threads = max(1, (os.cpu_count() or 1) // world_size)
+    mp.spawn(_run, args=(func, world_size, master_port, threads, args), nprocs=world_size, join=True)
+
+
+def _run(rank, func, world_size, master_port, threads, args):
+    init_process_group(rank, world_size, master_port=master_port, threads=threads)
+    try:
+        func(rank, world_size, *args)
+    finally:
+        dist.destroy_process_group()
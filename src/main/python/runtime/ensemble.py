@@ -0,0 +1,53 @@
+from .modules import TrainableLayer
+from .trees import stack
+
+
+def ensemble_input(tree, members):
+    """
+    Repeats rows of the tree for every member of ensemble
+
+    :param tree: TensorTree
+    :param members: Number of members of ensemble
+    :return: TensorTree
+    """
+    return stack([tree] * members)
+
+
+def member_losses(loss, result, expected, members):
+    """
+    Computes loss of every member of ensemble
+
+    :param loss: StructuredLoss
+    :param result: Result of the ensemble
+    :param expected: Expected result, rows are not repeated for members
+    :param members: Number of members of ensemble
+    :return: Tensor with loss of every member
+    """
+    rows = loss.row_losses(result, ensemble_input(expected, members))
+    return rows.view(members, -1).sum(1)
+
+
+def trainable_layers(net):
+    """
+    Finds all TrainableLayers of the network
+
+    :param net: FunctionalModule
+    :return: List of TrainableLayers
+    """
+    return [module for module in net.modules() if isinstance(module, TrainableLayer)]
+
+
+def select_members(net, indices):
+    """
+    Keeps only specified members of ensembles in all TrainableLayers of the network, e.g. to prune members
+    with the highest loss. Parameters are replaced, so optimizers should be recreated with the returned
+    parameters, see `TrainableLayer.select_members`
+
+    :param net: FunctionalModule
+    :param indices: List of indices of members
+    :return: List of new parameters
+    """
+    parameters = []
+    for layer in trainable_layers(net):
+        parameters.extend(layer.select_members(indices))
+    return parameters
@@ -19,3 +19,36 @@ class UnsupportedTypeForZeroObjectCreation(ValueError):
         super(UnsupportedTypeForZeroObjectCreation, self).__init__(
             "Can't create a zero object of type: " + str(spec)
         )
+
+
+class DiagnosticsBudgetExceeded(ValueError):
+    def __init__(self, kind, count, budget):
+        super(DiagnosticsBudgetExceeded, self).__init__(
+            'Number of ' + kind + ' (' + str(count) + ') exceeds the budget (' + str(budget) + ')'
+        )
+        self.kind = kind
+        self.count = count
+        self.budget = budget
+
+
+class EnsembleRowsMismatch(ValueError):
+    def __init__(self, rows, members):
+        super(EnsembleRowsMismatch, self).__init__(
+            'Number of rows (' + str(rows) + ') is not divisible by the number of members of ensemble (' +
+            str(members) + ')'
+        )
+        self.rows = rows
+        self.members = members
+
+
+class EnsembleRowSelection(ValueError):
+    def __init__(self):
+        super(EnsembleRowSelection, self).__init__(
+            'Ensembles require groups of rows of members, cases of GuardedLayers must not select rows'
+        )
+
+
+class ExportMismatch(ValueError):
+    def __init__(self, check):
+        super(ExportMismatch, self).__init__('Exported network differs from the runtime: ' + str(check))
+        self.check = check
@@ -0,0 +1,266 @@
+import json
+from contextlib import contextmanager
+
+import torch
+
+from .config import current_config, using_config
+from .data import DataBag
+from .errors import ExportMismatch
+from .trees import make_tuple, pack, unpack
+
+
+class FlatModule(torch.nn.Module):
+    """
+    Network with flat tensors as inputs and output, which can be traced to TorchScript or ONNX.
+    Inputs are unpacked to trees by descriptors of the example, output is packed, it's descriptor is remembered
+    """
+
+    def __init__(self, net, input_descriptors, wrapped=False):
+        """
+        :param wrapped: Inputs are a list of arguments, so even a single input is wrapped into a tuple, as by
+            `FunctionalModule.call`
+        """
+        super().__init__()
+        self.net = net
+        self.input_descriptors = input_descriptors
+        self.wrapped = wrapped
+        self.output_descriptor = None
+
+    def forward(self, *flats):
+        trees = [unpack(flat, descriptor) for (flat, descriptor) in zip(flats, self.input_descriptors)]
+        data = trees[0] if len(trees) == 1 and not self.wrapped else make_tuple(trees)
+        # Forward is called directly, so temporary tensors aren't taken from the arena and captured by the trace
+        with using_config(getattr(self.net, 'runtime_config', None)):
+            result = self.net.forward(DataBag(data))
+        flat, descriptor = pack(result)
+        # Sizes are traced tensors during tracing, the descriptor of the first call is kept
+        if not torch.jit.is_tracing():
+            self.output_descriptor = descriptor
+        return flat
+
+
+class ExportedNetwork:
+    """
+    Exported TorchScript module with descriptors of structure of it's inputs and output.
+
+    The module is traced for the structure and the number of rows of the example. The trace doesn't depend on
+    values of inputs: it's made with zero `operator_eps` and without selection of rows of cases, see `export`,
+    so every case of GuardedLayers and every child is evaluated. Depth of recursion is given by the structure.
+    Networks returned by `export` are traced again for other numbers of rows, networks loaded from files accept
+    only the number of rows of the example. Descriptors are saved with the module, so runtimes without Python
+    can pack inputs and unpack output
+    """
+
+    DESCRIPTORS = 'descriptors.json'
+
+    def __init__(self, module, input_descriptors, output_descriptor, tracer=None):
+        """
+        :param tracer: Function `tracer(flats, descriptors)`, which traces the network for inputs with another
+            number of rows and returns a tuple - module and descriptor of output
+        """
+        self.module = module
+        self.input_descriptors = input_descriptors
+        self.output_descriptor = output_descriptor
+        self._tracer = tracer
+        # Modules and descriptors of outputs by numbers of rows
+        self._traces = {}
+
+    def __call__(self, *trees):
+        """
+        :param trees: TensorTrees with the structure of the example, passed as to the example
+        :return: TensorTree
+        """
+        flats = []
+        descriptors = []
+        for tree in _arguments(trees)[0]:
+            flat, descriptor = pack(tree)
+            flats.append(flat)
+            descriptors.append(descriptor)
+        module, output_descriptor = self._module(flats, descriptors)
+        with torch.no_grad():
+            return unpack(module(*flats), output_descriptor)
+
+    def _module(self, flats, descriptors):
+        if list(descriptors) == list(self.input_descriptors):
+            return self.module, self.output_descriptor
+        if [_structure(descriptor) for descriptor in descriptors] != \
+                [_structure(descriptor) for descriptor in self.input_descriptors]:
+            raise ValueError('Structure of the input differs from the structure of the example')
+        rows = _rows(descriptors)
+        if self._tracer is None:
+            raise ValueError('Module is traced for ' + str(_rows(self.input_descriptors)) + ' rows, not for ' +
+                             str(rows) + ', export the network for them')
+        if rows not in self._traces:
+            self._traces[rows] = self._tracer(flats, descriptors)
+        return self._traces[rows]
+
+    def save(self, path):
+        """
+        Saves the module traced for the example with descriptors
+        """
+        descriptors = {'inputs': self.input_descriptors, 'output': self.output_descriptor}
+        torch.jit.save(self.module, path, _extra_files={self.DESCRIPTORS: json.dumps(descriptors)})
+
+    @staticmethod
+    def load(path):
+        extra_files = {ExportedNetwork.DESCRIPTORS: ''}
+        module = torch.jit.load(path, _extra_files=extra_files)
+        descriptors = json.loads(extra_files[ExportedNetwork.DESCRIPTORS])
+        inputs = [_descriptor_from_json(descriptor) for descriptor in descriptors['inputs']]
+        return ExportedNetwork(module, inputs, _descriptor_from_json(descriptors['output']))
+
+
+def _arguments(inputs):
+    """
+    :param inputs: Arguments of `FunctionalModule.call`: TensorTrees or one list of them
+    :return: Tuple - list of TensorTrees and whether they are wrapped into a list
+    """
+    if len(inputs) == 1 and isinstance(inputs[0], (list, tuple)):
+        return list(inputs[0]), True
+    return list(inputs), False
+
+
+def _descriptor_from_json(descriptor):
+    if descriptor is None:
+        return None
+    kind, shape, children = descriptor
+    return kind, tuple(shape), tuple(_descriptor_from_json(child) for child in children)
+
+
+def _structure(descriptor):
+    """
+    :return: Descriptor without numbers of rows
+    """
+    if descriptor is None:
+        return None
+    kind, shape, children = descriptor
+    return kind, tuple(shape[1:]), tuple(_structure(child) for child in children)
+
+
+def _rows(descriptors):
+    _, shape, _ = descriptors[0]
+    return shape[0]
+
+
+@contextmanager
+def _export_config(net, recursion_depth):
+    """
+    Replaces configuration of the network, so decisions of the runtime don't depend on values of inputs:
+    children aren't skipped by `operator_eps` and cases are evaluated on all rows
+    """
+    config = getattr(net, 'runtime_config', None) or current_config()
+    previous = getattr(net, 'runtime_config', None)
+    changes = {'operator_eps': 0.0, 'select_rows': False}
+    if recursion_depth is not None:
+        changes.update(recursion_depth=recursion_depth, tail_recursion_depth=recursion_depth)
+    # Configuration of the network is activated by it's calls, so it's replaced for the export
+    net.runtime_config = config.replace(**changes)
+    try:
+        with using_config(net.runtime_config):
+            yield
+    finally:
+        net.runtime_config = previous
+
+
+def _trace(net, flats, descriptors, wrapped, recursion_depth, onnx_path=None, opset_version=None):
+    """
+    :return: Tuple - traced module and descriptor of it's output
+    """
+    module = FlatModule(net, descriptors, wrapped)
+    with torch.no_grad(), _export_config(net, recursion_depth):
+        # Caches of constants are filled before tracing, so they are captured as constants
+        module(*flats)
+        script = torch.jit.trace(module, tuple(flats), check_trace=False)
+        if onnx_path is not None:
+            torch.onnx.export(
+                module, tuple(flats), onnx_path, opset_version=opset_version,
+                input_names=['input_' + str(i) for i in range(len(flats))], output_names=['output']
+            )
+    return script, module.output_descriptor
+
+
+def export(net, *inputs, path=None, onnx_path=None, recursion_depth=None, opset_version=None, check=True, atol=1e-5):
+    """
+    Exports the network to TorchScript and optionally to ONNX. TrainableLayers, cases of GuardedLayers and
+    recursion, unrolled up to the depth reached by the example, are exported as tensor operations.
+    The exported network is equal to the runtime with zero `operator_eps` and without selection of rows,
+    see `ExportedNetwork`
+
+    :param net: FunctionalModule
+    :param inputs: Example TensorTrees - arguments of the network, passed as to `FunctionalModule.call`
+    :param path: Path of the TorchScript file with descriptors
+    :param onnx_path: Path of the ONNX graph, inputs are named input_0, input_1, ..., output - output.
+        It has the number of rows of the example
+    :param recursion_depth: Limit of depth of recursion for the export, by default - limits of recursive layers
+    :param check: Compare results of the exported module and the runtime on the example
+    :param atol: Allowed absolute difference of results
+    :return: ExportedNetwork
+    """
+    descriptors = []
+    flats = []
+    trees, wrapped = _arguments(inputs)
+    for tree in trees:
+        flat, descriptor = pack(tree)
+        flats.append(flat)
+        descriptors.append(descriptor)
+    script, output_descriptor = _trace(net, flats, descriptors, wrapped, recursion_depth, onnx_path, opset_version)
+
+    def tracer(other_flats, other_descriptors):
+        return _trace(net, other_flats, other_descriptors, wrapped, recursion_depth)
+
+    exported = ExportedNetwork(script, descriptors, output_descriptor, tracer)
+    if check:
+        with _export_config(net, recursion_depth):
+            result = check_export(exported, net, *inputs, atol=atol)
+        if not result.ok():
+            raise ExportMismatch(result)
+    if path is not None:
+        exported.save(path)
+    return exported
+
+
+class ExportCheck:
+    """
+    Comparison of results of an exported network and of the runtime
+    """
+
+    def __init__(self, same_structure, max_difference, atol):
+        self.same_structure = same_structure
+        self.max_difference = max_difference
+        self.atol = atol
+
+    def ok(self):
+        return self.same_structure and self.max_difference <= self.atol
+
+    def __repr__(self):
+        return 'ExportCheck(same_structure=' + str(self.same_structure) + ', max_difference=' + \
+               str(self.max_difference) + ', atol=' + str(self.atol) + ')'
+
+
+def check_export(exported, net, *inputs, atol=1e-5):
+    """
+    Evaluates the exported network and the runtime on inputs and compares packed results. The runtime is
+    evaluated in the configuration of the export, see `export`
+
+    :param exported: ExportedNetwork
+    :param net: FunctionalModule
+    :param inputs: TensorTrees with the structure of the example, the number of rows may differ
+    :return: ExportCheck
+    """
+    flats = []
+    descriptors = []
+    for tree in _arguments(inputs)[0]:
+        flat, descriptor = pack(tree)
+        flats.append(flat)
+        descriptors.append(descriptor)
+    try:
+        module, output_descriptor = exported._module(flats, descriptors)
+    except ValueError:
+        return ExportCheck(False, float('inf'), atol)
+    with torch.no_grad(), _export_config(net, None):
+        expected, expected_descriptor = pack(net.call(*inputs))
+        actual = module(*flats)
+    if expected_descriptor != output_descriptor or expected.size() != actual.size():
+        return ExportCheck(False, float('inf'), atol)
+    max_difference = (expected - actual).abs().max().item() if expected.numel() > 0 else 0.0
+    return ExportCheck(True, max_difference, atol)
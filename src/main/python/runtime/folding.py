@@ -0,0 +1,109 @@
+import torch
+
+from .constants import ConstantCache
+from .data import DataBag
+from .modules import ApplicationLayer, ConstantLayer, TrainableLayer, VariableLayer, ZeroLayer
+from .modules.base import FunctionalModule
+from .trees import empty_tree
+
+
+class FoldedLayer(FunctionalModule):
+    """
+    Subgraph of a network, which result doesn't depend on data. It's evaluated once with one row, results for other
+    numbers of rows are broadcast views of it
+    """
+
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+        self._cache = ConstantCache(self._build)
+
+    def forward(self, data_bag):
+        return self._cache.get(data_bag.size, data_bag.data.tensor)
+
+    def _build(self, dtype):
+        with torch.no_grad():
+            tree = self.module.forward(DataBag(empty_tree(), [], 1))
+        return tree.apply(lambda tensor: tensor.to(dtype))
+
+    def clear(self):
+        """
+        Forgets the result, e.g. after change of weights of folded TrainableLayers
+        """
+        self._cache.clear()
+
+
+def fold_constants(net, frozen=False):
+    """
+    Replaces applications of networks, which results don't depend on data of the network, by FoldedLayers.
+    Application is folded if it calls a global network with constant arguments, and the called network and global
+    networks used by it don't contain TrainableLayers.
+
+    :param net: FunctionalModule
+    :param frozen: Fold applications of networks with TrainableLayers too, their weights must not change after it
+    :return: Number of folded applications
+    """
+    return _fold(net, frozen, set())
+
+
+def _fold(module, frozen, visited):
+    if id(module) in visited or isinstance(module, FoldedLayer):
+        return 0
+    visited.add(id(module))
+    folded = 0
+    for (name, child) in list(module._modules.items()):
+        if child is None:
+            continue
+        if isinstance(child, ApplicationLayer) and _is_constant(child, frozen):
+            _replace(module, child, FoldedLayer(child))
+            folded += 1
+        else:
+            folded += _fold(child, frozen, visited)
+    return folded
+
+
+def _replace(parent, old, new):
+    # Submodules are referenced both by registered names and by lists of operands or cases
+    for (name, child) in list(parent._modules.items()):
+        if child is old:
+            parent._modules[name] = new
+    for value in vars(parent).values():
+        if isinstance(value, list):
+            for (i, item) in enumerate(value):
+                if item is old:
+                    value[i] = new
+
+
+def _is_constant(module, frozen):
+    """
+    Checks that result of the module doesn't depend on data
+    """
+    if isinstance(module, (ConstantLayer, ZeroLayer, FoldedLayer)):
+        return True
+    if not isinstance(module, ApplicationLayer):
+        return False
+    callee = module.operands[0]
+    if 0 in module.call:
+        if not isinstance(callee, VariableLayer.External):
+            return False
+        callee = callee.net
+    if not _is_pure(callee, frozen):
+        return False
+    for (i, operand) in enumerate(module.operands[1:], 1):
+        if isinstance(operand, VariableLayer.External):
+            # Global network or global constant
+            if not _is_pure(operand.net, frozen):
+                return False
+        elif i not in module.call or not _is_constant(operand, frozen):
+            return False
+    return True
+
+
+def _is_pure(net, frozen):
+    """
+    Checks that the network is global and it's result depends only on it's arguments
+    """
+    pointer = getattr(net, 'pointer', None)
+    if pointer is None or pointer.data != 0 or pointer.nets != 0:
+        return False
+    return frozen or not any(isinstance(module, TrainableLayer) for module in net.modules())
@@ -0,0 +1,92 @@
+import torch
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+
+from .trees import stack
+from .trees.tensor_tree import TensorTree
+
+
+class TreeDataset(Dataset):
+    """
+    Dataset of stacked TensorTrees. Item of dataset is a tuple of trees with the same row of every tree,
+    e.g. arguments of the network and the expected result.
+
+    Dataset can be indexed by a list of rows, then it returns the whole batch at once
+    """
+
+    def __init__(self, *trees):
+        if len(trees) == 0:
+            raise ValueError('Dataset should contain at least one tree')
+        rows = trees[0].rows()
+        for tree in trees:
+            if tree.rows() != rows:
+                raise ValueError('Mismatching numbers of rows: ' + str(rows) + ' and ' + str(tree.rows()))
+        self.trees = trees
+        self.size = rows
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            index = [index]
+        rows = torch.as_tensor(index, dtype=torch.long)
+        return tuple(tree.select_rows(rows) for tree in self.trees)
+
+
+def collate_trees(samples):
+    """
+    Stacks samples - TensorTrees or tuples of TensorTrees - into batched TensorTrees
+
+    :param samples: List of samples
+    :return: TensorTree or tuple of TensorTrees
+    """
+    first = samples[0]
+    if isinstance(first, TensorTree):
+        return stack(samples)
+    return tuple(stack(list(column)) for column in zip(*samples))
+
+
+def tree_loader(dataset, batch_size=1, shuffle=False, sampler=None, num_workers=0, prefetch=2, **kwargs):
+    """
+    Creates DataLoader that produces batches of TensorTrees. Batches are prepared by `num_workers` background
+    processes, every worker keeps at most `prefetch` batches ready. Trees are sent between processes as
+    single shared-memory blocks.
+
+    TreeDataset is indexed by a whole batch of rows in a worker, other datasets are indexed row by row and
+    collated with `stack`
+
+    :param dataset: TreeDataset or any Dataset of TensorTrees
+    :param batch_size: Number of rows in a batch
+    :param shuffle: Shuffle rows of dataset every epoch
+    :param sampler: Sampler of rows, e.g. DistributedSampler
+    :param num_workers: Number of background processes, 0 loads data in the main process
+    :param prefetch: Number of batches loaded in advance by every worker
+    :param kwargs: Other arguments of DataLoader
+    :return: DataLoader
+    """
+    if sampler is None:
+        sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    if num_workers > 0:
+        kwargs.setdefault('prefetch_factor', prefetch)
+        kwargs.setdefault('persistent_workers', True)
+    if isinstance(dataset, TreeDataset):
+        return DataLoader(
+            dataset,
+            batch_size=None,
+            sampler=BatchSampler(sampler, batch_size, drop_last=False),
+            collate_fn=_identity,
+            num_workers=num_workers,
+            **kwargs
+        )
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        sampler=sampler,
+        collate_fn=collate_trees,
+        num_workers=num_workers,
+        **kwargs
+    )
+
+
+def _identity(batch):
+    return batch
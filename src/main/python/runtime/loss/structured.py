@@ -1,6 +1,7 @@
-import torch
 from torch.nn import Module, MSELoss
 
+from ..allocation import accumulation_dtype, zeros
+
 
 class StructuredLoss(Module):
     """
@@ -13,11 +14,22 @@ class StructuredLoss(Module):
 
     def forward(self, a, b):
         loss = self._apply_loss(a, b)
-        # print(a, b, loss)
         return loss.sum()
 
+    def row_losses(self, a, b):
+        """
+        Computes loss for every row of trees separately
+
+        :param a: TensorTree
+        :param b: TensorTree
+        :return: Tensor with loss of every row
+        """
+        return self._apply_loss(a, b)
+
     def _apply_loss(self, a, b):
-        loss = self.loss(a.tensor, b.tensor).sum(1)
+        # Loss is accumulated in float32 for trees of low precision types
+        dtype = accumulation_dtype(a.tensor.dtype)
+        loss = self.loss(a.tensor.to(dtype), b.tensor.to(dtype)).sum(1)
         # Compute loss for children
         if len(a.children) != len(b.children):
             raise ValueError('Mismatching sizes of children: ' + str(len(a.children)) + ' and ' + str(len(b.children)))
@@ -27,8 +39,8 @@ class StructuredLoss(Module):
             if b_child is None:
                 # Second children is missing - create fake one
                 rows, columns = a_child.tensor.size()
-                b_child = a_child.__class__(
-                    torch.zeros(rows, columns),
+                b_child = a_child._layer(
+                    zeros(rows, columns, like=a_child.tensor, temporary=True),
                     [None] * columns
                 )
             # child_loss = self._apply_loss(a_child.cmul(a.tensor[:, cur].view(a.rows(), 1)), b_child)
@@ -0,0 +1,304 @@
+from contextlib import contextmanager, nullcontext
+
+import torch
+from torch.utils._python_dispatch import TorchDispatchMode
+
+from .cost import estimate, pick_batch_size
+from .trees import stack
+
+
+class MicroBatcher:
+    """
+    Evaluates a network on batches of any size within a memory budget. A batch is split into slices of rows, which
+    are evaluated sequentially, results are stacked back. For training gradients of slices are accumulated, so
+    a step of optimizer after `backward` is the same as for the whole batch.
+
+    The first size of slices is predicted by the cost model, see `pick_batch_size`, then it's adapted by observed
+    peak memory of slices: on CUDA - by statistics of the allocator, on other devices - by an upper estimate,
+    bytes of all storages allocated by the slice, including loss and backward propagation, which is measured for
+    the first slice of every size. Slices, which run out of memory, are repeated with a half of rows. Gradients,
+    which the failed slice has already accumulated, aren't accumulated again for it's rows, see `_GradientGuard`,
+    so gradients aren't copied.
+
+    Usage:
+
+        batcher = MicroBatcher(net, memory_budget=2 ** 30)
+        optimizer.zero_grad()
+        loss = batcher.backward([x], expected, StructuredLoss())
+        optimizer.step()
+    """
+
+    # Fraction of the budget, which is filled by activations of slices
+    SAFETY = 0.8
+
+    # Maximal growth of size of slices after one measurement
+    GROWTH = 2
+
+    def __init__(self, net, memory_budget, recursion_depth=None, max_batch_size=None, dtype=torch.float32):
+        """
+        :param net: FunctionalModule
+        :param memory_budget: Number of bytes available for the network, including it's parameters
+        :param recursion_depth: Expected depth of recursion for the first prediction, see `estimate`
+        :param max_batch_size: Maximal number of rows in a slice
+        :param dtype: Type of parameters and activations for the first prediction
+        """
+        self.net = net
+        self.memory_budget = memory_budget
+        self.recursion_depth = recursion_depth
+        self.max_batch_size = max_batch_size
+        self.dtype = dtype
+        # Sizes of slices and activation bytes of a row for inference and for training
+        self.batch_sizes = {}
+        self.bytes_per_row = {}
+        self._measured = set()
+        self._parameter_bytes = None
+
+    def call(self, *trees, nets=None):
+        """
+        Evaluates the network as `FunctionalModule.call`. Slices don't keep activations for backward propagation
+        only if gradients are disabled, e.g. in `torch.no_grad`
+
+        :param trees: TensorTrees with the same number of rows or a list of them, as for `FunctionalModule.call`
+        :return: TensorTree
+        """
+        wrapped = len(trees) == 1 and isinstance(trees[0], (list, tuple))
+        if wrapped:
+            trees = list(trees[0])
+        return stack(self._evaluate(
+            trees, torch.is_grad_enabled(),
+            lambda start, end, slices: self.net.call(*([slices] if wrapped else slices), nets=nets)
+        ))
+
+    def backward(self, inputs, expected, loss, nets=None):
+        """
+        Computes gradients of loss on the whole batch, gradients of slices are accumulated in `.grad` of
+        parameters. Loss should be a sum over rows, as StructuredLoss, so the sum of losses of slices is the loss
+        of the batch
+
+        :param inputs: List of TensorTrees - arguments of the network
+        :param expected: Expected result
+        :param loss: Loss function
+        :return: Value of loss on the batch
+        """
+        def forward(start, end, slices):
+            return loss(self.net.call(slices, nets=nets), expected.select_rows(slice(start, end)))
+
+        def finish(value):
+            value.backward()
+            return value.item()
+
+        return sum(self._evaluate(inputs, True, forward, finish))
+
+    def batch_size(self, training=True):
+        """
+        :return: Current number of rows in a slice
+        """
+        size = self.batch_sizes.get(training)
+        if size is None:
+            size = self.batch_sizes[training] = pick_batch_size(
+                self.net, self.memory_budget, training, self.recursion_depth, self.dtype, self.max_batch_size
+            )
+        return size
+
+    def _evaluate(self, trees, training, forward, finish=None):
+        """
+        :param forward: Function `forward(start, end, slices)`, which evaluates slices of trees with rows
+            from start to end. It's repeated with less rows, if it runs out of memory
+        :param finish: Function, which is applied to results of forward, e.g. backward propagation
+        :return: List of results of slices
+        """
+        rows = trees[0].rows()
+        device = trees[0].tensor.device
+        results = []
+        guard = _GradientGuard(self.net.parameters()) if finish is not None else None
+        start = 0
+        while start < rows:
+            size = self.batch_size(training)
+            end = min(rows, start + size)
+            if guard is not None:
+                end = guard.limit(start, end)
+            slices = [tree.select_rows(slice(start, end)) for tree in trees]
+            # Peak memory is measured only for full slices, estimations are made once for every size
+            measure = end - start == size and (device.type == 'cuda' or (training, size) not in self._measured)
+            failed = False
+            with _PeakMemory(device, measure) as peak:
+                try:
+                    with nullcontext() if guard is None else guard.rows(start, end):
+                        result = forward(start, end, slices)
+                        if finish is not None:
+                            result = finish(result)
+                except RuntimeError as e:
+                    if not _is_out_of_memory(e) or size == 1:
+                        raise
+                    failed = True
+            if failed:
+                self.batch_sizes[training] = size // 2
+                _release_cache(device)
+                continue
+            if peak.bytes is not None:
+                self._measured.add((training, size))
+                self._adapt(end - start, peak.bytes, training, device)
+            results.append(result)
+            start = end
+        return results
+
+    def _adapt(self, rows, peak, training, device):
+        per_row = max(1, peak // rows)
+        self.bytes_per_row[training] = per_row
+        available = self.memory_budget * self.SAFETY - self._fixed_bytes(training, device)
+        size = max(1, int(available // per_row))
+        size = min(size, self.batch_size(training) * self.GROWTH)
+        if self.max_batch_size is not None:
+            size = min(size, self.max_batch_size)
+        self.batch_sizes[training] = size
+
+    def _fixed_bytes(self, training, device):
+        if device.type == 'cuda':
+            # Parameters, gradients and states of optimizers are already allocated
+            return torch.cuda.memory_allocated(device)
+        if self._parameter_bytes is None:
+            self._parameter_bytes = estimate(self.net, self.recursion_depth, self.dtype).parameter_bytes()
+        return self._parameter_bytes * 2 if training else self._parameter_bytes
+
+
+class _GradientGuard:
+    """
+    Keeps accumulated gradients exact, when backward propagation of a slice runs out of memory. Gradients of
+    some parameters may be already accumulated for all rows of the failed slice. They aren't copied or
+    subtracted: such parameters are remembered with the range of rows, and their gradients are replaced by
+    zeros, while these rows are evaluated again by smaller slices
+    """
+
+    def __init__(self, parameters):
+        self.parameters = [parameter for parameter in parameters if parameter.requires_grad]
+        # Tuples - end of rows and ids of parameters, which gradients are accumulated for rows before it
+        self._accumulated = []
+
+    def limit(self, start, end):
+        """
+        :return: End of the next slice, which doesn't cross the end of rows of a failed slice
+        """
+        for (last, _) in self._accumulated:
+            if start < last < end:
+                end = last
+        return end
+
+    @contextmanager
+    def rows(self, start, end):
+        """
+        Context of evaluation of rows from start to end, its exceptions are propagated
+        """
+        # Slices are evaluated in the order of rows, repeated slices start at the start of the failed one
+        self._accumulated = [(last, ids) for (last, ids) in self._accumulated if last > start]
+        skipped = set()
+        for (last, ids) in self._accumulated:
+            if end <= last:
+                skipped |= ids
+        accumulated = set()
+        handles = []
+        for parameter in self.parameters:
+            if id(parameter) in skipped:
+                handles.append(parameter.register_hook(torch.zeros_like))
+            else:
+                handles.append(parameter.register_post_accumulate_grad_hook(_accumulated_hook(accumulated)))
+        try:
+            yield
+        except BaseException:
+            if len(accumulated) > 0:
+                self._accumulated.append((end, accumulated))
+            raise
+        finally:
+            for handle in handles:
+                handle.remove()
+
+
+def _accumulated_hook(accumulated):
+    def hook(parameter):
+        accumulated.add(id(parameter))
+    return hook
+
+
+# Messages of allocators of CUDA, MPS and CPU, which report allocation failures as generic RuntimeErrors
+_OUT_OF_MEMORY_MESSAGES = (
+    'CUDA out of memory',
+    'MPS backend out of memory',
+    "DefaultCPUAllocator: can't allocate memory",
+    'DefaultCPUAllocator: not enough memory',
+)
+
+
+def _is_out_of_memory(error):
+    out_of_memory_error = getattr(torch, 'OutOfMemoryError', None) or getattr(torch.cuda, 'OutOfMemoryError', None)
+    if out_of_memory_error is not None and isinstance(error, out_of_memory_error):
+        return True
+    if type(error) is not RuntimeError:
+        # Subclasses of RuntimeError, e.g. NotImplementedError, aren't failures of allocators
+        return False
+    message = str(error)
+    return any(text in message for text in _OUT_OF_MEMORY_MESSAGES)
+
+
+def _release_cache(device):
+    if device.type == 'cuda':
+        torch.cuda.empty_cache()
+
+
+class _PeakMemory:
+    """
+    Measures peak memory of activations inside the context: on CUDA - by statistics of the allocator, on other
+    devices - by bytes of storages allocated by operations, see `_AllocationCounter`. Counting of allocations is
+    expensive, so it's done only on request
+    """
+
+    def __init__(self, device, enabled):
+        self.device = device
+        self.enabled = enabled
+        self.bytes = None
+        self._baseline = 0
+        self._counter = None
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        if self.device.type == 'cuda':
+            torch.cuda.reset_peak_memory_stats(self.device)
+            self._baseline = torch.cuda.memory_allocated(self.device)
+        else:
+            self._counter = _AllocationCounter()
+            self._counter.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.enabled:
+            return
+        if self._counter is not None:
+            self._counter.__exit__(exc_type, exc_val, exc_tb)
+            if exc_type is None:
+                self.bytes = self._counter.bytes
+        elif exc_type is None:
+            self.bytes = torch.cuda.max_memory_allocated(self.device) - self._baseline
+
+
+class _AllocationCounter(TorchDispatchMode):
+    """
+    Sums bytes of storages of results of all operations, including backward propagation. Views, e.g. broadcast
+    constants, and results of in-place operations share storages, so they aren't counted again. Memory of freed
+    temporaries is counted too, so the sum is an upper estimate of peak memory
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.bytes = 0
+        self._storages = set()
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        result = func(*args, **(kwargs or {}))
+        for tensor in (result if isinstance(result, (tuple, list)) else (result,)):
+            if isinstance(tensor, torch.Tensor) and tensor.layout == torch.strided:
+                storage = tensor.untyped_storage()
+                # A storage, which reuses memory of a freed one, has another size or is counted once
+                key = (storage.data_ptr(), storage.nbytes())
+                if key not in self._storages:
+                    self._storages.add(key)
+                    self.bytes += storage.nbytes()
+        return result
@@ -27,28 +27,24 @@ class ApplicationLayer(FunctionalModule):
         self.nets = nets
         for idx, operand in enumerate(operands):
             self.add_module(str(idx), operand)
+        # Routing is known statically, so forward doesn't scan lists of indices
+        arguments = range(1, len(operands))
+        self._called = tuple(i in call for i in range(len(operands)))
+        self._constant_indices = tuple(i for i in arguments if i in constants)
+        self._data_indices = tuple(i for i in arguments if i in data)
+        self._net_indices = tuple(i for i in arguments if i in nets)
 
     def forward(self, data_bag):
-        called = []
-        for i in range(len(self.operands)):
-            operand = self.operands[i]
-            if i in self.call:
-                operand = operand.forward(data_bag)
-            called.append(operand)
-        for i in range(1, len(self.operands)):
-            if i in self.constants:
-                called[i] = called[i].forward(data_bag)
+        called = [
+            operand.forward(data_bag) if is_called else operand
+            for (operand, is_called) in zip(self.operands, self._called)
+        ]
+        for i in self._constant_indices:
+            called[i] = called[i].forward(data_bag)
 
         net = called[0]
-        args = called
-
-        data = []
-        nets = []
-        for i in range(1, len(args)):
-            if i in self.data:
-                data.append(args[i])
-            if i in self.nets:
-                nets.append(args[i])
-        this_args = DataBag(make_tuple(data), nets, size=data_bag.size)
+        data = [called[i] for i in self._data_indices]
+        nets = [called[i] for i in self._net_indices]
+        this_args = DataBag(make_tuple(data, like=data_bag.data.tensor), nets, size=data_bag.size)
         net_args = data_bag.next_scope(net.pointer, this_args)
         return net.forward(net_args)
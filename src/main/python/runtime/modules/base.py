@@ -2,6 +2,8 @@ from abc import abstractmethod
 
 from torch.nn import Module
 
+from ..allocation import arena
+from ..config import using_config
 from ..data import DataBag
 from ..trees import make_tuple
 
@@ -23,6 +25,8 @@ class FunctionalModule(Module):
             nets = []
         if len(trees) == 1:
             trees = trees[0]
-        if isinstance(trees, list):
-            trees = make_tuple(trees)
-        return self.forward(DataBag(trees, nets))
+        if isinstance(trees, (list, tuple)):
+            trees = make_tuple(list(trees))
+        # Temporary tensors of the call are released at the end of it
+        with arena(), using_config(getattr(self, 'runtime_config', None)):
+            return self.forward(DataBag(trees, nets))
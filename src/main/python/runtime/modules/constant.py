@@ -1,6 +1,7 @@
 import torch
 
 from .base import FunctionalModule
+from ..constants import ConstantCache
 from ..trees import SumTree
 from ..errors import UnsupportedTypeForZeroObjectCreation, UnknownType
 from ..types import ExtSpec, TypeSpec
@@ -14,8 +15,12 @@ class ZeroLayer(FunctionalModule):
         super(ZeroLayer, self).__init__()
         self.defined_types = defined_types
         self.res_type = res_type
+        self._cache = ConstantCache(self._build)
 
     def forward(self, data_bag):
+        return self._cache.get(data_bag.size, data_bag.data.tensor)
+
+    def _build(self, dtype):
         if not isinstance(self.res_type, ExtSpec):
             raise UnsupportedTypeForZeroObjectCreation(self.res_type)
         if self.res_type.name not in self.defined_types:
@@ -24,7 +29,7 @@ class ZeroLayer(FunctionalModule):
         if not isinstance(res_type, TypeSpec):
             raise UnsupportedTypeForZeroObjectCreation(res_type)
         object_size = len(res_type.operands)
-        zero_tensor = torch.zeros(data_bag.size, object_size)
+        zero_tensor = torch.zeros(1, object_size, dtype=dtype)
         zero_children = [None] * object_size
         return SumTree(zero_tensor, zero_children)
 
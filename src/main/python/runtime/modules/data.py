@@ -1,6 +1,7 @@
 import torch
 
 from .base import FunctionalModule
+from ..constants import ConstantCache
 from ..data import DataPointer
 from ..trees import SumTree, ProdTree
 
@@ -15,11 +16,14 @@ class ConstantLayer(FunctionalModule):
         self.position = position
         self.length = len(type_spec.operands)
         self.pointer = DataPointer.start  # Constants are defined in a global scope
+        self._cache = ConstantCache(self._build)
 
     def forward(self, data_bag):
+        return self._cache.get(data_bag.size, data_bag.data.tensor)
+
+    def _build(self, dtype):
         # Construct constant value
-        rows = data_bag.size
-        tensor = torch.zeros(rows, self.length)
+        tensor = torch.zeros(1, self.length, dtype=dtype)
         tensor[:, self.position] = 1
         children = [None for _ in range(self.length)]
 
@@ -36,6 +40,7 @@ class ConstructorLayer(FunctionalModule):
         self.length = len(to_type.operands)
         self.position = position
         self.pointer = DataPointer.start  # Constructors are defined at global scope
+        self._cache = ConstantCache(self._build)
 
     def forward(self, data_bag):
         # Data is a Sum type with one operand - product of arguments
@@ -44,8 +49,7 @@ class ConstructorLayer(FunctionalModule):
         product = data.children[0]
         assert isinstance(product, ProdTree)
 
-        new_tensor = torch.zeros(size, self.length)
-        new_tensor[:, self.position] = 1
+        new_tensor = self._cache.get(size, product.tensor).tensor
 
         size_before = self.position
         size_after = self.length - (self.position + 1)
@@ -53,3 +57,8 @@ class ConstructorLayer(FunctionalModule):
         children = [*([None] * size_before), product, *([None] * size_after)]
 
         return SumTree(new_tensor, children)
+
+    def _build(self, dtype):
+        tensor = torch.zeros(1, self.length, dtype=dtype)
+        tensor[:, self.position] = 1
+        return SumTree(tensor, [None] * self.length)
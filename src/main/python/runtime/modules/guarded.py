@@ -1,6 +1,9 @@
-import torch
+import threading
+from contextlib import contextmanager
 
 from .base import FunctionalModule
+from ..allocation import zeros
+from ..config import current_config
 from ..data import DataBag
 from ..trees import make_tuple
 
@@ -35,10 +38,6 @@ class GuardedLayer(FunctionalModule):
 
     class Case(FunctionalModule):
 
-        EPS = 1e-3
-
-        SELECT_ROWS = False
-
         def __init__(self, pattern, net):
             super().__init__()
             self.pattern = pattern
@@ -53,9 +52,10 @@ class GuardedLayer(FunctionalModule):
             size = data_bag.size
             if presence is not None:
                 # Case can be executed
-                new_tensor = make_tuple(trees)
-                if self.SELECT_ROWS:
-                    execute_rows = presence.data > self.EPS
+                new_tensor = make_tuple(trees, like=after.data.tensor)
+                config = current_config()
+                if config.select_rows:
+                    execute_rows = presence.data > config.case_eps
                     selected_size = execute_rows.sum().item()
                     # Select rows
                     if len(trees) == 0:
@@ -68,10 +68,12 @@ class GuardedLayer(FunctionalModule):
                         selected_before = before.data.select_rows(execute_rows)
                     before_part = DataBag(selected_before, before.nets, selected_size)
                     new_data = before_part.append(DataBag(selected, after.nets, selected_size))
-                    result = self.net.forward(new_data)
+                    with _selecting_rows():
+                        result = self.net.forward(new_data)
                     # Add rows which were dropped
                     rows, columns = result.tensor.size()
-                    matrix = torch.zeros(size, rows)
+                    # Children of the result are multiplied lazily, so the matrix isn't temporary
+                    matrix = zeros(size, rows, like=result.tensor)
                     cur = 0
                     for i in range(size):
                         if execute_rows[i].item():
@@ -86,3 +88,22 @@ class GuardedLayer(FunctionalModule):
             else:
                 # Pattern-matching didn't succeed - return None
                 return None
+
+
+_selection = threading.local()
+
+
+@contextmanager
+def _selecting_rows():
+    _selection.depth = getattr(_selection, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _selection.depth -= 1
+
+
+def rows_selected():
+    """
+    :return: True if the current thread evaluates a case of GuardedLayer on selected rows
+    """
+    return getattr(_selection, 'depth', 0) > 0
@@ -1,12 +1,13 @@
 from .base import FunctionalModule
+from ..config import current_config
 from ..data import DataPointer, DataBag
 
 
 class RecursiveLayer(FunctionalModule):
     """
     Recursive network. Provides reference on itself for recursive calls.
+    Limits of depth of recursion are `recursion_depth` and `tail_recursion_depth` of RuntimeConfig
     """
-    DEPTH = 50
 
     def __init__(self, net, depth_handler, pointer, is_tail_recursive=False):
         super().__init__()
@@ -43,7 +44,7 @@ class LimitedRecursiveLayer(FunctionalModule):
 
     def forward(self, data_bag):
         self.depth += 1
-        if self.depth > RecursiveLayer.DEPTH:
+        if self.depth > current_config().recursion_depth:
             # If the depth of recursion is too big, call the handler instead of itself
             _, args = data_bag.split(self.pointer)
             return self.depth_handler.forward(args)
@@ -55,8 +56,6 @@ class TailRecursiveLayer(FunctionalModule):
     Layer for tail recursion with higher limitation of the depth of recursion
     """
 
-    DEPTH = 200
-
     def __init__(self, net, depth_handler, pointer):
         super().__init__()
         self.net = net
@@ -74,7 +73,7 @@ class TailRecursiveLayer(FunctionalModule):
         else:
             self.stored_args = data_bag
             return None
-        for i in range(self.DEPTH):
+        for i in range(current_config().tail_recursion_depth):
             result = self.net.forward(self.stored_args)
             if result is None:
                 continue
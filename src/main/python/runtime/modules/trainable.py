@@ -2,22 +2,45 @@ import torch
 from torch.nn import Parameter
 
 from .base import FunctionalModule
+from .guarded import rows_selected
 from ..data import DataPointer
 from ..functions import structuredSigmoid
 from ..trees import SumTree, ProdTree, OperatorTree
-from ..types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec, create_tuple_type, create_unit_type
-from ..errors import UnexpectedTypeSpec, UnknownType
+from ..types import TypeSpec, LitSpec, ProdSpec, VarSpec, ExtSpec, create_tuple_type, create_unit_type, \
+    params_key, substitute
+from ..errors import EnsembleRowSelection, EnsembleRowsMismatch, UnexpectedTypeSpec, UnknownType
 
 
 class TrainableLayer(FunctionalModule):
     """
     Layer of the network that can be fitted to data.
+
+    Layer can be an ensemble - keep `ensemble` independent copies of weights and biases. Rows of input of
+    ensemble are grouped by members: first rows are evaluated by the first member, etc. So the number of rows
+    must be divisible by the number of members, and cases of GuardedLayers must not select rows on the way to
+    the layer, see `RuntimeConfig.select_rows`
+
+    Layers with equal arguments, result type and depths can share data:
+    SHARING_SKELETON reuses the structure of weights and masks, which are built from types, but creates new weights;
+    SHARING_PARAMETERS reuses the weights and biases themselves, so gradients of all such layers are accumulated
+    in the same parameters
     """
 
-    def __init__(self, defined_types, arguments, to_type, from_depth=1, to_depth=1):
+    # Default number of members of ensemble, None disables ensembles
+    ENSEMBLE = None
+
+    SHARING_SKELETON = 'skeleton'
+    SHARING_PARAMETERS = 'parameters'
+
+    # Default mode of sharing, None disables sharing
+    SHARING = None
+
+    def __init__(self, defined_types, arguments, to_type, from_depth=1, to_depth=1, ensemble=None, sharing=None):
         super().__init__()
         self.pointer = DataPointer.start    # Trainable networks only use specified arguments
+        self.defined_types = defined_types
         self.arguments = arguments
+        self.ensemble = self.ENSEMBLE if ensemble is None else ensemble
 
         self.from_depth = from_depth * 2   # Every layer of definition of type is unwrapped
         self.to_depth = to_depth * 2        # Into two layers of TensorTree
@@ -27,23 +50,83 @@ class TrainableLayer(FunctionalModule):
         self.to_type = create_tuple_type([to_type])
 
         # Create parameters
-        self.weights = _create_weights(
-            defined_types, self.from_type, self.to_type, self.from_depth, self.to_depth
-        )
-        self.bias = _create_bias(defined_types, self.to_type, self.to_depth)
+        self.sharing = self.SHARING if sharing is None else sharing
+        key = _sharing_key(defined_types, self.arguments, to_type, self.from_depth, self.to_depth)
+        shared = _SHARED_PARAMETERS.get((key, self.ensemble))
+        if self.sharing == self.SHARING_PARAMETERS and shared is not None:
+            self.weights, self.bias = shared
+        else:
+            weights_skeleton, bias_skeleton = None, None
+            if self.sharing is not None:
+                if key not in _SKELETONS:
+                    _SKELETONS[key] = _create_skeleton(
+                        defined_types, self.from_type, self.to_type, self.from_depth, self.to_depth
+                    )
+                weights_skeleton, bias_skeleton = _SKELETONS[key]
+            self.weights = _create_weights(
+                defined_types, self.from_type, self.to_type, self.from_depth, self.to_depth, self.ensemble,
+                weights_skeleton
+            )
+            self.bias = _create_bias(defined_types, self.to_type, self.to_depth, self.ensemble, bias_skeleton)
+            if self.sharing == self.SHARING_PARAMETERS:
+                _SHARED_PARAMETERS[(key, self.ensemble)] = (self.weights, self.bias)
 
         # Register parameters
         self._register_operator_parameters([], self.weights)
         self._register_tree_parameters('', [], self.bias)
 
     def forward(self, data_bag):
-        linear = self.weights.typed_tree_mul(data_bag.data) + self.bias
+        if self.ensemble is not None:
+            # Rows are grouped by members in contiguous blocks of equal size
+            if data_bag.size % self.ensemble != 0:
+                raise EnsembleRowsMismatch(data_bag.size, self.ensemble)
+            if rows_selected():
+                raise EnsembleRowSelection()
+        linear = self.weights.typed_tree_mul(data_bag.data)
+        linear = linear + self._expand_bias(data_bag.size, linear.tensor.dtype)
         # Result of linear combination is contained in the 0-th child
         child = linear.children[0].children[0]
         result = child.apply_structured_activation(structuredSigmoid)
-        # print('params: ', self.weights, '\n', '\nlinear: ', linear, '\nresult: ', result)
         return result
 
+    def select_members(self, indices):
+        """
+        Keeps only specified members of ensemble. Parameters are replaced, so optimizers, which keep the old
+        ones, should be recreated with the returned parameters, see also `DataParallelTrainer.rebuild`
+
+        :param indices: List of indices of members
+        :return: List of new parameters
+        """
+        if self.ensemble is None:
+            raise ValueError('Layer is not an ensemble')
+
+        def select(tensor):
+            selected = tensor.detach()[indices].clone()
+            if tensor.requires_grad:
+                selected = Parameter(selected, requires_grad=True)
+            if hasattr(tensor, 'children'):
+                selected.children = tensor.children
+            return selected
+
+        self.weights = _map_operator(self.weights, select)
+        self.bias = self.bias.apply(select)
+        self.ensemble = len(indices)
+        self._parameters.clear()
+        self._register_operator_parameters([], self.weights)
+        self._register_tree_parameters('', [], self.bias)
+        return list(self._parameters.values())
+
+    def _expand_bias(self, rows, dtype=None):
+        bias = self.bias
+        if dtype is not None and bias.tensor.dtype != dtype:
+            # Master weights are converted to the type of data, e.g. for mixed precision
+            bias = bias.apply(lambda t: t.to(dtype))
+        if self.ensemble is None:
+            return bias
+        # Repeat bias of every member for all it's rows
+        members = self.ensemble
+        return bias.apply(lambda t: t.expand(members, rows // members, t.size()[-1]).reshape(rows, -1))
+
     def _register_operator_parameters(self, path, operator):
         self._register_tree_parameters(str(path) + '_w', [], operator.tree)
         for (i, child) in enumerate(operator.children):
@@ -59,18 +142,101 @@ class TrainableLayer(FunctionalModule):
 
     @staticmethod
     def bind_defined_types(defined_types):
-        def constructor(arguments, to_type, from_depth=1, to_depth=1):
-            return TrainableLayer(defined_types, arguments, to_type, from_depth, to_depth)
+        def constructor(arguments, to_type, from_depth=1, to_depth=1, ensemble=None, sharing=None):
+            return TrainableLayer(defined_types, arguments, to_type, from_depth, to_depth, ensemble, sharing)
         return constructor
 
+    @staticmethod
+    def clear_shared():
+        """
+        Forgets shared skeletons and parameters, layers created later don't share anything with existing ones
+        """
+        _SKELETONS.clear()
+        _SHARED_PARAMETERS.clear()
+
+
+# Shared skeletons and parameters of layers by sharing keys
+_SKELETONS = {}
+_SHARED_PARAMETERS = {}
+
+
+def _sharing_key(defined_types, arguments, to_type, from_depth, to_depth):
+    # Definitions are interned, so equal type systems have equal keys, and keys don't refer to dicts of types,
+    # which can be garbage-collected and replaced by other dicts with the same id
+    definitions = _reachable_definitions(defined_types, [*arguments, to_type])
+    return definitions, tuple(arguments), to_type, from_depth, to_depth
+
+
+def _reachable_definitions(defined_types, specs):
+    """
+    :return: Tuple of pairs (name, definition or None) of all types used by specifications, sorted by names
+    """
+    definitions = {}
+    pending = list(specs)
+    while len(pending) > 0:
+        spec = pending.pop()
+        if isinstance(spec, ExtSpec):
+            pending.extend(spec.args.values())
+            if spec.name not in definitions:
+                definitions[spec.name] = defined_types.get(spec.name)
+                if definitions[spec.name] is not None:
+                    pending.append(definitions[spec.name])
+        elif isinstance(spec, (TypeSpec, ProdSpec)):
+            pending.extend(spec.operands)
+    return tuple(sorted(definitions.items(), key=lambda item: item[0]))
+
+
+class _WeightSkeleton:
+    """
+    Information about a matrix of weights, which doesn't depend on values: mask and routing of children
+    """
+
+    def __init__(self, mask, children, need_grad):
+        self.mask = mask
+        self.children = children
+        self.need_grad = need_grad
+
+    def create(self, ensemble):
+        weights = torch.randn(*_members_size(ensemble), *self.mask.size())
+        tensor = weights * self.mask
+        if self.need_grad:
+            result = Parameter(tensor, requires_grad=True)
+        else:
+            result = tensor
+        # TODO: Remove this crutch for literals
+        result.children = self.children
+        return result
+
+
+def _create_skeleton(defined_types, from_type, to_type, from_depth, to_depth):
+    """
+    Creates structures of weights and bias without values
+
+    :return: Tuple - OperatorTree of _WeightSkeletons and TensorTree of sizes of bias
+    """
+
+    def _create_mask(type_params, this_from_type, this_to_type, from_size, to_size):
+        mask, children = _create_weight_mask(type_params, this_from_type, this_to_type, from_size, to_size)
+        # Updated parameters only if we have Sum->Sum or Prod->Prod layers
+        return _WeightSkeleton(mask, children, type(this_from_type) == type(this_to_type))
+
+    def _create_size(type_params, this_from_type, this_to_type, from_size, to_size):
+        return from_size, to_size
+
+    weights = _build_operator(defined_types, {}, from_type, to_type, from_depth, to_depth, _create_mask)
+    bias = _build_tree(defined_types, {}, create_unit_type(), to_type, to_depth, _create_size)
+    return weights, bias
 
-def _create_weights(defined_types, from_type, to_type, from_depth, to_depth):
+
+def _create_weights(defined_types, from_type, to_type, from_depth, to_depth, ensemble=None, skeleton=None):
     """
-    Creates trainable OperatorTree and fills it with random values
+    Creates trainable OperatorTree and fills it with random values. If skeleton is given, types aren't used
     """
+    if skeleton is not None:
+        return _map_operator(skeleton, lambda node: node.create(ensemble))
 
     def _create_tensors(type_params, this_from_type, this_to_type, from_size, to_size):
-        weights = torch.randn(from_size, to_size)
+        weights = torch.randn(*_members_size(ensemble), from_size, to_size)
         mask, children = _create_weight_mask(type_params, this_from_type, this_to_type, from_size, to_size)
         # Updated parameters only if we have Sum->Sum or Prod->Prod layers
         need_grad = type(this_from_type) == type(this_to_type)
@@ -88,19 +254,72 @@ def _create_weights(defined_types, from_type, to_type, from_depth, to_depth):
     )
 
 
-def _create_bias(defined_types, to_type, to_depth):
+def _create_bias(defined_types, to_type, to_depth, ensemble=None, skeleton=None):
     """
-    Creates trainable TensorTree and fills it with random values
+    Creates trainable TensorTree and fills it with random values. If skeleton is given, types aren't used
     """
+    def _create_parameter(from_size, to_size):
+        return Parameter(torch.randn(*_members_size(ensemble), from_size, to_size), requires_grad=True)
+
+    if skeleton is not None:
+        return _map_tree(skeleton, lambda size: _create_parameter(*size))
+
     def _create_random_tensor(type_params, this_from_type, this_to_type, from_size, to_size):
-        return Parameter(torch.randn(from_size, to_size), requires_grad=True)
+        return _create_parameter(from_size, to_size)
 
     return _build_tree(
         defined_types, {}, create_unit_type(), to_type, to_depth, _create_random_tensor
     )
 
 
+def _members_size(ensemble):
+    return [] if ensemble is None else [ensemble]
+
+
+def _map_operator(operator, func):
+    return OperatorTree(
+        _map_tree(operator.tree, func),
+        [None if child is None else _map_operator(child, func) for child in operator.children]
+    )
+
+
+def _map_tree(tree, func):
+    # Unlike TensorTree.apply, all nodes are mapped at once, so random values are drawn in the same order
+    # as by _build_tree
+    tensor = func(tree.tensor)
+    return tree._layer(tensor, [None if child is None else _map_tree(child, func) for child in tree.children])
+
+
 def _create_weight_mask(type_params, from_type, to_type, from_size, to_size):
+    entries, children = _weight_mask_entries(type_params, from_type, to_type, from_size, to_size)
+    mask = torch.zeros(from_size, to_size)
+    if len(entries) > 0:
+        rows, columns = zip(*entries)
+        mask[list(rows), list(columns)] = 1
+    return mask, children
+
+
+# Results of _weight_mask_entries by types, values of type variables and sizes
+_MASK_ENTRIES = {}
+
+
+def _weight_mask_entries(type_params, from_type, to_type, from_size, to_size):
+    """
+    Finds elements of the mask of weights which are equal to 1, doesn't allocate tensors.
+    Results are memoized, so they are immutable
+
+    :return: Tuple - tuple of pairs (row, column) and routing of children of products or None
+    """
+    key = (params_key(type_params), from_type, to_type, from_size, to_size)
+    result = _MASK_ENTRIES.get(key)
+    if result is None:
+        entries, children = _find_weight_mask_entries(type_params, from_type, to_type, from_size, to_size)
+        routing = None if children is None else tuple(tuple(row) for row in children)
+        result = _MASK_ENTRIES.setdefault(key, (tuple(entries), routing))
+    return result
+
+
+def _find_weight_mask_entries(type_params, from_type, to_type, from_size, to_size):
     # Let's set values of the mask using axioms of logic:
     # (a -> T) holds for every a, so we can create a literal using any object - set mask to 1
     # (a -> a) holds for every a, so we can create an object using object of it's type - set mask to 1
@@ -109,34 +328,32 @@ def _create_weight_mask(type_params, from_type, to_type, from_size, to_size):
     if isinstance(from_type, TypeSpec):
         if isinstance(to_type, TypeSpec):
             # Both are TypeSpecs
-            mask = torch.zeros(from_size, to_size)
+            entries = []
             for (column, to_operand) in enumerate(to_type.operands):
                 if isinstance(to_operand, LitSpec):
-                    mask[:, column] = 1
-                    continue
-            return mask, None
+                    entries.extend((row, column) for row in range(from_size))
+            return entries, None
         if isinstance(to_type, ProdSpec):
             # We can't create a product from a sum
-            return torch.zeros(from_size, to_size), None
+            return [], None
         raise UnexpectedTypeSpec(to_type)
     if isinstance(from_type, ProdSpec):
         if isinstance(to_type, TypeSpec):
             # We can't create a sum from a product
-            return torch.zeros(from_size, to_size), None
+            return [], None
         if isinstance(to_type, ProdSpec):
             # Both are products
-            mask = torch.zeros(from_size, to_size)
+            entries = []
             children = [[False for _ in range(to_size)] for _ in range(from_size)]
+            # Type variables are resolved once, interned specifications are compared by identity
+            to_operands = [substitute(to_operand, type_params) for to_operand in to_type.operands]
             for (row, from_operand) in enumerate(from_type.operands):
-                for (column, to_operand) in enumerate(to_type.operands):
-                    while isinstance(from_operand, VarSpec) and from_operand.name in type_params:
-                        from_operand = type_params[from_operand.name]
-                    while isinstance(to_operand, VarSpec) and to_operand.name in type_params:
-                        to_operand = type_params[to_operand.name]
-                    if from_operand == to_operand:
-                        mask[row, column] = 1
+                from_operand = substitute(from_operand, type_params)
+                for (column, to_operand) in enumerate(to_operands):
+                    if from_operand is to_operand:
+                        entries.append((row, column))
                         children[row][column] = True
-            return mask, children
+            return entries, children
         raise UnexpectedTypeSpec(to_type)
     raise UnexpectedTypeSpec(from_type)
 
@@ -180,8 +397,7 @@ def _build_operator(defined_types, type_params, from_type, to_type, from_depth,
         else:
             children = []
             for operand in from_type.operands:
-                while isinstance(operand, VarSpec) and operand.name in type_params:
-                    operand = type_params[operand.name]
+                operand = substitute(operand, type_params)
                 if isinstance(operand, VarSpec):
                     children.append(None)
                     continue
@@ -238,8 +454,7 @@ def _build_tree(defined_types, type_params, from_type, to_type, to_depth, tensor
         else:
             children = []
             for operand in to_type.operands:
-                while isinstance(operand, VarSpec) and operand.name in type_params:
-                    operand = type_params[operand.name]
+                operand = substitute(operand, type_params)
                 if isinstance(operand, VarSpec):
                     children.append(None)
                     continue
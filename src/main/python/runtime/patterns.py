@@ -1,5 +1,6 @@
 from abc import abstractmethod
-import torch
+
+from .allocation import ones
 
 
 class BasePattern:
@@ -25,6 +26,8 @@ class ConstructorPattern(BasePattern):
     def __init__(self, position, operands):
         self.position = position
         self.operands = operands
+        # Kinds of operands are resolved once, not on every match
+        self._literals = [isinstance(pattern, LitPattern) for pattern in operands]
 
     def get_trees(self, tree):
         rows = tree.rows()
@@ -36,13 +39,13 @@ class ConstructorPattern(BasePattern):
             # Pattern is not matched
             return None, []
         # Presence of children
-        for (cur, (pattern, child)) in enumerate(zip(self.operands, product.children)):
+        for (cur, (pattern, is_literal, child)) in enumerate(zip(self.operands, self._literals, product.children)):
             if child is None:
                 # Missing child - pattern is not matched
                 return None, []
             else:
                 scale = product.tensor[:, cur]
-                if isinstance(pattern, LitPattern):
+                if is_literal:
                     child_presence, _ = pattern.get_trees(child)
                     child_presence = child_presence * scale
                 else:
@@ -75,7 +78,7 @@ class LitPattern(BasePattern):
 
 class VarPattern(BasePattern):
     def get_trees(self, tree):
-        return torch.ones(tree.rows()), [tree]
+        return ones(tree.rows(), like=tree.tensor), [tree]
 
     def __repr__(self):
         return "VarPattern()"
@@ -0,0 +1,112 @@
+import torch
+
+from .discrete import decode
+from .trees import empty_tree
+
+
+class PrecisionPolicy:
+    """
+    Mixed precision execution of a network: input trees are converted to `dtype`, so activations are stored and
+    multiplied by weights in it. Parameters stay float32 master weights, they are converted to the type of data
+    in every multiplication, so gradients and updates of optimizers are float32. Presence of products and
+    StructuredLoss are accumulated in float32.
+
+    Constants of the network follow type of it's inputs, so the policy needs only inputs of calls. Networks without
+    arguments get an empty input of the type of the policy
+    """
+
+    DTYPE = torch.bfloat16
+
+    def __init__(self, dtype=None):
+        self.dtype = self.DTYPE if dtype is None else dtype
+
+    def cast(self, tree):
+        """
+        :param tree: TensorTree
+        :return: TensorTree with tensors of the type of the policy
+        """
+        if tree.tensor.dtype == self.dtype:
+            return tree
+        return tree.type(self.dtype)
+
+    def call(self, net, *trees, nets=None):
+        """
+        Calls the network as `FunctionalModule.call` with inputs converted to the type of the policy
+
+        :param net: FunctionalModule
+        :param trees: TensorTrees or a list of them
+        :return: TensorTree of the type of the policy
+        """
+        arguments = _map_arguments(trees, self.cast)
+        if len(arguments) == 0 or (isinstance(arguments[0], list) and len(arguments[0]) == 0):
+            arguments = [empty_tree(torch.empty(0, dtype=self.dtype))]
+        return net.call(*arguments, nets=nets)
+
+
+class DriftReport:
+    """
+    Comparison of results of a network with a precision policy and in float32
+    """
+
+    def __init__(self, dtype, rows, mismatches, max_difference, mean_difference):
+        self.dtype = dtype
+        self.rows = rows
+        self.mismatches = mismatches
+        self.max_difference = max_difference
+        self.mean_difference = mean_difference
+
+    def accuracy(self):
+        """
+        :return: Fraction of rows with equal strict results
+        """
+        return 1.0 if self.rows == 0 else 1.0 - len(self.mismatches) / self.rows
+
+    def __repr__(self):
+        return 'DriftReport(' + str(self.dtype) + ', accuracy=' + str(self.accuracy()) + ', mismatches=' + \
+               str(len(self.mismatches)) + ', max_difference=' + str(self.max_difference) + \
+               ', mean_difference=' + str(self.mean_difference) + ')'
+
+
+def drift_report(net, *inputs, policy=None):
+    """
+    Evaluates the network on inputs, e.g. a validation set, in float32 and with the precision policy and compares
+    all nodes of results, which are present in both of them
+
+    :param net: FunctionalModule
+    :param inputs: TensorTrees - arguments of the network, passed as to `FunctionalModule.call`
+    :param policy: PrecisionPolicy, by default - bfloat16
+    :return: DriftReport
+    """
+    if policy is None:
+        policy = PrecisionPolicy()
+    with torch.no_grad():
+        expected = net.call(*_map_arguments(inputs, lambda tree: tree.type(torch.float32)))
+        actual = policy.call(net, *inputs).type(torch.float32)
+    expected_values = decode(expected.strict())
+    actual_values = decode(actual.strict())
+    mismatches = [row for (row, (a, b)) in enumerate(zip(expected_values, actual_values)) if a != b]
+    differences = []
+    _collect_differences(expected, actual, differences)
+    if len(differences) == 0:
+        max_difference, mean_difference = 0.0, 0.0
+    else:
+        flat = torch.cat(differences)
+        max_difference, mean_difference = flat.max().item(), flat.mean().item()
+    return DriftReport(policy.dtype, len(expected_values), mismatches, max_difference, mean_difference)
+
+
+def _map_arguments(trees, func):
+    """
+    Converts arguments of `FunctionalModule.call`: several TensorTrees or one list of them
+    """
+    if len(trees) == 1 and isinstance(trees[0], (list, tuple)):
+        return [[func(tree) for tree in trees[0]]]
+    return [func(tree) for tree in trees]
+
+
+def _collect_differences(expected, actual, differences):
+    if expected.tensor.numel() > 0:
+        differences.append((expected.tensor - actual.tensor).abs().reshape(-1))
+    for (expected_child, actual_child) in zip(expected.children, actual.children):
+        if expected_child is not None and actual_child is not None:
+            _collect_differences(expected_child, actual_child, differences)
@@ -0,0 +1,261 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from .modules.base import FunctionalModule
+from .trees.tensor_tree import TensorTree
+
+
+@contextmanager
+def instrument_modules(wrap):
+    """
+    Replaces `forward` of all subclasses of FunctionalModule while the context is active.
+    Modules call `forward` of each other directly, so hooks of torch.nn.Module aren't called for them.
+    Nothing is changed outside of the context, so there is no overhead when instrumentation isn't used
+
+    :param wrap: Function `wrap(cls, forward)` which returns the new `forward` of the class
+    """
+    originals = []
+    for cls in _subclasses(FunctionalModule):
+        forward = cls.__dict__.get('forward')
+        if forward is None or getattr(forward, '__isabstractmethod__', False):
+            continue
+        originals.append((cls, forward))
+        cls.forward = wrap(cls, forward)
+    try:
+        yield
+    finally:
+        for (cls, forward) in reversed(originals):
+            cls.forward = forward
+
+
+def module_names(net):
+    """
+    :param net: FunctionalModule or None
+    :return: Dictionary from ids of submodules of the network to their qualified names
+    """
+    names = {}
+    if net is not None:
+        for (name, module) in net.named_modules():
+            names[id(module)] = name if name != '' else 'net'
+    return names
+
+
+def describe_module(names, module):
+    """
+    :param names: Result of `module_names`
+    :param module: FunctionalModule
+    :return: Name of the module used in reports
+    """
+    name = names.get(id(module))
+    cls = type(module).__qualname__
+    if name is None:
+        return cls
+    return name + ' (' + cls + ')'
+
+
+def _subclasses(cls):
+    result = []
+    for subclass in cls.__subclasses__():
+        result.append(subclass)
+        result.extend(_subclasses(subclass))
+    return result
+
+
+class ProfileEvent:
+    """
+    One invocation of a module. Numbers of nodes and bytes include invocations of nested modules
+    """
+
+    def __init__(self, name, parent, depth, recursion, start):
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.recursion = recursion
+        self.start = start
+        self.duration = 0
+        self.children_duration = 0
+        self.nodes = 0
+        self.bytes = 0
+
+    def self_duration(self):
+        return self.duration - self.children_duration
+
+
+class Profiler:
+    """
+    Records every invocation of modules of networks: wall time, number of created TensorTree nodes, bytes of
+    their tensors, depth in the call hierarchy and recursion depth - number of active invocations of the same
+    module. Only invocations from the thread which started profiling are recorded.
+
+    Usage:
+
+        with Profiler(net) as profiler:
+            net.call(tree)
+        print(profiler.table())
+        profiler.save_chrome_trace('trace.json')
+
+    Bytes are counted for every created node, even if it's tensor is a view of another one.
+
+    Children of trees may be lazy and computed only when they are read, e.g. by the next module. By default results
+    of every invocation are forced, see `TensorTree.force`, so their time and nodes are charged to the module,
+    which created them. It computes children, which wouldn't be read without profiling. If `force` is false,
+    lazy children are charged to the module, which reads them first
+    """
+
+    def __init__(self, net=None, force=True):
+        self.events = []
+        self.force = force
+        self._names = module_names(net)
+        self._stack = []
+        self._active = {}
+        self._thread = None
+        self._context = None
+        self._init = None
+        self._origin = 0
+
+    def __enter__(self):
+        if self._thread is not None:
+            raise RuntimeError('Profiler is already active')
+        self._thread = threading.get_ident()
+        if len(self.events) == 0:
+            self._origin = time.perf_counter_ns()
+        self._patch_trees()
+        self._context = instrument_modules(self._wrap)
+        self._context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._context.__exit__(exc_type, exc_val, exc_tb)
+        TensorTree.__init__ = self._init
+        self._context = None
+        self._init = None
+        self._thread = None
+        self._stack = []
+        self._active = {}
+
+    def _patch_trees(self):
+        init = TensorTree.__init__
+        profiler = self
+
+        def counted_init(tree, tensor, children):
+            init(tree, tensor, children)
+            if len(profiler._stack) > 0 and threading.get_ident() == profiler._thread:
+                event = profiler._stack[-1]
+                event.nodes += 1
+                if hasattr(tensor, 'element_size'):
+                    event.bytes += tensor.numel() * tensor.element_size()
+
+        self._init = init
+        TensorTree.__init__ = counted_init
+
+    def _wrap(self, cls, forward):
+        profiler = self
+
+        def profiled_forward(module, data_bag):
+            if threading.get_ident() != profiler._thread:
+                return forward(module, data_bag)
+            return profiler._record(module, forward, data_bag)
+
+        return profiled_forward
+
+    def _record(self, module, forward, data_bag):
+        key = id(module)
+        recursion = self._active.get(key, 0) + 1
+        self._active[key] = recursion
+        parent = self._stack[-1] if len(self._stack) > 0 else None
+        name = describe_module(self._names, module)
+        event = ProfileEvent(name, parent, len(self._stack), recursion, time.perf_counter_ns())
+        self.events.append(event)
+        self._stack.append(event)
+        try:
+            result = forward(module, data_bag)
+            if self.force and isinstance(result, TensorTree):
+                result.force()
+            return result
+        finally:
+            event.duration = time.perf_counter_ns() - event.start
+            self._stack.pop()
+            self._active[key] = recursion - 1
+            if parent is not None:
+                parent.children_duration += event.duration
+                parent.nodes += event.nodes
+                parent.bytes += event.bytes
+
+    def aggregate(self):
+        """
+        Aggregates events by modules
+
+        :return: List of dictionaries, sorted by total time. Times are in seconds
+        """
+        rows = {}
+        for event in self.events:
+            row = rows.get(event.name)
+            if row is None:
+                row = rows[event.name] = {
+                    'name': event.name,
+                    'calls': 0,
+                    'total_time': 0.0,
+                    'self_time': 0.0,
+                    'nodes': 0,
+                    'bytes': 0,
+                    'max_recursion': 0,
+                }
+            row['calls'] += 1
+            # Time of recursive invocations is already included into the outer one
+            if event.recursion == 1:
+                row['total_time'] += event.duration / 1e9
+                row['nodes'] += event.nodes
+                row['bytes'] += event.bytes
+            row['self_time'] += event.self_duration() / 1e9
+            row['max_recursion'] = max(row['max_recursion'], event.recursion)
+        return sorted(rows.values(), key=lambda r: r['total_time'], reverse=True)
+
+    def table(self, sort='total_time', limit=None):
+        """
+        :param sort: Name of column used for sorting
+        :param limit: Maximal number of rows
+        :return: Aggregated statistics as a text table
+        """
+        rows = sorted(self.aggregate(), key=lambda r: r[sort], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+        width = max([len('Module')] + [len(row['name']) for row in rows])
+        header = '{:<{w}} {:>8} {:>12} {:>12} {:>10} {:>14} {:>9}'.format(
+            'Module', 'Calls', 'Total, ms', 'Self, ms', 'Nodes', 'Bytes', 'Recursion', w=width
+        )
+        lines = [header, '-' * len(header)]
+        for row in rows:
+            lines.append('{:<{w}} {:>8} {:>12.3f} {:>12.3f} {:>10} {:>14} {:>9}'.format(
+                row['name'], row['calls'], row['total_time'] * 1000, row['self_time'] * 1000,
+                row['nodes'], row['bytes'], row['max_recursion'], w=width
+            ))
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """
+        :return: Events in Chrome trace format, can be opened in chrome://tracing or Perfetto
+        """
+        events = []
+        for event in self.events:
+            events.append({
+                'name': event.name,
+                'cat': 'module',
+                'ph': 'X',
+                'ts': (event.start - self._origin) / 1000,
+                'dur': event.duration / 1000,
+                'pid': 0,
+                'tid': 0,
+                'args': {
+                    'nodes': event.nodes,
+                    'bytes': event.bytes,
+                    'depth': event.depth,
+                    'recursion': event.recursion,
+                },
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as output:
+            json.dump(self.chrome_trace(), output)
@@ -0,0 +1,167 @@
+import torch
+
+from .discrete import decode
+from .modules import TrainableLayer
+from .trees import OperatorTree
+
+
+class QuantizedMatrix:
+    """
+    Matrix of weights of one node of OperatorTree, quantized to int8 with one scale per matrix.
+    Multiplication by it uses dynamically quantized matmul kernels of CPU, so it supports only inference.
+
+    Can be used in trees in place of a tensor: it multiplies tensors in `_mm`, gives elements in `_matrix_element`
+    and keeps routing of children of products in `children`
+    """
+
+    requires_grad = False
+
+    def __init__(self, matrix, children=None):
+        matrix = matrix.detach().float()
+        if matrix.dim() != 2:
+            raise ValueError('Only 2-dimensional matrices can be quantized, got ' + str(matrix.dim()))
+        self.children = children
+        self.from_size, self.to_size = matrix.size()
+        magnitude = matrix.abs().max().item() if matrix.numel() > 0 else 0.0
+        self.scale = magnitude / 127 if magnitude > 0 else 1.0
+        # Weights of torch linear layers are transposed
+        self.weight = torch.quantize_per_tensor(matrix.t().contiguous(), self.scale, 0, torch.qint8)
+        self.packed = torch.ops.quantized.linear_prepack(self.weight, None)
+        self._values = self.weight.int_repr()
+
+    def size(self):
+        return torch.Size([self.from_size, self.to_size])
+
+    def dim(self):
+        return 2
+
+    def left_mm(self, tensor):
+        """
+        :param tensor: Float tensor [rows, from_size]
+        :return: Product of tensor and this matrix [rows, to_size]
+        """
+        return torch.ops.quantized.linear_dynamic(tensor.float().contiguous(), self.packed)
+
+    def element(self, i, j, rows):
+        value = self._values[j, i].item() * self.scale
+        return value, abs(value)
+
+    def dequantize(self):
+        return self.weight.dequantize().t()
+
+    def nbytes(self):
+        return self.from_size * self.to_size
+
+    def __reduce__(self):
+        return _restore, (self.dequantize(), self.children)
+
+    def __repr__(self):
+        return 'QuantizedMatrix(' + str(self.from_size) + 'x' + str(self.to_size) + ', scale=' + str(self.scale) + ')'
+
+
+def _restore(matrix, children):
+    return QuantizedMatrix(matrix, children)
+
+
+def quantize_operator(operator):
+    """
+    Quantizes all matrices of OperatorTree. Matrices of ensembles are left as they are
+
+    :param operator: OperatorTree
+    :return: OperatorTree
+    """
+    def quantize_matrix(matrix):
+        if not isinstance(matrix, torch.Tensor) or matrix.dim() != 2:
+            return matrix
+        return QuantizedMatrix(matrix, getattr(matrix, 'children', None))
+
+    return OperatorTree(
+        operator.tree.apply(quantize_matrix),
+        [None if child is None else quantize_operator(child) for child in operator.children]
+    )
+
+
+def quantize(net):
+    """
+    Quantizes weights of all TrainableLayers of the network in place. Quantized weights aren't parameters anymore,
+    biases stay float
+
+    :param net: FunctionalModule
+    :return: The same network
+    """
+    for module in net.modules():
+        if isinstance(module, TrainableLayer):
+            module.weights = quantize_operator(module.weights)
+            module._parameters.clear()
+            module._register_tree_parameters('', [], module.bias)
+    return net
+
+
+class QuantizationReport:
+    """
+    Comparison of strict results of a network before and after quantization
+    """
+
+    def __init__(self, rows, mismatches, max_difference, float_bytes, quantized_bytes):
+        self.rows = rows
+        self.mismatches = mismatches
+        self.max_difference = max_difference
+        self.float_bytes = float_bytes
+        self.quantized_bytes = quantized_bytes
+
+    def accuracy(self):
+        """
+        :return: Fraction of rows with equal strict results
+        """
+        return 1.0 if self.rows == 0 else 1.0 - len(self.mismatches) / self.rows
+
+    def __repr__(self):
+        return 'QuantizationReport(accuracy=' + str(self.accuracy()) + ', mismatches=' + str(len(self.mismatches)) + \
+               ', max_difference=' + str(self.max_difference) + ', weights: ' + str(self.float_bytes) + ' -> ' + \
+               str(self.quantized_bytes) + ' bytes)'
+
+
+def quantize_with_report(net, *inputs):
+    """
+    Quantizes the network in place and compares it's results on inputs before and after quantization
+
+    :param net: FunctionalModule
+    :param inputs: TensorTrees - arguments of the network, passed as to `FunctionalModule.call`
+    :return: QuantizationReport
+    """
+    with torch.no_grad():
+        expected = net.call(*inputs)
+        float_bytes = _weight_bytes(net)
+        quantize(net)
+        actual = net.call(*inputs)
+    expected_values = decode(expected.strict())
+    actual_values = decode(actual.strict())
+    mismatches = [row for (row, (a, b)) in enumerate(zip(expected_values, actual_values)) if a != b]
+    max_difference = (expected.tensor - actual.tensor).abs().max().item() if expected.rows() > 0 else 0.0
+    return QuantizationReport(len(expected_values), mismatches, max_difference, float_bytes, _weight_bytes(net))
+
+
+def _weight_bytes(net):
+    total = 0
+    for module in net.modules():
+        if isinstance(module, TrainableLayer):
+            for matrix in _operator_matrices(module.weights):
+                if isinstance(matrix, QuantizedMatrix):
+                    total += matrix.nbytes()
+                else:
+                    total += matrix.numel() * matrix.element_size()
+    return total
+
+
+def _operator_matrices(operator):
+    yield from _tree_tensors(operator.tree)
+    for child in operator.children:
+        if child is not None:
+            yield from _operator_matrices(child)
+
+
+def _tree_tensors(tree):
+    yield tree.tensor
+    for child in tree.children:
+        if child is not None:
+            yield from _tree_tensors(child)
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+
+from .trees import stack
+
+
+class BatchingEngine:
+    """
+    Evaluates a network on requests from many threads or coroutines.
+
+    Requests that arrive concurrently are merged with `stack` into one batch, which is evaluated by one forward
+    call in a background thread. Only requests with the same calling convention and number of arguments are
+    merged, other requests wait for the next batches in the order of arrival. Batch is started when it has
+    `max_batch_size` rows or when the oldest request has waited for `max_latency` seconds. Result of the batch
+    is split back to requests by rows.
+    """
+
+    def __init__(self, net, max_batch_size=64, max_latency=0.005):
+        self.net = net
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.metrics = EngineMetrics()
+
+        self._queue = deque()
+        self._queued_rows = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name='BatchingEngine', daemon=True)
+        self._thread.start()
+
+    def submit(self, *trees):
+        """
+        Adds request to the queue
+
+        :param trees: TensorTrees - arguments of the network, passed as to `FunctionalModule.call`
+        :return: Future with the resulting TensorTree
+        """
+        request = _Request(trees)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Engine is closed')
+            self._queue.append(request)
+            self._queued_rows += request.rows
+            self.metrics.set_queue_depth(len(self._queue))
+            self._condition.notify()
+        return request.future
+
+    async def submit_async(self, *trees):
+        """
+        Adds request to the queue and waits for it's result
+
+        :param trees: TensorTrees - arguments of the network
+        :return: Resulting TensorTree
+        """
+        return await asyncio.wrap_future(self.submit(*trees))
+
+    def call(self, *trees):
+        """
+        Evaluates the network on one request, blocks until the result is ready
+
+        :param trees: TensorTrees - arguments of the network
+        :return: Resulting TensorTree
+        """
+        return self.submit(*trees).result()
+
+    def close(self):
+        """
+        Evaluates all queued requests and stops the background thread
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._run(batch)
+
+    def _collect(self):
+        with self._condition:
+            while len(self._queue) == 0 and not self._closed:
+                self._condition.wait()
+            if len(self._queue) == 0:
+                return None
+            deadline = self._queue[0].submitted + self.max_latency
+            while self._queued_rows < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = []
+            rows = 0
+            key = self._queue[0].key
+            skipped = deque()
+            while len(self._queue) > 0:
+                request = self._queue[0]
+                if request.key != key:
+                    # Requests with other keys don't limit the batch, compatible requests behind them are merged
+                    skipped.append(self._queue.popleft())
+                    continue
+                if len(batch) > 0 and rows + request.rows > self.max_batch_size:
+                    break
+                self._queue.popleft()
+                self._queued_rows -= request.rows
+                if request.future.set_running_or_notify_cancel():
+                    batch.append(request)
+                    rows += request.rows
+            self._queue.extendleft(reversed(skipped))
+            self.metrics.set_queue_depth(len(self._queue))
+        return batch
+
+    def _run(self, batch):
+        if len(batch) == 0:
+            return
+        try:
+            first = batch[0]
+            inputs = [stack([request.trees[i] for request in batch]) for i in range(len(first.trees))]
+            with torch.inference_mode():
+                result = self.net.call(inputs) if first.wrap else self.net.call(inputs[0])
+            start = 0
+            results = []
+            for request in batch:
+                end = start + request.rows
+                results.append(result.apply(lambda t, start=start, end=end: t[start:end]))
+                start = end
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finished = time.monotonic()
+        self.metrics.add_batch(start, [finished - request.submitted for request in batch])
+        for (request, request_result) in zip(batch, results):
+            request.future.set_result(request_result)
+
+
+class _Request:
+
+    def __init__(self, trees):
+        # Arguments are wrapped to a tuple if they are passed as a list or as many trees
+        if len(trees) == 1 and isinstance(trees[0], list):
+            trees = trees[0]
+            self.wrap = True
+        else:
+            self.wrap = len(trees) > 1
+        if len(trees) == 0:
+            raise ValueError('Request should contain at least one tree')
+        self.trees = list(trees)
+        self.rows = trees[0].rows()
+        # Requests with equal keys can be merged into one batch
+        self.key = (self.wrap, len(self.trees))
+        self.future = Future()
+        self.submitted = time.monotonic()
+
+
+class EngineMetrics:
+    """
+    Statistics of BatchingEngine. Latency is the time between submission of request and it's result
+    """
+
+    WINDOW = 1000   # Number of last requests used for percentiles of latency
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._latencies = deque(maxlen=self.WINDOW)
+
+    def set_queue_depth(self, depth):
+        with self._lock:
+            self.queue_depth = depth
+
+    def add_batch(self, rows, latencies):
+        with self._lock:
+            self.batches += 1
+            self.rows += rows
+            self.requests += len(latencies)
+            self.total_latency += sum(latencies)
+            self.max_latency = max(self.max_latency, *latencies)
+            self._latencies.extend(latencies)
+
+    def snapshot(self):
+        """
+        :return: Dictionary with current values of metrics
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'queue_depth': self.queue_depth,
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_rows': self.rows / self.batches if self.batches > 0 else 0.0,
+                'mean_latency': self.total_latency / self.requests if self.requests > 0 else 0.0,
+                'max_latency': self.max_latency,
+                'p50_latency': _percentile(latencies, 0.5),
+                'p99_latency': _percentile(latencies, 0.99),
+            }
+
+
+def _percentile(values, fraction):
+    if len(values) == 0:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
@@ -0,0 +1,227 @@
+import torch
+
+from .discrete import decode
+from .modules import TrainableLayer
+from .trees import OperatorTree
+
+
+class PrunedMatrix:
+    """
+    Matrix of weights of one node of OperatorTree, which keeps only rows and columns with non-zero elements.
+    Multiplication by it selects used columns of the tensor and scatters results to used columns, so it supports
+    only inference.
+
+    Can be used in trees in place of a tensor, as QuantizedMatrix
+    """
+
+    requires_grad = False
+
+    def __init__(self, matrix, rows, columns, children=None):
+        matrix = matrix.detach()
+        self.from_size, self.to_size = matrix.size()
+        self.rows = rows
+        self.columns = columns
+        self.values = matrix.index_select(0, rows).index_select(1, columns).contiguous()
+        self.children = children
+        self._row_positions = {row: k for (k, row) in enumerate(rows.tolist())}
+        self._column_positions = {column: k for (k, column) in enumerate(columns.tolist())}
+
+    def size(self):
+        return torch.Size([self.from_size, self.to_size])
+
+    def dim(self):
+        return 2
+
+    def left_mm(self, tensor):
+        result = tensor.new_zeros(tensor.size()[0], self.to_size)
+        if self.values.numel() == 0:
+            return result
+        return result.index_copy_(1, self.columns, tensor.index_select(1, self.rows).mm(self.values))
+
+    def element(self, i, j, rows):
+        row = self._row_positions.get(i)
+        column = self._column_positions.get(j)
+        if row is None or column is None:
+            return 0.0, 0.0
+        value = self.values[row, column].item()
+        return value, abs(value)
+
+    def dequantize(self):
+        """
+        :return: Dense matrix with zeros in place of removed elements
+        """
+        matrix = self.values.new_zeros(self.from_size, self.to_size)
+        matrix[self.rows.view(-1, 1), self.columns] = self.values
+        return matrix
+
+    def __repr__(self):
+        return 'PrunedMatrix(' + str(len(self.rows)) + 'x' + str(len(self.columns)) + ' of ' + \
+               str(self.from_size) + 'x' + str(self.to_size) + ')'
+
+
+class SparsificationReport:
+    """
+    Statistics of removed parts of weights and comparison of strict results before and after sparsification
+    """
+
+    def __init__(self):
+        self.removed_operators = 0
+        self.removed_nodes = 0
+        self.removed_routes = 0
+        self.elements = 0
+        self.kept_elements = 0
+        self.rows = 0
+        self.mismatches = []
+        self.max_difference = 0.0
+
+    def accuracy(self):
+        """
+        :return: Fraction of rows with equal strict results
+        """
+        return 1.0 if self.rows == 0 else 1.0 - len(self.mismatches) / self.rows
+
+    def __repr__(self):
+        return 'SparsificationReport(removed operators=' + str(self.removed_operators) + \
+               ', removed nodes=' + str(self.removed_nodes) + ', removed routes=' + str(self.removed_routes) + \
+               ', elements: ' + str(self.elements) + ' -> ' + str(self.kept_elements) + \
+               ', accuracy=' + str(self.accuracy()) + ', max_difference=' + str(self.max_difference) + ')'
+
+
+class Sparsifier:
+    """
+    Removes near-zero parts of weights of TrainableLayers after training: child operators and nodes of weight trees
+    with all elements not greater than eps are replaced by None, routing of children of products is removed for
+    small elements and matrices are shrunk to rows and columns with large elements.
+
+    Matrices are shrunk only if at most `density` of their elements is kept, otherwise they stay dense tensors
+    """
+
+    EPS = 1e-3
+
+    DENSITY = 0.5
+
+    def __init__(self, eps=None, density=None):
+        self.eps = self.EPS if eps is None else eps
+        self.density = self.DENSITY if density is None else density
+        self.report = SparsificationReport()
+
+    def sparsify(self, net):
+        """
+        Sparsifies all TrainableLayers of the network in place. Shrunk matrices aren't parameters anymore
+
+        :param net: FunctionalModule
+        :return: The same network
+        """
+        with torch.no_grad():
+            for module in net.modules():
+                if isinstance(module, TrainableLayer):
+                    module.weights = self.sparsify_operator(module.weights)
+                    module._parameters.clear()
+                    module._register_operator_parameters([], module.weights)
+                    module._register_tree_parameters('', [], module.bias)
+        return net
+
+    def sparsify_operator(self, operator, root=True):
+        """
+        :param operator: OperatorTree
+        :param root: If false, None is returned when all weights of the operator are small
+        :return: OperatorTree or None
+        """
+        children = []
+        for child in operator.children:
+            if child is None:
+                children.append(None)
+                continue
+            new_child = self.sparsify_operator(child, False)
+            if new_child is None:
+                self.report.removed_operators += 1
+            children.append(new_child)
+        if not root and all(child is None for child in children) and self._is_small(operator.tree):
+            return None
+        return OperatorTree(self._sparsify_tree(operator.tree, 0), children)
+
+    def _is_small(self, tree):
+        magnitudes = _magnitudes(tree.tensor)
+        if magnitudes is None or (magnitudes > self.eps).any():
+            return False
+        return all(child is None or self._is_small(child) for child in tree.children)
+
+    def _sparsify_tree(self, tree, level):
+        children = []
+        for child in tree.children:
+            if child is None:
+                children.append(None)
+                continue
+            new_child = self._sparsify_tree(child, level + 1)
+            if new_child is None:
+                self.report.removed_nodes += 1
+            children.append(new_child)
+        matrix = tree.tensor
+        if not isinstance(matrix, torch.Tensor):
+            return tree._layer(matrix, children)
+        magnitudes = matrix.detach().abs()
+        if matrix.dim() == 3:
+            # The largest element of all members of ensemble
+            magnitudes = magnitudes.max(0)[0]
+        large = magnitudes > self.eps
+        # Columns of the first level of trees of child operators are matched by positions of it's children,
+        # so only deeper nodes can be removed
+        if level >= 2 and all(child is None for child in children) and not large.any():
+            return None
+        return tree._layer(self._sparsify_matrix(matrix, large), children)
+
+    def _sparsify_matrix(self, matrix, large):
+        routing = getattr(matrix, 'children', None)
+        if routing is not None:
+            large_list = large.tolist()
+            new_routing = [
+                [route and large_list[i][j] for (j, route) in enumerate(row)] for (i, row) in enumerate(routing)
+            ]
+            self.report.removed_routes += sum(row.count(True) for row in routing) - \
+                sum(row.count(True) for row in new_routing)
+            routing = new_routing
+        rows = large.any(1).nonzero().view(-1)
+        columns = large.any(0).nonzero().view(-1)
+        self.report.elements += matrix.numel()
+        if matrix.dim() == 2 and rows.numel() * columns.numel() <= self.density * large.numel():
+            self.report.kept_elements += rows.numel() * columns.numel()
+            return PrunedMatrix(matrix, rows, columns, routing)
+        self.report.kept_elements += matrix.numel()
+        if routing is not None:
+            matrix.children = routing
+        return matrix
+
+
+def _magnitudes(matrix):
+    """
+    :return: Absolute values of elements of a tensor or of a matrix, which can be dequantized, e.g. QuantizedMatrix.
+        None for other matrices, they are never small
+    """
+    if not isinstance(matrix, torch.Tensor):
+        dequantize = getattr(matrix, 'dequantize', None)
+        if dequantize is None:
+            return None
+        matrix = dequantize()
+    return matrix.detach().abs()
+
+
+def sparsify_with_report(net, *inputs, eps=None, density=None):
+    """
+    Sparsifies the network in place and compares it's results on inputs, e.g. a validation set, before and after
+
+    :param net: FunctionalModule
+    :param inputs: TensorTrees - arguments of the network, passed as to `FunctionalModule.call`
+    :return: SparsificationReport
+    """
+    sparsifier = Sparsifier(eps, density)
+    with torch.no_grad():
+        expected = net.call(*inputs)
+        sparsifier.sparsify(net)
+        actual = net.call(*inputs)
+    report = sparsifier.report
+    expected_values = decode(expected.strict())
+    actual_values = decode(actual.strict())
+    report.rows = len(expected_values)
+    report.mismatches = [row for (row, (a, b)) in enumerate(zip(expected_values, actual_values)) if a != b]
+    report.max_difference = (expected.tensor - actual.tensor).abs().max().item() if expected.rows() > 0 else 0.0
+    return report
@@ -1,2 +1,3 @@
-from .tensor_tree import SumTree, ProdTree, empty_tree, stack, make_tuple
+from .tensor_tree import SumTree, ProdTree, LazyChildren, empty_tree, stack, make_tuple, pack, unpack
 from .operator_tree import OperatorTree
+from .packed_tree import PackedTree, PackedLevels, pack_recursive
@@ -1,5 +1,6 @@
 import torch
 from .tensor_tree import TensorTree, SumTree
+from ..config import current_config
 
 
 class OperatorTree:
@@ -7,8 +8,6 @@ class OperatorTree:
     Tree that contains TensorTree in every node. It's equivalent to a matrix operator
     """
 
-    EPS = 1e-4
-
     def __init__(self, tree, children):
         self.tree = tree
         self.children = children
@@ -63,11 +62,12 @@ class OperatorTree:
 
         result = tree.tree_mul(self.tree)
 
+        eps = current_config().operator_eps
         for (index, (operator_child, tree_child)) in enumerate(zip(self.children, tree.children)):
             if operator_child is not None and tree_child is not None:
                 child_presence = tree.tensor[:, index].view(tree.rows(), 1)
-                if (child_presence < OperatorTree.EPS).all():
-                    # Skip child if all values are lower than EPS
+                if eps > 0 and (child_presence < eps).all():
+                    # Skip child if all values are lower than eps, zero eps disables the check depending on data
                     continue
                 result = result + operator_child.tree_mul(tree_child).cmul(child_presence)
         return result
@@ -0,0 +1,203 @@
+import torch
+
+from ..allocation import zeros
+from .tensor_tree import SumTree, ProdTree, LazyChildren, stack
+
+
+class PackedLevels:
+    """
+    Values of a recursive ADT, e.g. lists or naturals, stored by levels of recursion as packed sequences.
+
+    Level k of a row is the sum node reached from the root by k steps through operand `operand` of constructor
+    `position`. Rows are sorted by their lengths - numbers of levels, so the rows which reach level k are the first
+    `batch_sizes[k]` sorted rows. Sum nodes of all levels and all rows are stacked into one tree `sums`, products
+    of the recursive constructor - into `products`, level k occupies rows starting at `offsets[k]`. Children of
+    the levels, except for the recursive operand, are stacked with them, so every position of the type is stored
+    in one tensor for all elements of the batch.
+
+    It's a compact format for storage and transfer, e.g. pickling and loaders: rows don't store levels, which they
+    don't reach. It's not an optimization of evaluation: layers don't work on levels directly, every level, which
+    is read, is expanded back to all rows of the batch, see `level`, and it's nodes are created as for nested trees
+    """
+
+    def __init__(self, rows, position, operand, lengths, sorted_indices, batch_sizes, sums, products, product_levels):
+        self.rows = rows
+        self.position = position
+        self.operand = operand
+        self.lengths = lengths
+        self.sorted_indices = sorted_indices
+        self.batch_sizes = batch_sizes
+        self.sums = sums
+        self.products = products
+        self.offsets = [0]
+        for size in batch_sizes:
+            self.offsets.append(self.offsets[-1] + size)
+        # Number of levels, which have products of the recursive constructor
+        self.product_levels = product_levels
+        self._identity = None
+
+    def depth(self):
+        return len(self.batch_sizes)
+
+    def level(self, level):
+        """
+        :param level: Level of recursion
+        :return: Tuple - tensor of the sum node of the level for all rows and it's lazy children. Rows, which don't
+            reach the level, are filled by zeros
+        """
+        start = self.offsets[level]
+        size = self.batch_sizes[level]
+        indices = self.sorted_indices[:size]
+        tensor = self._scatter(self.sums.tensor[start:start + size], indices)
+        thunks = []
+        for (pos, child) in enumerate(self.sums.children):
+            if pos == self.position:
+                thunks.append(None if level >= self.product_levels else _product_thunk(self, level))
+            elif child is None:
+                thunks.append(None)
+            else:
+                thunks.append(_rows_thunk(self, child, start, size))
+        return tensor, LazyChildren(thunks)
+
+    def product(self, level):
+        """
+        :param level: Level of recursion
+        :return: ProdTree of the recursive constructor of the level for all rows
+        """
+        start = self.offsets[level]
+        size = self.batch_sizes[level]
+        indices = self.sorted_indices[:size]
+        tensor = self._scatter(self.products.tensor[start:start + size], indices)
+        thunks = []
+        for (pos, child) in enumerate(self.products.children):
+            if pos == self.operand:
+                thunks.append(_level_thunk(self, level + 1) if level + 1 < self.depth() else None)
+            elif child is None:
+                thunks.append(None)
+            else:
+                thunks.append(_rows_thunk(self, child, start, size))
+        return ProdTree(tensor, LazyChildren(thunks))
+
+    def rows_of_level(self, tree, start, size):
+        """
+        Expands rows of a level, stored in a stacked tree, to all rows of the batch
+        """
+        indices = self.sorted_indices[:size]
+        return tree.apply(lambda tensor: self._scatter(tensor[start:start + size], indices))
+
+    def _scatter(self, tensor, indices):
+        if tensor.size()[0] == self.rows and self._is_identity(indices):
+            return tensor
+        result = zeros(self.rows, *tensor.size()[1:], like=tensor, temporary=True)
+        return result.index_copy(0, indices, tensor)
+
+    def _is_identity(self, indices):
+        if self._identity is None:
+            self._identity = bool((self.sorted_indices == torch.arange(self.rows, device=indices.device)).all())
+        return self._identity
+
+
+def _product_thunk(packed, level):
+    return lambda: packed.product(level)
+
+
+def _level_thunk(packed, level):
+    return lambda: PackedTree(packed, level)
+
+
+def _rows_thunk(packed, tree, start, size):
+    return lambda: packed.rows_of_level(tree, start, size)
+
+
+class PackedTree(SumTree):
+    """
+    Level of PackedLevels, which behaves as an ordinary SumTree, so networks, patterns and losses use it as nested
+    trees. The next level is created only when it's reached, e.g. by pattern matching of the tail of a list.
+    TrainableLayer and GuardedLayer have no packed versions of contraction and matching, so a traversal creates
+    a node and full-batch tensors for every reached level, as a nested tree does: memory and the number of
+    Python objects of evaluation aren't reduced, only the stored data is.
+    Tensors of levels may be views of the storage, in-place operations on them change all levels which share it
+    """
+
+    def __init__(self, packed, level=0):
+        tensor, children = packed.level(level)
+        super().__init__(tensor, children)
+        self.packed = packed
+        self.level = level
+
+    def depth(self):
+        """
+        :return: Number of levels, reachable from this one
+        """
+        return self.packed.depth() - self.level
+
+    def lengths(self):
+        """
+        :return: Tensor with numbers of levels of every row, starting from this one
+        """
+        return (self.packed.lengths - self.level).clamp(min=0)
+
+    def __reduce_ex__(self, protocol):
+        return PackedTree, (self.packed, self.level)
+
+    def __repr__(self):
+        return 'PackedTree(level=' + str(self.level) + ', depth=' + str(self.depth()) + ', rows=' + \
+               str(self.packed.rows) + ')'
+
+
+def pack_recursive(tree, position, operand, eps=0.5):
+    """
+    Packs a nested tree of a recursive ADT, e.g. a list encoded by `discrete.encode`.
+    A row ends at the first level, where presence of the recursive operand isn't greater than eps: values of deeper
+    levels of such rows are dropped
+
+    :param tree: SumTree of the recursive type
+    :param position: Index of the recursive constructor, e.g. of Cons
+    :param operand: Index of the recursive operand of the constructor, e.g. of the tail
+    :param eps: Threshold of presence of the recursive operand
+    :return: PackedTree
+    """
+    rows = tree.rows()
+    if rows == 0:
+        raise ValueError('Tree without rows can not be packed')
+    device = tree.tensor.device
+    nodes = []
+    products = []
+    active = torch.arange(rows, device=device)
+    lengths = torch.zeros(rows, dtype=torch.long, device=device)
+    node = tree
+    while node is not None and active.numel() > 0:
+        nodes.append(node)
+        lengths[active] += 1
+        product = node.children[position]
+        if product is None:
+            break
+        products.append(product)
+        continued = (node.tensor[active, position] * product.tensor[active, operand]).detach() > eps
+        active = active[continued]
+        node = product.children[operand]
+    _, sorted_indices = lengths.sort(descending=True, stable=True)
+    length_list = lengths.tolist()
+    batch_sizes = [sum(1 for length in length_list if length > level) for level in range(len(nodes))]
+
+    level_sums = []
+    level_products = []
+    for (level, node) in enumerate(nodes):
+        indices = sorted_indices[:batch_sizes[level]]
+        level_sums.append(_select_level(node, indices, position))
+        if level < len(products):
+            level_products.append(_select_level(products[level], indices, operand))
+    sums = stack(level_sums)
+    packed_products = stack(level_products) if len(level_products) > 0 else None
+    packed = PackedLevels(
+        rows, position, operand, lengths, sorted_indices, batch_sizes, sums, packed_products, len(level_products)
+    )
+    return PackedTree(packed)
+
+
+def _select_level(node, indices, recursive):
+    children = [
+        None if pos == recursive or child is None else child.select_rows(indices)
+        for (pos, child) in enumerate(node.children)
+    ]
+    return node._layer(node.tensor[indices], children)
@@ -1,7 +1,14 @@
+import pickle
 from abc import abstractmethod
+from collections.abc import Sequence
+from functools import reduce
+from operator import mul
 
 import torch
 
+from ..allocation import accumulation_dtype, zeros, ones
+from ..config import current_config
+
 
 class TensorTree:
     """
@@ -11,67 +18,166 @@ class TensorTree:
     the structure.
     """
 
+    # Class of nodes, which are created by operations on this tree. Subclasses with other representations of data,
+    # e.g. PackedTree, produce ordinary nodes
+    _layer = None
+
     def __init__(self, tensor, children):
         self.tensor = tensor
         self.children = children
 
+    @property
+    def tensor(self):
+        """
+        Values of this layer. Factors of `cmul` are kept pending and applied on the first read, one by one in
+        the order of calls and in the gradient mode of every call, so the result is the same as of eager
+        multiplication. Tensors used by pending factors must not be modified in place before they are applied
+        """
+        if self._scales:
+            tensor = self._tensor
+            for (constant, mode) in self._scales:
+                tensor = _call_in_mode(mode, lambda: constant * tensor)
+            self._tensor = tensor
+            self._scales = ()
+        return self._tensor
+
+    @tensor.setter
+    def tensor(self, tensor):
+        self._tensor = tensor
+        self._scales = ()
+
     def to(self, device):
         new_tensor = self.tensor.to(device)
         new_children = [child.to(device) if child is not None else None for child in self.children]
-        return self.__class__(new_tensor, new_children)
+        return self._layer(new_tensor, new_children)
 
     def type(self, tensor_type):
         new_tensor = self.tensor.type(tensor_type)
         new_children = [child.type(tensor_type) if child is not None else None for child in self.children]
-        return self.__class__(new_tensor, new_children)
+        return self._layer(new_tensor, new_children)
 
     def rows(self):
-        return self.tensor.size()[0]
+        # Factors don't change shape, they aren't applied
+        return self._tensor.size()[0]
+
+    def force(self):
+        """
+        Computes all lazy children and pending factors of `cmul` of the whole tree, e.g. to measure the time of
+        the operation, which created the tree
+
+        :return: This tree
+        """
+        # Reading of the tensor applies pending factors
+        _ = self.tensor
+        for child in self.children:
+            if child is not None:
+                child.force()
+        return self
+
+    def __reduce_ex__(self, protocol):
+        """
+        Pickles the whole tree as one contiguous block and a compact structure descriptor.
+
+        By default the block is passed as a single tensor, so ForkingPickler of torch.multiprocessing, which is used
+        by DataLoader workers and queues, moves it to shared memory at once. When protocol 5 is requested
+        explicitly, the block is passed as a PickleBuffer, which is sent out-of-band if `buffer_callback` is given.
+        Read-only buffers, e.g. bytes received from a socket, are copied on loading, as tensors must be writable.
+        Trees that can't be packed (tensors with gradients, mixed types) are pickled as usual
+
+        :param protocol: Pickle protocol
+        :return: Reduce tuple
+        """
+        tensors = []
+        descriptor = _describe(self, tensors)
+        if not _is_packable(tensors):
+            return super().__reduce_ex__(protocol)
+        flat = _pack_tensors(tensors)
+        if protocol >= 5 and flat.numel() > 0 and flat.device.type == 'cpu' and flat.dtype in _BUFFER_TYPES:
+            return _unpack_buffer, (pickle.PickleBuffer(flat.numpy()), flat.dtype, descriptor)
+        return unpack, (flat, descriptor)
+
+    def prune(self, eps=1e-3, multiplier=None, in_place=False):
+        """
+        Zeroes rows of children, which presence in this tree is not greater than eps. Children which are pruned
+        in all rows are replaced by None
 
-    def prune(self, eps=1e-3, multiplier=None):
+        :param eps: Threshold of presence
+        :param multiplier: Boolean tensor [rows, 1] of rows which weren't pruned by parents of this tree
+        :param in_place: Modify tensors of this tree instead of creating new ones, allowed only without gradients.
+            Nodes with shared tensors, which aren't contiguous, e.g. broadcast constants, are still replaced
+        :return: TensorTree
+        """
+        if in_place and torch.is_grad_enabled():
+            raise ValueError('In-place pruning is allowed only when gradients are disabled')
+        node_in_place = in_place and _is_writable(self.tensor)
+        keep = self.tensor.detach() > eps
         if multiplier is None:
             new_tensor = self.tensor
         else:
-            new_tensor = self.tensor * multiplier
+            keep &= multiplier
+            if node_in_place:
+                new_tensor = self.tensor.mul_(multiplier)
+            else:
+                new_tensor = self.tensor * multiplier
+        # Single synchronisation for all children
+        present = keep.any(0).tolist()
         new_children = []
-        for (pos, child) in enumerate(self.children):
-            if child is None:
-                new_children.append(None)
-                continue
-            not_prune = self.tensor.detach()[:, pos] > eps
-            if not not_prune.any():
+        for pos in range(len(self.children)):
+            # Pruned lazy children aren't computed
+            if not present[pos] or _is_missing(self.children, pos):
                 new_children.append(None)
                 continue
-            not_prune = not_prune.view(self.rows(), 1).float()
-            if multiplier is None:
-                new_multiplier = not_prune
-            else:
-                new_multiplier = multiplier * not_prune
-            pruned = child.prune(eps, new_multiplier)
+            pruned = self.children[pos].prune(eps, keep[:, pos:pos + 1], in_place)
             new_children.append(pruned)
-        return self.__class__(new_tensor, new_children)
+        if node_in_place:
+            self.children = new_children
+            return self
+        return self._layer(new_tensor, new_children)
 
     @abstractmethod
-    def _make_strict_tensor(self, tensor, eps):
+    def _make_strict_tensor(self, tensor, eps, in_place):
         pass
 
-    def strict(self, eps=0.5):
-        new_tensor = self._make_strict_tensor(self.tensor, eps)
-        new_children = [child.strict(eps) if child is not None else None for child in self.children]
-        return self.__class__(new_tensor, new_children)
+    def strict(self, eps=0.5, in_place=False, strip=False):
+        """
+        Replaces values of the tree by 0 and 1: the most probable alternative of sums and operands of products
+        which presence is greater than eps
+
+        :param eps: Threshold of presence of operands of products
+        :param in_place: Modify tensors of this tree instead of creating new ones, allowed only without gradients.
+            Nodes with shared tensors, which aren't contiguous, e.g. broadcast constants, are still replaced
+        :param strip: Replace children which are absent in all rows by None
+        :return: TensorTree
+        """
+        if in_place and torch.is_grad_enabled():
+            raise ValueError('In-place hardening is allowed only when gradients are disabled')
+        node_in_place = in_place and _is_writable(self.tensor)
+        new_tensor = self._make_strict_tensor(self.tensor, eps, node_in_place)
+        present = new_tensor.any(0).tolist() if strip else None
+        new_children = []
+        for pos in range(len(self.children)):
+            if (strip and not present[pos]) or _is_missing(self.children, pos):
+                new_children.append(None)
+            else:
+                new_children.append(self.children[pos].strict(eps, in_place, strip))
+        if node_in_place:
+            self.children = new_children
+            return self
+        return self._layer(new_tensor, new_children)
 
     def cmul(self, constant):
         """
-        Multiply this tree by a constant value
+        Multiply this tree by a constant value. Tensors of the result aren't computed until they are read
 
-        :param constant: Constant tensor that supports broadcasting
+        :param constant: Constant tensor [rows, 1] or number
         :return: TensorTree
         """
 
-        new_tensor = constant * self.tensor
-        new_children = [child.cmul(constant) if child is not None else None for child in self.children]
+        new_children = _lazy_map(self.children, lambda child: child.cmul(constant))
+        result = self._layer(self._tensor, new_children)
+        result._scales = self._scales + ((constant, _grad_mode()),)
 
-        return self.__class__(new_tensor, new_children)
+        return result
 
     def cadd(self, constant):
         """
@@ -82,9 +188,9 @@ class TensorTree:
         """
 
         new_tensor = self.tensor + constant
-        new_children = [child.cadd(constant) if child is not None else None for child in self.children]
+        new_children = _lazy_map(self.children, lambda child: child.cadd(constant))
 
-        return self.__class__(new_tensor, new_children)
+        return self._layer(new_tensor, new_children)
 
     @abstractmethod
     def matmul(self, matrix, tree_class):
@@ -117,29 +223,29 @@ class TensorTree:
 
         new_tensor = tensor_op(self.tensor, other.tensor)
 
-        new_children = []
-
-        for (cur, (self_child, other_child)) in enumerate(zip(self.children, other.children)):
-            if self_child is None:
-                if other_child is None:
+        # Children are computed only when they are reached
+        thunks = []
+        for cur in range(min(len(self.children), len(other.children))):
+            self_missing = _is_missing(self.children, cur)
+            other_missing = _is_missing(other.children, cur)
+            if self_missing:
+                if other_missing:
                     # Both children are missing
-                    next_child = None
+                    thunks.append(None)
                 else:
                     # Other child is present
-                    self_constant = self.tensor[:, cur].view(self.rows(), 1)
-                    next_child = constant_op(other_child, self_constant)
+                    thunks.append(_constant_op_thunk(constant_op, _pending(other.children, cur), self.tensor, cur))
             else:
-                if other_child is None:
+                if other_missing:
                     # Self child is present
-                    other_constant = other.tensor[:, cur].view(other.rows(), 1)
-                    next_child = constant_op(self_child, other_constant)
+                    thunks.append(_constant_op_thunk(constant_op, _pending(self.children, cur), other.tensor, cur))
                 else:
                     # Both are present
-                    next_child = self_child._pointwise_op(tensor_op, constant_op, other_child)
-
-            new_children.append(next_child)
+                    thunks.append(_pointwise_op_thunk(
+                        tensor_op, constant_op, _pending(self.children, cur), _pending(other.children, cur)
+                    ))
 
-        return self.__class__(new_tensor, new_children)
+        return self._layer(new_tensor, LazyChildren(thunks))
 
     def __mul__(self, other):
         """
@@ -178,19 +284,32 @@ class TensorTree:
 
     def flatten(self, like_tree=None):
         """
-        Flattens all tensors and erases type information
+        Flattens all tensors and erases type information.
+        Lazy children, which are absent in all rows, aren't computed when shape of the result is given by like_tree
+        and gradients aren't needed. The check depends on data, so it's skipped while tracing
 
         :return: Flat tensor
         """
         to_cat = []
         rows = self.tensor.size()[0]
-        for (pos, child) in enumerate(self.children):
+        absent = None
+        for pos in range(len(self.children)):
             like_child = None if like_tree is None else like_tree.children[pos]
 
+            if like_child is not None and not self.tensor.requires_grad and isinstance(self.children, LazyChildren) \
+                    and not self.children.is_forced(pos) and not torch.jit.is_tracing():
+                if absent is None:
+                    # Single synchronisation for all children
+                    absent = (self.tensor == 0).all(0).tolist()
+                if absent[pos]:
+                    to_cat.append(zeros(rows, like_child.flat_width(), like=self.tensor, temporary=True))
+                    continue
+
+            child = self.children[pos]
             if child is None:
                 if like_child is not None:
                     zeros_count = like_child.flat_width()
-                    flat = torch.zeros(rows, zeros_count)
+                    flat = zeros(rows, zeros_count, like=self.tensor, temporary=True)
                 else:
                     flat = self.tensor[:, pos].view(rows, 1)
             else:
@@ -211,7 +330,7 @@ class TensorTree:
         if not isinstance(other, TensorTree):
             raise NotImplemented
 
-        new_tree = self.matmul(other.tensor, other.__class__)
+        new_tree = self.matmul(other.tensor, other._layer)
 
         rows = new_tree.rows()
         child_columns = []
@@ -219,7 +338,7 @@ class TensorTree:
 
         for other_child in other.children:
             if other_child is None:
-                child_columns.append(torch.zeros(rows))
+                child_columns.append(zeros(rows, like=new_tree.tensor, temporary=True))
                 child_children.append(None)
             else:
                 multiplied = self.tree_mul(other_child)
@@ -227,9 +346,7 @@ class TensorTree:
                 child_children.append(multiplied)
 
         child_tensor = torch.stack(child_columns, 1)
-        child_tree = self.__class__(child_tensor, child_children)
-
-        print(new_tree.flatten(), child_tree.flatten())
+        child_tree = self._layer(child_tensor, child_children)
 
         return new_tree + child_tree
 
@@ -240,9 +357,9 @@ class TensorTree:
         :param other: Other tree
         :return: TensorTree
         """
-        assert type(self) == type(other)
-        this_layer = self.__class__
-        next_layer = SumTree if self.__class__ == ProdTree else ProdTree
+        assert self._layer == other._layer
+        this_layer = self._layer
+        next_layer = SumTree if this_layer == ProdTree else ProdTree
         sum_base_tree = self.matmul(other.tensor, this_layer)
         rows = self.rows()
 
@@ -250,7 +367,7 @@ class TensorTree:
         sum_children = []
         for other_product in other.children:
             if other_product is None:
-                sum_columns.append(torch.zeros(rows))
+                sum_columns.append(zeros(rows, like=sum_base_tree.tensor, temporary=True))
                 sum_children.append(None)
                 continue
 
@@ -259,7 +376,7 @@ class TensorTree:
             product_children = []
             for other_product_child in other_product.children:
                 if other_product_child is None:
-                    product_columns.append(torch.zeros(rows))
+                    product_columns.append(zeros(rows, like=sum_base_tree.tensor, temporary=True))
                     product_children.append(None)
                     continue
                 multiplied = self.typed_tree_mul(other_product_child)
@@ -279,8 +396,8 @@ class TensorTree:
 
     def apply(self, func):
         new_tensor = func(self.tensor)
-        new_children = [None if child is None else child.apply(func) for child in self.children]
-        return self.__class__(new_tensor, new_children)
+        new_children = _lazy_map(self.children, lambda child: child.apply(func))
+        return self._layer(new_tensor, new_children)
 
     def select_rows(self, mask):
         return self.apply(lambda tensor: tensor[mask])
@@ -300,8 +417,8 @@ class TensorTree:
 
     def apply_structured_activation(self, funcs):
         new_tensor = self._apply_structured_function(funcs, self.tensor)
-        new_children = [None if child is None else child.apply_structured_activation(funcs) for child in self.children]
-        return self.__class__(new_tensor, new_children)
+        new_children = _lazy_map(self.children, lambda child: child.apply_structured_activation(funcs))
+        return self._layer(new_tensor, new_children)
 
     def __repr__(self):
         return 'Tree with content ' + str(self.tensor) + ' and children: ' \
@@ -316,17 +433,15 @@ class SumTree(TensorTree):
     def _apply_structured_function(self, funcs, tensor):
         return funcs.sum(tensor)
 
-    def _make_strict_tensor(self, tensor, eps):
-        res = torch.zeros_like(tensor)
-        max_arg = tensor.max(1)[1]
-        for (i, j) in enumerate(max_arg):
-            res[i, j] = 1
-        return res
+    def _make_strict_tensor(self, tensor, eps, in_place):
+        max_arg = tensor.max(1, keepdim=True)[1]
+        res = tensor.zero_() if in_place else torch.zeros_like(tensor)
+        return res.scatter_(1, max_arg, 1)
 
     def matmul(self, matrix, tree_class):
         # Multiply tensor by a matrix
-        new_tensor = self.tensor.mm(matrix)
-        _, columns = matrix.size()
+        new_tensor = _mm(self.tensor, matrix)
+        columns = matrix.size()[-1]
 
         new_children = [None] * columns
 
@@ -338,33 +453,44 @@ class SumTree(TensorTree):
 
 class ProdTree(TensorTree):
 
-    EPS = 1e-3
-
     def presence(self):
-        return self.tensor.prod(1)
+        # Products of many small values lose precision quickly in low precision types
+        dtype = self.tensor.dtype
+        accumulation = accumulation_dtype(dtype)
+        if accumulation == dtype:
+            return self.tensor.prod(1)
+        return self.tensor.to(accumulation).prod(1).to(dtype)
 
     def _apply_structured_function(self, funcs, tensor):
         return funcs.prod(tensor)
 
-    def _make_strict_tensor(self, tensor, eps):
-        res = torch.zeros_like(tensor)
-        res[tensor > eps] = 1
-        return res
+    def _make_strict_tensor(self, tensor, eps, in_place):
+        present = tensor > eps
+        if in_place:
+            return tensor.copy_(present)
+        return present.to(tensor.dtype)
 
     def matmul(self, matrix, tree_class):
-        new_tensor = self.tensor.mm(matrix)
-        _, columns = matrix.size()
+        new_tensor = _mm(self.tensor, matrix)
+        columns = matrix.size()[-1]
+        rows = self.rows()
 
         # Multiply children
+        eps = current_config().prod_eps
         new_children = [None] * columns
         for (i, child) in enumerate(self.children):
             if child is None:
                 continue
             for j in range(columns):
-                element = matrix[i, j]
-                if not matrix.children[i][j] or abs(element.item()) < self.EPS:
+                if not matrix.children[i][j]:
                     # Skip such children
                     continue
+                element, magnitude = _matrix_element(matrix, i, j, rows)
+                if magnitude < eps:
+                    continue
+                if isinstance(element, torch.Tensor) and element.dtype != self.tensor.dtype:
+                    # Multipliers of rows of ensembles would promote children to the type of weights
+                    element = element.to(self.tensor.dtype)
 
                 multiplied = child.cmul(element)
                 if new_children[j] is None:
@@ -378,8 +504,233 @@ class ProdTree(TensorTree):
         return 'Prod' + super().__repr__()
 
 
-def empty_tree():
-    return SumTree(torch.tensor([]), [])
+SumTree._layer = SumTree
+ProdTree._layer = ProdTree
+
+
+class LazyChildren(Sequence):
+    """
+    Children of a TensorTree, which are computed on first access and then cached. Number of children and absence
+    of missing ones are known without computing them, so parents can check presence before forcing a child.
+
+    Children are computed in the gradient mode, in which the list was created. Trees used by pending children
+    must not be modified in place before the children are computed
+    """
+
+    def __init__(self, thunks):
+        """
+        :param thunks: List of functions without arguments, which return TensorTrees, or None for missing children
+        """
+        self._thunks = thunks
+        self._values = [None] * len(thunks)
+        self._mode = _grad_mode()
+
+    def __len__(self):
+        return len(self._thunks)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        thunk = self._thunks[index]
+        if thunk is not None:
+            self._values[index] = _call_in_mode(self._mode, thunk)
+            self._thunks[index] = None
+        return self._values[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def is_forced(self, index):
+        return self._thunks[index] is None
+
+    def is_missing(self, index):
+        return self._thunks[index] is None and self._values[index] is None
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+    def __repr__(self):
+        return '[' + ', '.join(
+            '<pending>' if thunk is not None else repr(value) for (thunk, value) in zip(self._thunks, self._values)
+        ) + ']'
+
+
+def _grad_mode():
+    return torch.is_grad_enabled(), torch.is_inference_mode_enabled()
+
+
+def _call_in_mode(mode, func):
+    """
+    Calls the function in the gradient mode, in which a deferred computation was requested
+    """
+    if mode == _grad_mode():
+        return func()
+    grad_enabled, inference = mode
+    with torch.inference_mode(inference), torch.set_grad_enabled(grad_enabled):
+        return func()
+
+
+def _is_missing(children, pos):
+    if isinstance(children, LazyChildren):
+        return children.is_missing(pos)
+    return children[pos] is None
+
+
+def _pending(children, pos):
+    """
+    :return: Function returning the present child without computing it now
+    """
+    if isinstance(children, LazyChildren):
+        return lambda: children[pos]
+    child = children[pos]
+    return lambda: child
+
+
+def _lazy_map(children, func):
+    thunks = []
+    for pos in range(len(children)):
+        if _is_missing(children, pos):
+            thunks.append(None)
+        else:
+            thunks.append(_map_thunk(func, _pending(children, pos)))
+    return LazyChildren(thunks)
+
+
+def _map_thunk(func, child):
+    return lambda: func(child())
+
+
+def _constant_op_thunk(constant_op, child, tensor, column):
+    return lambda: constant_op(child(), tensor[:, column].view(tensor.size()[0], 1))
+
+
+def _pointwise_op_thunk(tensor_op, constant_op, self_child, other_child):
+    return lambda: self_child()._pointwise_op(tensor_op, constant_op, other_child())
+
+
+def _is_writable(tensor):
+    # Broadcast tensors have zero strides, writing to them changes many elements
+    return tensor.is_contiguous() and 0 not in tensor.stride()
+
+
+def _mm(tensor, matrix):
+    """
+    Multiplies tensor by a matrix. Matrix with 3 dimensions is a stack of matrices of members of an ensemble,
+    then rows of tensor are grouped by members: first rows belong to the first member, etc.
+    Matrices which aren't tensors, e.g. quantized ones, multiply tensors themselves.
+    Matrices of other types are converted to the type of the tensor, e.g. float32 master weights to bfloat16
+    """
+    if not isinstance(matrix, torch.Tensor):
+        return matrix.left_mm(tensor)
+    if matrix.dtype != tensor.dtype:
+        matrix = matrix.to(tensor.dtype)
+    if matrix.dim() == 2:
+        return tensor.mm(matrix)
+    members, from_size, to_size = matrix.size()
+    return tensor.reshape(members, -1, from_size).bmm(matrix).reshape(-1, to_size)
+
+
+def _matrix_element(matrix, i, j, rows):
+    """
+    Gets element of the matrix as a multiplier of rows of tree
+
+    :return: Tuple - multiplier and maximal absolute value of it
+    """
+    if not isinstance(matrix, torch.Tensor):
+        return matrix.element(i, j, rows)
+    if matrix.dim() == 2:
+        element = matrix[i, j]
+        return element, abs(element.item())
+    elements = matrix[:, i, j]
+    members = elements.size()[0]
+    multiplier = elements.view(members, 1, 1).expand(members, rows // members, 1).reshape(rows, 1)
+    return multiplier, elements.abs().max().item()
+
+
+_TREE_KINDS = {
+    'S': SumTree,
+    'P': ProdTree,
+}
+
+# Types of tensors which can be exposed to pickle as raw buffers
+_BUFFER_TYPES = {torch.float16, torch.float32, torch.float64, torch.int32, torch.int64, torch.uint8}
+
+
+def pack(tree):
+    """
+    Packs contents of all nodes of the tree into one contiguous tensor
+
+    :param tree: TensorTree
+    :return: Tuple - flat tensor and descriptor of the structure of the tree
+    """
+    tensors = []
+    descriptor = _describe(tree, tensors)
+    return _pack_tensors(tensors), descriptor
+
+
+def unpack(flat, descriptor):
+    """
+    Restores TensorTree from the result of `pack`. Tensors of the tree are views of the flat tensor
+
+    :param flat: Flat tensor
+    :param descriptor: Descriptor of the structure of the tree
+    :return: TensorTree
+    """
+    tree, _ = _rebuild(flat, descriptor, 0)
+    return tree
+
+
+def _describe(tree, tensors):
+    tensors.append(tree.tensor)
+    kind = 'S' if isinstance(tree, SumTree) else 'P'
+    children = tuple(None if child is None else _describe(child, tensors) for child in tree.children)
+    return kind, tuple(tree.tensor.size()), children
+
+
+def _is_packable(tensors):
+    first = tensors[0]
+    for tensor in tensors:
+        if tensor.requires_grad or tensor.dtype != first.dtype or tensor.device != first.device:
+            return False
+        if hasattr(tensor, 'children'):
+            # Weights of OperatorTrees store routing of children in tensors
+            return False
+    return True
+
+
+def _pack_tensors(tensors):
+    return torch.cat([tensor.detach().reshape(-1) for tensor in tensors])
+
+
+def _rebuild(flat, descriptor, offset):
+    kind, shape, children_descriptors = descriptor
+    size = reduce(mul, shape, 1)
+    tensor = flat.narrow(0, offset, size).view(shape)
+    offset += size
+    children = []
+    for child_descriptor in children_descriptors:
+        if child_descriptor is None:
+            children.append(None)
+            continue
+        child, offset = _rebuild(flat, child_descriptor, offset)
+        children.append(child)
+    return _TREE_KINDS[kind](tensor, children), offset
+
+
+def _unpack_buffer(buffer, dtype, descriptor):
+    if memoryview(buffer).readonly:
+        buffer = bytearray(buffer)
+    return unpack(torch.frombuffer(buffer, dtype=dtype), descriptor)
+
+
+def empty_tree(like=None):
+    """
+    :param like: Tensor, which type and device are used, e.g. tensor of data of the caller, so constants evaluated
+        on the empty tree follow it. By default - the default type of torch on CPU
+    :return: SumTree without values
+    """
+    return SumTree(torch.tensor([]) if like is None else like.new_empty(0), [])
 
 
 def stack(trees):
@@ -417,31 +768,32 @@ def stack(trees):
                     # Add fake tree with equal elements (to support loss function)
                     tree_size = trees[pos].tensor.size()[0]
                     if isinstance(not_none, SumTree):
-                        content = torch.ones(tree_size, child_size) * (1.0 / child_size)
+                        content = ones(tree_size, child_size, like=new_tensor, temporary=True) * (1.0 / child_size)
                     else:
-                        content = torch.ones(tree_size, child_size) * 0.5
-                    to_stack.append(not_none.__class__(
+                        content = ones(tree_size, child_size, like=new_tensor, temporary=True) * 0.5
+                    to_stack.append(not_none._layer(
                         content,
                         [None for _ in range(child_size)]
                     ))
             stacked = stack(to_stack)
             new_children.append(stacked)
 
-    return first.__class__(new_tensor, new_children)
+    return first._layer(new_tensor, new_children)
 
 
-def make_tuple(operands):
+def make_tuple(operands, like=None):
     """
     Creates tuple of operands
 
     :param operands: List of TensorTrees
+    :param like: Tensor, which type and device are used for the empty tuple, see `empty_tree`
     :return: TensorTree representing tuple
     """
     if len(operands) == 0:
-        return empty_tree()
+        return empty_tree(like)
     new_tensor = torch.stack([t.presence() for t in operands], dim=1)
     new_children = operands
     product = ProdTree(new_tensor, new_children)
     rows, _ = new_tensor.size()
-    sum_data = torch.ones(rows, 1)
+    sum_data = ones(rows, 1, like=new_tensor)
     return SumTree(sum_data, [product])
@@ -1,4 +1,20 @@
-from abc import abstractmethod
+# Canonical instances of specifications by their classes and contents
+_INTERNED = {}
+
+
+def _intern(cls, key, **attributes):
+    """
+    :return: The only instance of the class with specified contents
+    """
+    full_key = (cls, key)
+    spec = _INTERNED.get(full_key)
+    if spec is None:
+        spec = object.__new__(cls)
+        spec.__dict__.update(attributes)
+        spec._hash = hash(full_key)
+        # Concurrent constructors agree on the first stored instance
+        spec = _INTERNED.setdefault(full_key, spec)
+    return spec
 
 
 class BaseTypeSpec:
@@ -7,11 +23,16 @@ class BaseTypeSpec:
 
     Type has size, can be instantiated, supports iteration over values and
     can be transformed to a TensorTree that contains all values of type as rows.
+
+    Specifications are immutable and interned: equal specifications are the same object, so they are compared
+    by identity and hashed by a structural hash computed once. They can be used as keys of caches
     """
 
-    @abstractmethod
     def __eq__(self, o: object):
-        pass
+        return self is o
+
+    def __hash__(self):
+        return self._hash
 
 
 class TypeSpec(BaseTypeSpec):
@@ -19,14 +40,15 @@ class TypeSpec(BaseTypeSpec):
     Object representing sum of types
     """
 
-    def __init__(self, operands):
-        self.operands = operands
+    def __new__(cls, operands):
+        operands = tuple(operands)
+        return _intern(cls, operands, operands=operands)
 
-    def __eq__(self, o: object):
-        return isinstance(o, TypeSpec) and self.operands == o.operands
+    def __reduce__(self):
+        return TypeSpec, (self.operands,)
 
     def __repr__(self):
-        return 'TypeSpec(' + str(self.operands) + ')'
+        return 'TypeSpec(' + str(list(self.operands)) + ')'
 
 
 class LitSpec(BaseTypeSpec):
@@ -34,9 +56,12 @@ class LitSpec(BaseTypeSpec):
     Object representing type literal. It's size is 1 and literal doesn't depend on instantiation.
     """
 
-    def __eq__(self, o: object):
+    def __new__(cls):
         # All LitSpecs are equal
-        return isinstance(o, LitSpec)
+        return _intern(cls, ())
+
+    def __reduce__(self):
+        return LitSpec, ()
 
     def __repr__(self):
         return 'LitSpec()'
@@ -46,11 +71,11 @@ class VarSpec(BaseTypeSpec):
     """
     Object representing type variable. It has no size, cannot be iterated over, but can be instantiated
     """
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        return _intern(cls, name, name=name)
 
-    def __eq__(self, o: object):
-        return isinstance(o, VarSpec) and self.name == o.name
+    def __reduce__(self):
+        return VarSpec, (self.name,)
 
     def __repr__(self):
         return self.name
@@ -61,12 +86,11 @@ class ExtSpec(BaseTypeSpec):
     Object representing type that was defined earlier. Can have parameters
     """
 
-    def __init__(self, name, **kwargs):
-        self.name = name
-        self.args = kwargs
+    def __new__(cls, name, **kwargs):
+        return _intern(cls, (name, tuple(sorted(kwargs.items()))), name=name, args=kwargs)
 
-    def __eq__(self, o):
-        return isinstance(o, ExtSpec) and self.name == o.name and self.args == o.args
+    def __reduce__(self):
+        return _restore_ext_spec, (self.name, self.args)
 
     def __repr__(self):
         if len(self.args) == 0:
@@ -79,14 +103,43 @@ class ProdSpec(BaseTypeSpec):
     Object representing product of types
     """
 
-    def __init__(self, operands):
-        self.operands = operands
+    def __new__(cls, operands):
+        operands = tuple(operands)
+        return _intern(cls, operands, operands=operands)
 
-    def __eq__(self, o: object):
-        return isinstance(o, ProdSpec) and self.operands == o.operands
+    def __reduce__(self):
+        return ProdSpec, (self.operands,)
 
     def __repr__(self):
-        return 'ProdSpec(' + str(self.operands) + ')'
+        return 'ProdSpec(' + str(list(self.operands)) + ')'
+
+
+def _restore_ext_spec(name, args):
+    return ExtSpec(name, **args)
+
+
+def substitute(spec, type_params):
+    """
+    Replaces a type variable by it's value, while it's defined in parameters. Polymorphic instances bind
+    variables to themselves, e.g. `ExtSpec('List', a=VarSpec('a'))`, such variables stay unresolved
+
+    :param spec: Specification of type
+    :param type_params: Dict with values of type variables
+    :return: Specification of type
+    """
+    while isinstance(spec, VarSpec) and spec.name in type_params:
+        value = type_params[spec.name]
+        if value is spec:
+            break
+        spec = value
+    return spec
+
+
+def params_key(type_params):
+    """
+    :return: Hashable representation of values of type variables, which can key caches
+    """
+    return tuple(sorted(type_params.items()))
 
 
 def create_empty_type():
@@ -0,0 +1,31 @@
+"""
+Tests of the runtime. Run from src/main/python:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+# Runtime and benchmarks are imported as top-level packages, as in generated networks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime.modules import TrainableLayer  # noqa: E402
+
+
+@pytest.fixture
+def plus_net():
+    """
+    arithm.plus_net, which weights are restored after the test, e.g. after quantization or sparsification
+    """
+    from benchmarks.networks import arithm
+    net = arithm.plus_net
+    layers = [module for module in net.modules() if isinstance(module, TrainableLayer)]
+    saved = [(layer.weights, layer.bias, dict(layer._parameters)) for layer in layers]
+    yield net
+    for (layer, (weights, bias, parameters)) in zip(layers, saved):
+        layer.weights = weights
+        layer.bias = bias
+        layer._parameters.clear()
+        layer._parameters.update(parameters)
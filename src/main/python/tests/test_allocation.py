@@ -0,0 +1,47 @@
+import torch
+
+from benchmarks.common import random_nats
+from benchmarks.networks import arithm
+from runtime.allocation import accumulation_dtype, arena, clear_arena, ones, zeros
+
+
+def test_tensors_are_allocated_like_inputs():
+    like = torch.empty(0, dtype=torch.float64)
+    assert zeros(2, 3, like=like).dtype == torch.float64
+    assert torch.equal(ones((2, 3), like=like), torch.ones(2, 3, dtype=torch.float64))
+    assert accumulation_dtype(torch.bfloat16) == torch.float32
+    assert accumulation_dtype(torch.float64) == torch.float64
+
+
+def test_temporaries_are_reused_after_the_scope():
+    like = torch.empty(0)
+    clear_arena()
+    with torch.no_grad():
+        with arena():
+            first = zeros(3, 4, like=like, temporary=True)
+            # Buffers aren't reused inside the scope
+            second = zeros(3, 4, like=like, temporary=True)
+            assert first.data_ptr() != second.data_ptr()
+        with arena():
+            # 12 elements are taken from the bucket of 16
+            again = ones(2, 7, like=like, temporary=True)
+            assert again.data_ptr() in (first.data_ptr(), second.data_ptr())
+            assert torch.equal(again, torch.ones(2, 7))
+    # Tensors with gradients and outside of scopes aren't taken from the arena
+    with arena():
+        assert zeros(3, 4, like=like, temporary=True).data_ptr() not in (first.data_ptr(), second.data_ptr())
+    clear_arena()
+
+
+def test_results_in_arena_are_the_same():
+    x = random_nats(8, 3)
+    y = random_nats(8, 3)
+    with torch.no_grad():
+        expected = arithm.plus_net.call(x, y).strict()
+        with arena():
+            result = arithm.plus_net.call(x, y).strict()
+            assert torch.equal(result.tensor, expected.tensor)
+        converted = arithm.plus_net.call(x.type(torch.float64), y.type(torch.float64))
+    assert converted.tensor.dtype == torch.float64
+    assert torch.allclose(converted.tensor.float(), arithm.plus_net.call(x, y).tensor.detach())
+    clear_arena()
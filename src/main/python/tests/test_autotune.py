@@ -0,0 +1,44 @@
+import itertools
+import math
+
+import torch
+
+from benchmarks.common import nat, random_nats
+from benchmarks.networks import arithm, recursive
+from runtime.autotune import Autotuner, deviation
+from runtime.config import RuntimeConfig
+from runtime.discrete import DiscreteEngine, decode, encode
+from runtime.trees import stack
+
+
+def test_lists_of_arguments_are_tuned():
+    x = random_nats(8, 3)
+    tuner = Autotuner(repeats=1, candidates={'select_rows': [False, True]})
+    try:
+        result = tuner.tune(arithm.plusOne_net, [[x], [x.select_rows(slice(0, 4))]])
+        assert result.reference().rows == 12
+        assert len(result.trials) == 2
+        assert arithm.plusOne_net.runtime_config == result.config
+    finally:
+        arithm.plusOne_net.runtime_config = None
+
+
+def test_different_shapes_are_infinitely_different():
+    a = random_nats(2, 3)
+    assert deviation(a, a) == 0.0
+    assert math.isinf(deviation(a, random_nats(3, 3)))
+
+
+def test_discrete_engine_follows_configuration_of_the_network():
+    rows = list(itertools.product(range(4), range(2)))
+    trees = [stack([encode(nat(row[i])) for row in rows]) for i in range(2)]
+    net = recursive.plus_net
+    try:
+        # Recursion is cut, so results of deep arguments are zeros
+        net.runtime_config = RuntimeConfig(recursion_depth=2)
+        with torch.no_grad():
+            expected = decode(net.call(trees).strict())
+        assert expected != [nat(a + b) for (a, b) in rows]
+        assert DiscreteEngine(net).run(trees) == expected
+    finally:
+        net.runtime_config = None
@@ -0,0 +1,64 @@
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm
+from runtime.data import DataBag, DataPointer
+from runtime.discrete import decode, encode
+from runtime.folding import FoldedLayer, fold_constants
+from runtime.modules import ApplicationLayer, GuardedLayer, VariableLayer
+from runtime.patterns import ConstructorPattern, LitPattern, VarPattern
+from runtime.trees import stack
+
+
+def _call_zero(rows):
+    return arithm.Z_net.forward(DataBag(stack([encode(nat(0))] * rows), [], rows))
+
+
+def test_constants_are_broadcast_views():
+    tree = _call_zero(5)
+    assert tree.rows() == 5
+    assert tree.tensor.stride()[0] == 0
+    assert _call_zero(5) is tree
+    assert decode(tree.strict()) == [nat(0)] * 5
+
+
+def test_constants_built_in_inference_mode_support_autograd():
+    arithm.Z_net._cache.clear()
+    with torch.inference_mode():
+        _call_zero(3)
+    weight = torch.ones(1, requires_grad=True)
+    (_call_zero(3).tensor * weight).sum().backward()
+    assert weight.grad.item() == 3
+
+
+def test_applications_of_constants_are_folded():
+    def two():
+        # S (S Z)
+        return ApplicationLayer(
+            operands=[
+                VariableLayer.External(arithm.S_net),
+                ApplicationLayer(
+                    operands=[VariableLayer.External(arithm.S_net), VariableLayer.External(arithm.Z_net)],
+                    call=[0, 1], constants=[1], data=[1], nets=[0]
+                ),
+            ], call=[0, 1], data=[1], nets=[0]
+        )
+
+    # f Z = S (S Z); f (S x) = x
+    net = GuardedLayer(
+        cases=[
+            GuardedLayer.Case(ConstructorPattern(0, operands=[LitPattern(0)]), two()),
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[ConstructorPattern(1, operands=[VarPattern()])]),
+                VariableLayer.Data(0)
+            ),
+        ],
+        mismatch_handler=arithm.ZeroLayer(arithm.ExtSpec('N')),
+        pointer=DataPointer(0, 0)
+    )
+    x = stack([encode(nat(value)) for value in [0, 3, 0]])
+    with torch.no_grad():
+        expected = decode(net.call([x]).strict())
+        assert fold_constants(net) == 1
+        assert isinstance(net.cases[0].net, FoldedLayer)
+        assert decode(net.call([x]).strict()) == expected == [nat(2), nat(2), nat(2)]
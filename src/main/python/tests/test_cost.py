@@ -0,0 +1,55 @@
+import pytest
+import torch
+
+from benchmarks.common import DEFINED_TYPES
+from benchmarks.networks import arithm, index, tuples, turing
+from runtime.cost import estimate, pick_batch_size
+from runtime.modules import ApplicationLayer, TrainableLayer, VariableLayer
+from runtime.types import ExtSpec
+
+
+@pytest.mark.parametrize('net', [
+    arithm.plus_net, arithm.plusOne_net, index.concat_net, tuples.permute_net, turing.transitionSimple_net,
+    turing.transitionHard_net,
+])
+def test_parameters_are_counted(net):
+    # TrainableLayers are called directly and as operands of applications
+    assert estimate(net).parameters() == sum(parameter.numel() for parameter in net.parameters())
+
+
+def test_recursion_depth_multiplies_costs():
+    shallow = estimate(arithm.plus_net, recursion_depth=2)
+    deep = estimate(arithm.plus_net, recursion_depth=4)
+    assert deep.parameters() == shallow.parameters()
+    assert deep.flops_per_row() == 2 * shallow.flops_per_row()
+    budget = 2 ** 20
+    assert pick_batch_size(arithm.plus_net, budget, recursion_depth=4) <= \
+        pick_batch_size(arithm.plus_net, budget, recursion_depth=2)
+    assert pick_batch_size(arithm.plus_net, budget, max_batch_size=8) <= 8
+
+
+def _composition(first, second):
+    # second(first(x))
+    inner = ApplicationLayer(operands=[first, VariableLayer.Data(0)], call=[1], data=[1])
+    return ApplicationLayer(operands=[second, inner], call=[1], data=[1])
+
+
+def test_shared_parameters_are_counted_once():
+    torch.manual_seed(0)
+    layer = TrainableLayer(DEFINED_TYPES, [ExtSpec('N')], ExtSpec('N'), 2, 2)
+    reused = estimate(_composition(layer, layer))
+    single = estimate(layer)
+    assert reused.parameters() == single.parameters()
+    assert reused.masked_parameters() == single.masked_parameters()
+    assert reused.flops_per_row() == 2 * single.flops_per_row()
+
+    sharing = TrainableLayer.SHARING_PARAMETERS
+    TrainableLayer.clear_shared()
+    try:
+        first, second = [
+            TrainableLayer(DEFINED_TYPES, [ExtSpec('N')], ExtSpec('N'), 2, 2, sharing=sharing) for _ in range(2)
+        ]
+    finally:
+        TrainableLayer.clear_shared()
+    net = _composition(first, second)
+    assert estimate(net).parameters() == single.parameters() == sum(parameter.numel() for parameter in net.parameters())
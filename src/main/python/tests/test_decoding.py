@@ -0,0 +1,38 @@
+import math
+
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm
+from runtime.decoding import BeamDecoder
+from runtime.discrete import decode, encode
+from runtime.trees import SumTree, stack
+
+
+def test_strict_trees_are_decoded_to_their_values():
+    values = [nat(value) for value in range(4)]
+    best = BeamDecoder().top_k_values(stack([encode(value) for value in values]), 1)
+    assert [row[0][1] for row in best] == values
+    assert all(abs(row[0][0]) < 1e-6 for row in best)
+
+
+def test_values_are_ordered_by_scores():
+    tree = SumTree(torch.tensor([[0.7, 0.3], [0.1, 0.9]]), [None, None])
+    scores, trees = BeamDecoder().top_k(tree, 3)
+    # Bool has only two values
+    assert len(trees) == 2
+    assert torch.allclose(scores, torch.tensor([[0.7, 0.3], [0.9, 0.1]]).log())
+    assert decode(trees[0]) == [(0, 2, None), (1, 2, None)]
+    assert decode(trees[1]) == [(1, 2, None), (0, 2, None)]
+
+
+def test_results_of_networks():
+    torch.manual_seed(0)
+    x = stack([encode(nat(value)) for value in range(3)])
+    with torch.no_grad():
+        result = arithm.plusOne_net.call([x])
+    for row in BeamDecoder(beam=[4, 2]).top_k_values(result, 3):
+        scores = [score for (score, _) in row]
+        assert scores == sorted(scores, reverse=True)
+        assert len({str(value) for (_, value) in row}) == len(row)
+        assert all(score <= 0 or math.isclose(score, 0, abs_tol=1e-5) for score in scores)
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+import torch
+
+from benchmarks.common import random_nats
+from benchmarks.networks import arithm
+from runtime.diagnostics import SyncAuditor
+from runtime.errors import DiagnosticsBudgetExceeded
+
+
+def test_syncs_are_attributed_to_modules():
+    x = random_nats(4, 3)
+    with SyncAuditor(arithm.plusOne_net) as auditor:
+        arithm.plusOne_net.call([x])
+        # Syncs outside of modules are counted too
+        torch.ones(1).item()
+    assert auditor.total(SyncAuditor.SYNC) >= 1
+    assert auditor.total(SyncAuditor.SMALL_OP) > 0
+    report = auditor.report()
+    assert report.splitlines()[0] == SyncAuditor.SYNC + ': ' + str(auditor.total(SyncAuditor.SYNC))
+    assert 'item      <outside of runtime>' in report
+    assert '0.net.0 (TrainableLayer)' in {module for (_, _, module, _) in auditor.counts}
+
+
+def test_budgets():
+    with pytest.raises(DiagnosticsBudgetExceeded) as error:
+        with SyncAuditor(sync_budget=1):
+            torch.ones(1).item()
+            torch.ones(1).item()
+    assert (error.value.kind, error.value.count, error.value.budget) == (SyncAuditor.SYNC, 2, 1)
+
+    # Large operations aren't small, syncs of other threads aren't counted
+    with SyncAuditor(threshold=4, sync_budget=0, small_op_budget=0) as auditor:
+        torch.ones(8) + 1
+        thread = threading.Thread(target=lambda: torch.ones(1).item())
+        thread.start()
+        thread.join()
+    assert auditor.total(SyncAuditor.SMALL_OP) == 0
+
+
+def test_auditor_is_not_reentrant():
+    auditor = SyncAuditor()
+    with auditor:
+        with pytest.raises(RuntimeError):
+            auditor.__enter__()
+    # Instrumentation is removed after the context
+    with auditor:
+        pass
+    assert auditor.total(SyncAuditor.SYNC) == 0
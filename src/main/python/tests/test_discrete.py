@@ -0,0 +1,152 @@
+import itertools
+from contextlib import contextmanager
+
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm, example
+from runtime.data import DataPointer
+from runtime.discrete import DiscreteEngine, decode, encode
+from runtime.modules import ApplicationLayer, GuardedLayer, RecursiveLayer, VariableLayer
+from runtime.patterns import ConstructorPattern, LitPattern, VarPattern
+from runtime.trees import stack
+from runtime.types import ExtSpec
+
+NATS = [nat(value) for value in range(6)]
+
+
+@contextmanager
+def _saturated(net, seed, scale=30.0):
+    # Large weights make TrainableLayers almost strict, original weights are restored at the end
+    parameters = list(net.parameters())
+    saved = [parameter.detach().clone() for parameter in parameters]
+    torch.manual_seed(seed)
+    with torch.no_grad():
+        for parameter in parameters:
+            parameter.copy_(torch.randn_like(parameter) * scale * (parameter != 0))
+    try:
+        yield net
+    finally:
+        with torch.no_grad():
+            for (parameter, value) in zip(parameters, saved):
+                parameter.copy_(value)
+
+
+def _arguments(rows):
+    return [stack([encode(row[i]) for row in rows]) for i in range(len(rows[0]))]
+
+
+def _expected(net, trees):
+    with torch.no_grad():
+        return decode(net.call(trees).strict())
+
+
+def test_programs_without_trainable_layers_are_evaluated_exactly():
+    rows = list(itertools.product(NATS, NATS))
+    trees = _arguments(rows)
+    engine = DiscreteEngine(arithm.plusRequired_net)
+    assert engine.run(trees) == _expected(arithm.plusRequired_net, trees)
+    assert engine.fallbacks == 0
+    assert engine.run(trees)[rows.index((nat(2), nat(3)))] == nat(5)
+
+    bools = [(0, 2, None), (1, 2, None)]
+    rows = list(itertools.product(bools, bools, bools))
+    trees = _arguments(rows)
+    engine = DiscreteEngine(example.if_net)
+    assert engine.run(trees) == [b if a == bools[0] else c for (a, b, c) in rows]
+    assert engine.check(trees)
+
+
+def test_results_are_equal_to_the_network():
+    rows = list(itertools.product(NATS, NATS))
+    trees = _arguments(rows)
+    for seed in range(4):
+        with _saturated(arithm.plus_net, seed):
+            engine = DiscreteEngine(arithm.plus_net)
+            assert engine.run(trees) == _expected(arithm.plus_net, trees)
+            assert engine.evaluated + engine.fallbacks == len(rows)
+    with _saturated(arithm.plusOne_net, 0):
+        trees = _arguments([(value,) for value in NATS])
+        assert DiscreteEngine(arithm.plusOne_net).check(trees)
+
+
+def test_equal_rows_are_evaluated_once():
+    trainable = arithm.plusOne_net.cases[0].net.operands[0]
+    batches = []
+    forward = trainable.forward
+
+    def counting_forward(data_bag):
+        batches.append(data_bag.size)
+        return forward(data_bag)
+
+    rows = [(NATS[i % 3],) for i in range(30)]
+    with _saturated(arithm.plusOne_net, 0):
+        trainable.forward = counting_forward
+        try:
+            engine = DiscreteEngine(arithm.plusOne_net)
+            results = engine.run(_arguments(rows))
+        finally:
+            del trainable.forward
+        assert results == _expected(arithm.plusOne_net, _arguments(rows))
+    # Distinct arguments of all rows are evaluated in one batch
+    assert batches == [3]
+
+
+def test_truncated_results_fall_back():
+    rows = list(itertools.product(NATS[:3], NATS[:3]))
+    trees = _arguments(rows)
+    with _saturated(arithm.plus_net, 0):
+        with torch.no_grad():
+            # Every TrainableLayer returns S(S(...)) with operands truncated by it's depth
+            for (name, parameter) in arithm.plus_net.named_parameters():
+                if '_w' in name:
+                    parameter.zero_()
+                else:
+                    parameter.fill_(-30.0 if parameter.size()[-1] == 2 else 30.0)
+                    parameter[..., -1] = 30.0
+        engine = DiscreteEngine(arithm.plus_net)
+        # The network fills truncated operands by children of the case, which doesn't match
+        assert engine.run(trees) == _expected(arithm.plus_net, trees)
+        assert engine.fallbacks == len(rows)
+
+
+def test_tail_recursion_falls_back(monkeypatch):
+    # add (Z, b) = b; add (S a, b) = add (a, S b)
+    net = RecursiveLayer(
+        GuardedLayer(
+            cases=[
+                GuardedLayer.Case(
+                    ConstructorPattern(0, operands=[LitPattern(0), VarPattern()]),
+                    VariableLayer.Data(0)
+                ),
+                GuardedLayer.Case(
+                    ConstructorPattern(0, operands=[ConstructorPattern(1, operands=[VarPattern()]), VarPattern()]),
+                    ApplicationLayer(
+                        operands=[
+                            VariableLayer.Net(0),
+                            VariableLayer.Data(0),
+                            ApplicationLayer(
+                                operands=[VariableLayer.External(arithm.S_net), VariableLayer.Data(1)],
+                                call=[0, 1], data=[1], nets=[0]
+                            ),
+                        ], call=[0, 1, 2], data=[1, 2], nets=[0]
+                    )
+                ),
+            ],
+            mismatch_handler=arithm.ZeroLayer(ExtSpec('N')),
+            pointer=DataPointer(0, 1)
+        ), arithm.ZeroLayer(ExtSpec('N')), DataPointer(0, 0), is_tail_recursive=True
+    )
+    calls = []
+
+    def call(trees):
+        calls.append(trees[0].rows())
+        return stack([encode(nat(0))] * trees[0].rows())
+
+    monkeypatch.setattr(net, 'call', call)
+    rows = list(itertools.product(NATS[:3], NATS[:3])) * 2
+    engine = DiscreteEngine(net)
+    # Only distinct rows are evaluated by the network
+    assert engine.run(_arguments(rows)) == [nat(0)] * len(rows)
+    assert calls == [len(rows) // 2]
+    assert engine.fallbacks == len(rows)
@@ -0,0 +1,94 @@
+import socket
+
+import torch
+import torch.distributed as dist
+
+from benchmarks.common import DEFINED_TYPES, random_tree, random_tuple, trainable
+from runtime.distributed import DataParallelTrainer, init_process_group, launch
+from runtime.ensemble import select_members
+from runtime.loss import StructuredLoss
+from runtime.modules import TrainableLayer
+from runtime.types import ExtSpec
+
+ROWS = 8
+DEPTH = 2
+
+
+def _problem():
+    torch.manual_seed(0)
+    net = trainable(DEPTH)
+    inputs = random_tuple(ROWS, DEPTH)
+    expected = random_tree(ROWS, DEPTH)
+    return net, inputs, expected
+
+
+def _train_shard(rank, world_size, path):
+    net, inputs, expected = _problem()
+    # Small buckets, so gradients are reduced by several all-reduces
+    trainer = DataParallelTrainer(net, StructuredLoss(), torch.optim.SGD(net.parameters(), lr=0.0), bucket_size=16)
+    shard = torch.arange(rank, ROWS, world_size)
+    trainer.step([inputs.select_rows(shard)], expected.select_rows(shard))
+    assert len(trainer.buckets.buckets) > 1
+    if rank == 0:
+        torch.save({name: param.grad for (name, param) in net.named_parameters()}, path)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_bucketed_gradients_equal_single_process_gradients(tmp_path):
+    path = str(tmp_path / 'gradients.pt')
+    launch(_train_shard, 2, path, master_port=_free_port())
+    averaged = torch.load(path)
+
+    net, inputs, expected = _problem()
+    StructuredLoss()(net.call(inputs), expected).backward()
+    for (name, param) in net.named_parameters():
+        # Unused parameters get zero gradients from buckets
+        grad = torch.zeros_like(param) if param.grad is None else param.grad
+        # Gradients of shards are averaged, the loss of the whole batch is their sum
+        assert torch.allclose(averaged[name], grad / 2, atol=1e-6), name
+
+
+def _ensemble_problem():
+    torch.manual_seed(0)
+    net = TrainableLayer(DEFINED_TYPES, [ExtSpec('N')], ExtSpec('N'), DEPTH, DEPTH, ensemble=3)
+    inputs = random_tuple(ROWS, DEPTH)
+    expected = random_tree(ROWS, DEPTH)
+    return net, inputs, expected
+
+
+def _train_selected_members(rank, world_size, path):
+    net, inputs, expected = _ensemble_problem()
+    trainer = DataParallelTrainer(net, StructuredLoss(), torch.optim.SGD(net.parameters(), lr=0.0), bucket_size=16)
+    select_members(net, [1])
+    trainer.rebuild(torch.optim.SGD(net.parameters(), lr=0.0))
+    shard = torch.arange(rank, ROWS, world_size)
+    trainer.step([inputs.select_rows(shard)], expected.select_rows(shard))
+    if rank == 0:
+        torch.save({name: param.grad for (name, param) in net.named_parameters()}, path)
+
+
+def test_buckets_are_rebuilt_for_selected_members(tmp_path):
+    path = str(tmp_path / 'gradients.pt')
+    launch(_train_selected_members, 2, path, master_port=_free_port())
+    averaged = torch.load(path)
+
+    net, inputs, expected = _ensemble_problem()
+    select_members(net, [1])
+    StructuredLoss()(net.call(inputs), expected).backward()
+    for (name, param) in net.named_parameters():
+        grad = torch.zeros_like(param) if param.grad is None else param.grad
+        assert torch.allclose(averaged[name], grad / 2, atol=1e-6), name
+
+
+def test_address_of_arguments_is_used(monkeypatch):
+    calls = []
+    monkeypatch.setenv('MASTER_ADDR', '10.0.0.1')
+    monkeypatch.setenv('MASTER_PORT', '1')
+    monkeypatch.setattr(dist, 'init_process_group', lambda *args, **kwargs: calls.append(kwargs))
+    init_process_group(0, 1, master_port=12345)
+    assert calls[0]['init_method'] == 'tcp://127.0.0.1:12345'
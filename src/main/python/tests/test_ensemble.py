@@ -0,0 +1,81 @@
+import pytest
+import torch
+
+from benchmarks.common import DEFINED_TYPES, random_nats, random_tree, random_tuple
+from runtime.config import RuntimeConfig, using_config
+from runtime.data import DataPointer
+from runtime.ensemble import ensemble_input, member_losses, select_members
+from runtime.errors import EnsembleRowSelection, EnsembleRowsMismatch
+from runtime.loss import StructuredLoss
+from runtime.modules import ApplicationLayer, GuardedLayer, TrainableLayer, VariableLayer, ZeroLayer
+from runtime.patterns import ConstructorPattern, VarPattern
+from runtime.types import ExtSpec
+
+MEMBERS = 3
+
+
+def _ensemble():
+    torch.manual_seed(0)
+    return TrainableLayer(DEFINED_TYPES, [ExtSpec('N')], ExtSpec('N'), 2, 2, ensemble=MEMBERS)
+
+
+def test_members_evaluate_their_blocks_of_rows():
+    net = _ensemble()
+    x = random_tuple(4, 2)
+    result = net.call(ensemble_input(x, MEMBERS))
+    assert result.rows() == 4 * MEMBERS
+    for member in range(MEMBERS):
+        single = _ensemble()
+        select_members(single, [member])
+        expected = single.call(x)
+        assert torch.allclose(result.tensor[member * 4:(member + 1) * 4], expected.tensor)
+
+
+def test_member_losses_sum_to_loss():
+    net = _ensemble()
+    x = random_tuple(4, 2)
+    expected = random_tree(4, 2)
+    loss = StructuredLoss()
+    result = net.call(ensemble_input(x, MEMBERS))
+    losses = member_losses(loss, result, expected, MEMBERS)
+    assert losses.size() == (MEMBERS,)
+    assert torch.allclose(losses.sum(), loss(result, ensemble_input(expected, MEMBERS)))
+
+
+def test_rows_not_divisible_by_members():
+    with pytest.raises(EnsembleRowsMismatch):
+        _ensemble().call(random_tuple(4, 2))
+
+
+def test_cases_with_selected_rows_are_rejected():
+    net = GuardedLayer(
+        cases=[
+            GuardedLayer.Case(
+                ConstructorPattern(0, operands=[VarPattern()]),
+                ApplicationLayer(
+                    operands=[_ensemble(), VariableLayer.Data(0)], call=[1], data=[1], nets=[0]
+                )
+            ),
+        ],
+        mismatch_handler=ZeroLayer(DEFINED_TYPES, ExtSpec('N')),
+        pointer=DataPointer(0, 0)
+    )
+    x = ensemble_input(random_nats(2, 2), MEMBERS)
+    assert net.call([x]).rows() == 2 * MEMBERS
+    with using_config(RuntimeConfig(select_rows=True)), pytest.raises(EnsembleRowSelection):
+        net.call([x])
+
+
+def test_selected_members_are_returned_for_optimizers():
+    net = _ensemble()
+    old = list(net.parameters())
+    parameters = select_members(net, [0, 2])
+    assert [id(parameter) for parameter in parameters] == [id(parameter) for parameter in net.parameters()]
+    assert all(parameter is not replaced for parameter in parameters for replaced in old)
+    optimizer = torch.optim.SGD(parameters, lr=1.0)
+    x = ensemble_input(random_tuple(4, 2), 2)
+    StructuredLoss()(net.call(x), ensemble_input(random_tree(4, 2), 2)).backward()
+    before = [parameter.detach().clone() for parameter in net.parameters()]
+    optimizer.step()
+    # The optimizer updates parameters used by the layer
+    assert any(not torch.equal(a, b) for (a, b) in zip(before, net.parameters()))
@@ -0,0 +1,59 @@
+import pytest
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm
+from runtime.config import RuntimeConfig, using_config
+from runtime.discrete import encode
+from runtime.export import ExportedNetwork, check_export, export
+from runtime.trees import stack
+
+
+def _nats(values):
+    return stack([encode(nat(value)) for value in values])
+
+
+def test_exported_network_is_equal_to_the_runtime(tmp_path):
+    x = _nats([0, 1, 2, 1])
+    y = _nats([2, 0, 1, 1])
+    path = str(tmp_path / 'plus.pt')
+    exported = export(arithm.plus_net, x, y, path=path)
+    assert check_export(exported, arithm.plus_net, x, y).ok()
+
+    loaded = ExportedNetwork.load(path)
+    with torch.no_grad():
+        expected = arithm.plus_net.call(x, y)
+    assert torch.allclose(loaded(x, y).tensor, expected.tensor, atol=1e-5)
+
+
+def test_lists_of_arguments():
+    x = _nats([0, 1])
+    exported = export(arithm.plusOne_net, [x])
+    with torch.no_grad():
+        expected = arithm.plusOne_net.call([x])
+    assert torch.allclose(exported([x]).tensor, expected.tensor, atol=1e-5)
+    with pytest.raises(ValueError):
+        # Deeper values have another structure
+        exported([_nats([0, 3])])
+
+
+def test_other_numbers_of_rows_and_presence():
+    # The example has the structure of naturals up to 3, all rows of it are equal
+    exported = export(arithm.plus_net, _nats([3, 3]), _nats([3, 3]))
+    x = _nats([0, 3, 1, 2, 0])
+    y = _nats([2, 0, 3, 1, 1])
+    with torch.no_grad(), using_config(RuntimeConfig(operator_eps=0.0)):
+        expected = arithm.plus_net.call(x, y)
+    assert torch.allclose(exported(x, y).tensor, expected.tensor, atol=1e-5)
+    assert check_export(exported, arithm.plus_net, x, y).ok()
+    # Rows with other presence of children, the same number of rows as the example
+    assert check_export(exported, arithm.plus_net, _nats([0, 3]), _nats([3, 0])).ok()
+
+
+def test_loaded_networks_accept_only_rows_of_the_example(tmp_path):
+    path = str(tmp_path / 'plus.pt')
+    export(arithm.plus_net, _nats([0, 1]), _nats([1, 0]), path=path)
+    loaded = ExportedNetwork.load(path)
+    assert loaded(_nats([1, 1]), _nats([0, 1])).rows() == 2
+    with pytest.raises(ValueError):
+        loaded(_nats([1, 1, 0]), _nats([0, 1, 1]))
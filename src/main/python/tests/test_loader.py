@@ -0,0 +1,65 @@
+import pickle
+from multiprocessing.reduction import ForkingPickler
+
+import torch
+import torch.multiprocessing  # noqa: F401 - registers reductions of tensors to shared memory
+
+from runtime.loader import TreeDataset, collate_trees, tree_loader
+from runtime.trees import SumTree, ProdTree, stack
+
+
+def _tree(rows=3):
+    leaf = SumTree(torch.rand(rows, 2), [None, None])
+    return SumTree(torch.rand(rows, 2), [None, ProdTree(torch.rand(rows, 1), [leaf])])
+
+
+def _assert_equal(a, b):
+    assert type(a) == type(b)
+    assert torch.equal(a.tensor, b.tensor)
+    assert len(a.children) == len(b.children)
+    for (a_child, b_child) in zip(a.children, b.children):
+        assert (a_child is None) == (b_child is None)
+        if a_child is not None:
+            _assert_equal(a_child, b_child)
+
+
+def test_pickle_round_trip_default_protocol():
+    tree = _tree()
+    _assert_equal(pickle.loads(pickle.dumps(tree)), tree)
+
+
+def test_pickle_round_trip_out_of_band_read_only_buffers():
+    tree = _tree()
+    buffers = []
+    data = pickle.dumps(tree, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1
+    # Buffers received from another process are usually immutable bytes
+    restored = pickle.loads(data, buffers=[bytes(buffer.raw()) for buffer in buffers])
+    _assert_equal(restored, tree)
+    # The restored tree owns writable memory
+    restored.tensor.add_(1)
+
+
+def test_forking_pickler_moves_tree_to_shared_memory():
+    tree = _tree()
+    restored = ForkingPickler.loads(ForkingPickler.dumps(tree))
+    _assert_equal(restored, tree)
+    assert restored.tensor.is_shared()
+
+
+def test_dataset_and_collate():
+    x, y = _tree(5), _tree(5)
+    dataset = TreeDataset(x, y)
+    assert len(dataset) == 5
+    batch_x, batch_y = dataset[[1, 3]]
+    assert torch.equal(batch_x.tensor, x.tensor[[1, 3]])
+    collated = collate_trees([dataset[1], dataset[3]])
+    _assert_equal(collated[0], batch_x)
+    _assert_equal(collated[1], batch_y)
+
+
+def test_loader_keeps_rows_in_order():
+    x = _tree(10)
+    batches = list(tree_loader(TreeDataset(x), batch_size=4))
+    assert [batch[0].rows() for batch in batches] == [4, 4, 2]
+    _assert_equal(stack([batch[0] for batch in batches]), x)
@@ -0,0 +1,137 @@
+import pytest
+import torch
+
+from benchmarks.common import random_nats
+from benchmarks.networks import arithm
+from runtime.loss import StructuredLoss
+from runtime.microbatch import MicroBatcher, _AllocationCounter, _is_out_of_memory
+
+NET = arithm.plusOne_net
+
+
+def _gradients(x, expected, batcher=None):
+    NET.zero_grad(set_to_none=True)
+    if batcher is None:
+        loss = StructuredLoss()(NET.call([x]), expected)
+        loss.backward()
+        value = loss.item()
+    else:
+        value = batcher.backward([x], expected, StructuredLoss())
+    return value, [parameter.grad for parameter in NET.parameters()]
+
+
+def _equal(grads, other):
+    return all(
+        (a is None and b is None) or (a is not None and b is not None and torch.allclose(a, b, atol=1e-5))
+        for (a, b) in zip(grads, other)
+    )
+
+
+def _batch():
+    torch.manual_seed(0)
+    x = random_nats(20, 3)
+    with torch.no_grad():
+        expected = arithm.S_net.call([x])
+    return x, expected
+
+
+def test_slices_are_equal_to_the_whole_batch():
+    x, expected = _batch()
+    batcher = MicroBatcher(NET, memory_budget=2 ** 30, max_batch_size=8)
+    with torch.no_grad():
+        assert torch.allclose(batcher.call([x]).tensor, NET.call([x]).tensor, atol=1e-6)
+    loss, grads = _gradients(x, expected)
+    sliced_loss, sliced_grads = _gradients(x, expected, batcher)
+    assert sliced_loss == pytest.approx(loss, rel=1e-5)
+    assert _equal(grads, sliced_grads)
+
+
+def _accumulation_order(x, expected):
+    order = []
+    handles = [
+        parameter.register_post_accumulate_grad_hook(lambda tensor: order.append(tensor))
+        for parameter in NET.parameters()
+    ]
+    try:
+        _gradients(x, expected)
+    finally:
+        for handle in handles:
+            handle.remove()
+    return order
+
+
+def test_slices_out_of_memory_in_backward_are_repeated():
+    x, expected = _batch()
+    _, grads = _gradients(x, expected)
+    order = _accumulation_order(x, expected)
+    assert len(order) > 1
+    batcher = MicroBatcher(NET, memory_budget=2 ** 30, max_batch_size=8)
+    calls = []
+
+    def hook(grad):
+        # The second slice fails before the last gradient is accumulated, all others are already accumulated
+        calls.append(batcher.batch_size())
+        if len(calls) == 2:
+            raise RuntimeError("DefaultCPUAllocator: can't allocate memory: you tried to allocate 1 bytes")
+        return grad
+
+    handle = order[-1].register_hook(hook)
+    try:
+        _, sliced_grads = _gradients(x, expected, batcher)
+    finally:
+        handle.remove()
+    # The failed slice is repeated with a half of rows
+    assert calls[:3] == [8, 8, 4]
+    assert _equal(grads, sliced_grads)
+
+
+def test_repeated_rows_are_not_merged_with_next_ones():
+    x, expected = _batch()
+    _, grads = _gradients(x, expected)
+    order = _accumulation_order(x, expected)
+    batcher = MicroBatcher(NET, memory_budget=2 ** 30, max_batch_size=8)
+    calls = []
+    adapt = batcher._adapt
+
+    def grow(rows, peak, training, device):
+        # The size grows back after every slice, so a slice after a repeated one could cross its end
+        adapt(rows, peak, training, device)
+        batcher.batch_sizes[training] = 8
+
+    def hook(grad):
+        calls.append(grad.size())
+        if len(calls) == 1:
+            raise RuntimeError('DefaultCPUAllocator: not enough memory: you tried to allocate 1 bytes')
+        return grad
+
+    batcher._adapt = grow
+    handle = order[-1].register_hook(hook)
+    try:
+        _, sliced_grads = _gradients(x, expected, batcher)
+    finally:
+        handle.remove()
+    assert _equal(grads, sliced_grads)
+
+
+def test_out_of_memory_errors():
+    assert _is_out_of_memory(RuntimeError('DefaultCPUAllocator: not enough memory: you tried to allocate 8 bytes'))
+    assert _is_out_of_memory(RuntimeError("DefaultCPUAllocator: can't allocate memory: you tried to allocate 8"))
+    assert _is_out_of_memory(RuntimeError('CUDA out of memory. Tried to allocate 2.00 MiB'))
+    assert _is_out_of_memory(torch.cuda.OutOfMemoryError('Tried to allocate 2.00 MiB'))
+    assert not _is_out_of_memory(RuntimeError('size mismatch'))
+    # Only failures of allocators are repeated
+    assert not _is_out_of_memory(RuntimeError('index is out of memory range'))
+    assert not _is_out_of_memory(NotImplementedError('CUDA out of memory'))
+
+
+def test_allocations_are_counted_once():
+    weight = torch.ones(8, requires_grad=True)
+    with _AllocationCounter() as counter:
+        row = torch.ones(1, 8)
+        # Broadcast views and in-place results don't allocate memory
+        broadcast = row.expand(100, 8)
+        row.mul_(2)
+        assert counter.bytes == 32
+        (broadcast * weight).sum().backward()
+    # The product, the loss and gradients of backward propagation are counted too
+    assert counter.bytes >= 32 + 100 * 8 * 4 + 8 * 4
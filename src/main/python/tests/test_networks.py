@@ -0,0 +1,91 @@
+import itertools
+
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import index, recursive, tuples, turing
+from runtime.discrete import DiscreteEngine, decode, encode
+from runtime.trees import stack
+
+BOOLS = [(0, 2, None), (1, 2, None)]
+BLANK, ZERO, ONE = [(symbol, 3, None) for symbol in range(3)]
+
+
+def _call(net, *rows):
+    trees = [stack([encode(row[i]) for row in rows]) for i in range(len(rows[0]))]
+    with torch.no_grad():
+        results = decode(net.call(trees).strict())
+    assert DiscreteEngine(net).check(trees)
+    return results
+
+
+def _list(values, size=2, empty=0, cons=1):
+    value = (empty, size, None)
+    for head in reversed(values):
+        value = (cons, size, (head, value))
+    return value
+
+
+def _left(values):
+    # LList is built from the end: LCons (LCons LEmpty a) b
+    value = (0, 2, None)
+    for last in values:
+        value = (1, 2, (value, last))
+    return value
+
+
+def _tape(left, head, right):
+    return 0, 1, (_left(left), head, _list(right, empty=1, cons=0))
+
+
+def test_arithmetic():
+    rows = list(itertools.product(range(4), range(4)))
+    arguments = [(nat(a), nat(b)) for (a, b) in rows]
+    assert _call(recursive.plus_net, *arguments) == [nat(a + b) for (a, b) in rows]
+    assert _call(recursive.mul_net, *arguments) == [nat(a * b) for (a, b) in rows]
+    assert _call(recursive.max_net, *arguments) == [nat(max(a, b)) for (a, b) in rows]
+    rows = list(itertools.product(range(3), range(3)))
+    assert _call(recursive.pow_net, *[(nat(a), nat(b)) for (a, b) in rows]) == [nat(a ** b) for (a, b) in rows]
+
+
+def test_lists_and_trees():
+    lists = [[], [nat(2)], [nat(1), nat(3), nat(0)]]
+    arguments = [(_list(values),) for values in lists]
+    assert _call(recursive.prod_net, *arguments) == [nat(1), nat(2), nat(0)]
+    leaf = (0, 2, (nat(1),))
+    tree = (1, 2, (leaf, (1, 2, (leaf, leaf))))
+    assert _call(recursive.size_net, (leaf,), (tree,)) == [nat(1), nat(3)]
+    assert _call(recursive.height_net, (leaf,), (tree,)) == [nat(0), nat(2)]
+
+
+def test_index():
+    assert _call(index.concatRequired_net, (_list([nat(1)]), _list([nat(2), nat(0)]))) == \
+        [_list([nat(1), nat(2), nat(0)])]
+    assert _call(index.singletonRequired_net, (nat(2),)) == [_list([nat(2)])]
+
+
+def test_tuples():
+    torch.manual_seed(0)
+    rows = [tuple(BOOLS[b] for b in torch.randint(0, 2, (10,)).tolist()) for _ in range(5)]
+    results = _call(tuples.required_net, *[((0, 1, row),) for row in rows])
+    assert results == [(0, 1, tuple(row[i] for i in [8, 9, 5, 6, 2, 3, 1, 5, 0, 4])) for row in rows]
+
+
+def test_turing():
+    assert _call(turing.moveLeft_net, (_tape([], ONE, [ZERO]),), (_tape([ZERO, ONE], BLANK, []),)) == [
+        _tape([], BLANK, [ONE, ZERO]), _tape([ZERO], ONE, [BLANK])
+    ]
+    assert _call(turing.moveRight_net, (_tape([ZERO], ONE, []),), (_tape([], ONE, [ZERO, BLANK]),)) == [
+        _tape([ZERO, ONE], BLANK, []), _tape([ONE], ZERO, [BLANK])
+    ]
+    tape = _tape([], ONE, [ZERO])
+    moves = [(tape, (move, 3, None)) for move in range(3)]
+    assert _call(turing.makeMove_net, *moves) == [_tape([], BLANK, [ONE, ZERO]), tape, _tape([ONE], ZERO, [])]
+    start = (0, 1, None)
+    stay = (1, 3, None)
+    results = _call(turing.transitionRequired_net, *[(start, symbol) for symbol in (BLANK, ZERO, ONE)])
+    assert results == [
+        (0, 1, ((0, 2, None), BLANK, stay)),
+        (0, 1, ((1, 2, (start,)), ONE, stay)),
+        (0, 1, ((1, 2, (start,)), ZERO, stay)),
+    ]
@@ -0,0 +1,46 @@
+import pickle
+
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm
+from runtime.discrete import decode, encode
+from runtime.trees import stack
+from runtime.trees.packed_tree import PackedTree, pack_recursive
+
+VALUES = [3, 0, 2, 1]
+
+
+def _packed():
+    # S is the second constructor of N, it's only operand is recursive
+    return pack_recursive(stack([encode(nat(value)) for value in VALUES]), 1, 0)
+
+
+def test_packed_tree_behaves_as_nested_tree():
+    packed = _packed()
+    assert packed.depth() == max(VALUES) + 1
+    assert packed.lengths().tolist() == [value + 1 for value in VALUES]
+    assert decode(packed) == [nat(value) for value in VALUES]
+    tail = packed.children[1].children[0]
+    assert isinstance(tail, PackedTree) and tail.level == 1
+    assert decode(pickle.loads(pickle.dumps(packed))) == [nat(value) for value in VALUES]
+
+
+def test_networks_accept_packed_trees():
+    x = stack([encode(nat(value)) for value in VALUES])
+    with torch.no_grad():
+        expected = arithm.plusRequired_net.call(x, x)
+        actual = arithm.plusRequired_net.call(_packed(), _packed())
+    assert decode(actual.strict()) == decode(expected.strict()) == [nat(2 * value) for value in VALUES]
+
+
+def test_rows_store_only_their_levels():
+    # One long row and many short ones: a nested tree stores the deepest level for every row
+    values = [20] + [0] * 63
+    nested = stack([encode(nat(value)) for value in values])
+    packed = pack_recursive(nested, 1, 0)
+    assert packed.packed.batch_sizes == [64] + [1] * 20
+    assert len(pickle.dumps(packed)) * 2 < len(pickle.dumps(nested))
+    # Reached levels are expanded to all rows
+    assert packed.children[1].children[0].tensor.size()[0] == len(values)
+    assert decode(pickle.loads(pickle.dumps(packed))) == [nat(value) for value in values]
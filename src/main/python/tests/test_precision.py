@@ -0,0 +1,39 @@
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm, turing
+from runtime.discrete import decode, encode
+from runtime.precision import PrecisionPolicy, drift_report
+from runtime.trees import stack
+
+
+def _dtypes(tree, result=None):
+    result = set() if result is None else result
+    result.add(tree.tensor.dtype)
+    for child in tree.children:
+        if child is not None:
+            _dtypes(child, result)
+    return result
+
+
+def test_constants_follow_the_policy():
+    policy = PrecisionPolicy()
+    state = stack([encode((0, 1, None))] * 3)
+    symbols = stack([encode((symbol, 3, None)) for symbol in range(3)])
+    with torch.no_grad():
+        # Cases match only literals, so their bodies get no data
+        result = policy.call(turing.transitionRequired_net, state, symbols)
+        assert _dtypes(result) == {torch.bfloat16}
+        assert decode(result.strict()) == decode(turing.transitionRequired_net.call(state, symbols).strict())
+        assert _dtypes(policy.call(arithm.Z_net)) == {torch.bfloat16}
+
+
+def test_lists_of_arguments():
+    policy = PrecisionPolicy()
+    x = stack([encode(nat(value)) for value in range(2)])
+    with torch.no_grad():
+        assert _dtypes(policy.call(arithm.plusOne_net, [x])) == {torch.bfloat16}
+    report = drift_report(arithm.plusOne_net, [x], policy=policy)
+    assert report.rows == 2
+    assert report.accuracy() == 1.0
+    assert report.max_difference < 0.05
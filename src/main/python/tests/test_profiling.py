@@ -0,0 +1,47 @@
+import json
+
+from benchmarks.common import random_nats
+from benchmarks.networks import arithm
+from runtime.profiling import Profiler
+from runtime.trees.tensor_tree import TensorTree
+
+
+def test_invocations_are_recorded(tmp_path):
+    x = random_nats(4, 3)
+    y = random_nats(4, 3)
+    init = TensorTree.__init__
+    with Profiler(arithm.plusRequired_net) as profiler:
+        arithm.plusRequired_net.call(x, y)
+    # Nothing is patched after profiling
+    assert TensorTree.__init__ is init
+    rows = {row['name']: row for row in profiler.aggregate()}
+    assert max(row['max_recursion'] for row in rows.values()) > 1
+    roots = [event for event in profiler.events if event.parent is None]
+    assert len(roots) > 0
+    # Nodes of nested invocations are counted by parents
+    for event in profiler.events:
+        if event.parent is not None:
+            assert event.parent.nodes >= event.nodes
+            assert event.parent.children_duration >= event.duration
+    assert sum(event.nodes for event in roots) > 0
+    assert profiler.table(limit=2).count('\n') == 3
+
+    path = str(tmp_path / 'trace.json')
+    profiler.save_chrome_trace(path)
+    with open(path) as trace:
+        events = json.load(trace)['traceEvents']
+    assert len(events) == len(profiler.events)
+    assert {event['name'] for event in events} == set(rows)
+
+
+def test_lazy_children_are_charged_to_their_modules():
+    x = random_nats(4, 3)
+    y = random_nats(4, 3)
+    nodes = {}
+    for force in [False, True]:
+        with Profiler(arithm.plus_net, force=force) as profiler:
+            result = arithm.plus_net.call(x, y)
+        nodes[force] = sum(event.nodes for event in profiler.events if event.parent is None)
+        result.force()
+    # Without forcing children computed after the call aren't recorded at all
+    assert nodes[True] > nodes[False]
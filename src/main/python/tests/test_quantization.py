@@ -0,0 +1,21 @@
+import torch
+
+from benchmarks.common import random_nats
+from runtime.quantization import QuantizedMatrix, quantize_with_report
+from runtime.sparsify import Sparsifier
+
+
+def test_quantized_network_is_close_to_the_original(plus_net):
+    torch.manual_seed(0)
+    net = plus_net
+    x = random_nats(16, 3)
+    y = random_nats(16, 3)
+    report = quantize_with_report(net, x, y)
+    assert report.rows == 16
+    assert report.quantized_bytes * 4 == report.float_bytes
+    assert report.max_difference < 0.1
+    # Only biases stay parameters
+    assert all('_w' not in name for (name, _) in net.named_parameters())
+    # Quantized matrices aren't registered as parameters again
+    Sparsifier(eps=0.0).sparsify(net)
+    assert not any(isinstance(parameter, QuantizedMatrix) for parameter in net.parameters())
@@ -0,0 +1,43 @@
+import torch
+
+from benchmarks.common import nat
+from benchmarks.networks import arithm
+from runtime.data import DataBag
+from runtime.discrete import decode, encode
+from runtime.modules import ApplicationLayer, VariableLayer
+from runtime.patterns import ConstructorPattern, LitPattern, VarPattern
+from runtime.trees import make_tuple, stack
+
+
+def _nats(values):
+    return stack([encode(nat(value)) for value in values])
+
+
+def test_application_routes_operands_by_static_indices():
+    # plus (y, x): arguments are swapped
+    net = ApplicationLayer(
+        operands=[VariableLayer.External(arithm.plusRequired_net), VariableLayer.Data(1), VariableLayer.Data(0)],
+        call=[0, 1, 2], data=[2, 1]
+    )
+    assert net._called == (True, True, True)
+    # Data is passed in the order of operands, not in the order of the list
+    assert net._data_indices == (1, 2) and net._net_indices == () and net._constant_indices == ()
+    x = _nats([0, 1, 2])
+    y = _nats([2, 0, 1])
+    with torch.no_grad():
+        result = net.forward(DataBag(make_tuple([x, y])))
+        expected = arithm.plusRequired_net.call(y, x)
+    assert torch.equal(result.tensor, expected.tensor)
+    assert decode(result.strict()) == [nat(2), nat(1), nat(3)]
+
+
+def test_constructor_pattern_resolves_literals_once():
+    # S(Z) and S(x)
+    literal = ConstructorPattern(1, operands=[LitPattern(0)])
+    variable = ConstructorPattern(1, operands=[VarPattern()])
+    assert literal._literals == [True] and variable._literals == [False]
+    tree = _nats([0, 1, 2])
+    presence, trees = literal.get_trees(tree)
+    assert presence.tolist() == [0.0, 1.0, 0.0] and trees == []
+    presence, trees = variable.get_trees(tree)
+    assert presence.tolist() == [0.0, 1.0, 1.0] and len(trees) == 1
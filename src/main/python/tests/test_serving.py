@@ -0,0 +1,44 @@
+import torch
+
+from benchmarks.common import random_nats
+from benchmarks.networks import arithm
+from runtime.serving import BatchingEngine
+from runtime.trees import make_tuple
+
+
+def test_requests_are_merged_and_split_back():
+    xs = [random_nats(rows, 3) for rows in [1, 2, 3]]
+    with BatchingEngine(arithm.plusOne_net, max_batch_size=64, max_latency=0.2) as engine:
+        futures = [engine.submit([x]) for x in xs]
+        results = [future.result() for future in futures]
+    for (x, result) in zip(xs, results):
+        expected = arithm.plusOne_net.call([x])
+        assert result.rows() == x.rows()
+        assert torch.allclose(result.tensor, expected.tensor)
+    assert engine.metrics.batches == 1
+
+
+def test_requests_with_different_calling_conventions():
+    x = random_nats(2, 3)
+    with BatchingEngine(arithm.plusOne_net, max_batch_size=64, max_latency=0.2) as engine:
+        # A list of arguments and a tuple tree are different calling conventions of the same network
+        wrapped = engine.submit([x])
+        packed = engine.submit(make_tuple([x]))
+        expected = arithm.plusOne_net.call([x])
+        assert torch.allclose(wrapped.result().tensor, expected.tensor)
+        assert torch.allclose(packed.result().tensor, expected.tensor)
+    assert engine.metrics.batches == 2
+
+
+def test_requests_behind_other_conventions_are_merged():
+    xs = [random_nats(rows, 3) for rows in [2, 4, 3]]
+    with BatchingEngine(arithm.plusOne_net, max_batch_size=5, max_latency=0.2) as engine:
+        # The queue is filled at once, so the first batch sees all requests
+        with engine._condition:
+            first = engine.submit([xs[0]])
+            packed = engine.submit(make_tuple([xs[1]]))
+            last = engine.submit([xs[2]])
+        for (future, x) in [(first, xs[0]), (packed, xs[1]), (last, xs[2])]:
+            assert torch.allclose(future.result().tensor, arithm.plusOne_net.call([x]).tensor)
+    # The packed request would exceed the limit, but it doesn't stop merging of the last request into the first
+    assert engine.metrics.batches == 2
@@ -0,0 +1,76 @@
+import torch
+
+from benchmarks.common import random_nats
+from benchmarks.networks.arithm import DEFINED_TYPES
+from runtime.modules import TrainableLayer
+from runtime.modules.trainable import _sharing_key
+from runtime.types import ExtSpec, LitSpec, ProdSpec, TypeSpec
+
+
+def _layer(sharing=None):
+    return TrainableLayer(DEFINED_TYPES, [ExtSpec('N')], ExtSpec('N'), 2, 2, sharing=sharing)
+
+
+def _tensors(layer):
+    return [parameter for (_, parameter) in sorted(layer.named_parameters())]
+
+
+def test_skeletons_give_the_same_weights():
+    TrainableLayer.clear_shared()
+    try:
+        torch.manual_seed(0)
+        plain = _layer()
+        torch.manual_seed(0)
+        first = _layer(TrainableLayer.SHARING_SKELETON)
+        torch.manual_seed(0)
+        second = _layer(TrainableLayer.SHARING_SKELETON)
+        for (a, b, c) in zip(_tensors(plain), _tensors(first), _tensors(second)):
+            assert torch.equal(a, b) and torch.equal(a, c)
+            # Weights themselves are not shared
+            assert b is not c
+        x = random_nats(4, 2)
+        assert torch.allclose(plain.call([x]).tensor, second.call([x]).tensor)
+    finally:
+        TrainableLayer.clear_shared()
+
+
+def test_parameters_are_shared():
+    TrainableLayer.clear_shared()
+    try:
+        first = _layer(TrainableLayer.SHARING_PARAMETERS)
+        second = _layer(TrainableLayer.SHARING_PARAMETERS)
+        assert all(a is b for (a, b) in zip(_tensors(first), _tensors(second)))
+        # Gradients of both layers are accumulated in the same parameters
+        x = random_nats(4, 2)
+        first.call([x]).tensor.sum().backward()
+        single = [None if parameter.grad is None else parameter.grad.clone() for parameter in _tensors(first)]
+        first.zero_grad(set_to_none=True)
+        (first.call([x]).tensor.sum() + second.call([x]).tensor.sum()).backward()
+        assert any(grad is not None for grad in single)
+        for (parameter, grad) in zip(_tensors(second), single):
+            assert grad is None or torch.allclose(parameter.grad, 2 * grad)
+        TrainableLayer.clear_shared()
+        third = _layer(TrainableLayer.SHARING_PARAMETERS)
+        assert not any(a is b for (a, b) in zip(_tensors(first), _tensors(third)))
+    finally:
+        TrainableLayer.clear_shared()
+
+
+def test_sharing_keys_depend_on_definitions():
+    # Lists of naturals and a type with the same name but another definition
+    types = dict(DEFINED_TYPES)
+    types['L'] = TypeSpec(operands=[LitSpec(), ProdSpec(operands=[ExtSpec('N'), ExtSpec('L')])])
+    other = {'N': DEFINED_TYPES['N'], 'L': TypeSpec(operands=[LitSpec(), LitSpec()])}
+    key = _sharing_key(types, [ExtSpec('L')], ExtSpec('N'), 4, 4)
+    assert key == _sharing_key(dict(types), [ExtSpec('L')], ExtSpec('N'), 4, 4)
+    assert key != _sharing_key(other, [ExtSpec('L')], ExtSpec('N'), 4, 4)
+    assert dict(key[0]) == {'L': types['L'], 'N': types['N']}
+
+    TrainableLayer.clear_shared()
+    try:
+        first = TrainableLayer(types, [ExtSpec('L')], ExtSpec('N'), 2, 2, sharing=TrainableLayer.SHARING_PARAMETERS)
+        # Dicts of types are created and freed by generated modules, their ids may be reused
+        second = TrainableLayer(other, [ExtSpec('L')], ExtSpec('N'), 2, 2, sharing=TrainableLayer.SHARING_PARAMETERS)
+        assert not any(a is b for (a, b) in zip(_tensors(first), _tensors(second)))
+    finally:
+        TrainableLayer.clear_shared()
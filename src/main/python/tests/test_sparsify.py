@@ -0,0 +1,40 @@
+import torch
+
+from benchmarks.common import random_nats
+from runtime.modules import TrainableLayer
+from runtime.quantization import quantize
+from runtime.sparsify import PrunedMatrix, Sparsifier, sparsify_with_report
+from runtime.trees import OperatorTree, SumTree
+
+
+def test_small_weights_are_removed(plus_net):
+    torch.manual_seed(0)
+    x = random_nats(16, 3)
+    y = random_nats(16, 3)
+    report = sparsify_with_report(plus_net, x, y, eps=1e-6)
+    assert report.removed_operators == 0
+    assert report.accuracy() == 1.0
+    # Everything except of the first level is removed with a large threshold
+    Sparsifier(eps=1e3, density=1.0).sparsify(plus_net)
+    for module in plus_net.modules():
+        if isinstance(module, TrainableLayer):
+            assert all(child is None for child in module.weights.children)
+
+
+def test_pruned_matrices_are_sparsified_again():
+    matrix = torch.tensor([[0.0, 2.0], [0.0, 0.0], [0.0, -1.0]])
+    operator = OperatorTree(SumTree(torch.ones(3, 1), [None]), [OperatorTree(SumTree(matrix, [None, None]), [])])
+    operator = Sparsifier().sparsify_operator(operator)
+    pruned = operator.children[0].tree.tensor
+    assert isinstance(pruned, PrunedMatrix)
+    assert torch.equal(pruned.dequantize(), matrix)
+    # Pruned matrices are compared by their elements
+    assert Sparsifier(eps=1.5).sparsify_operator(operator).children[0] is not None
+    assert Sparsifier(eps=5.0).sparsify_operator(operator).children[0] is None
+
+
+def test_quantized_weights_are_not_small(plus_net):
+    quantize(plus_net)
+    sparsifier = Sparsifier(eps=1e-6)
+    sparsifier.sparsify(plus_net)
+    assert sparsifier.report.removed_operators == 0
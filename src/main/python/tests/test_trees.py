@@ -0,0 +1,108 @@
+import pytest
+import torch
+
+from benchmarks.common import nat
+from runtime.discrete import decode, encode
+from runtime.trees import LazyChildren, SumTree, ProdTree, stack
+
+
+def _soft_bools():
+    # Probabilities of False and True in rows
+    return SumTree(torch.tensor([[0.8, 0.2], [0.4, 0.6], [0.5, 0.5]]), [None, None])
+
+
+def test_strict():
+    tree = _soft_bools()
+    assert torch.equal(tree.strict().tensor, torch.tensor([[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]))
+    # The original tree isn't modified
+    assert tree.tensor[0, 0].item() == pytest.approx(0.8)
+    with torch.no_grad():
+        assert tree.strict(in_place=True) is tree
+    assert torch.equal(tree.tensor, torch.tensor([[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]))
+    with pytest.raises(ValueError):
+        _soft_bools().strict(in_place=True)
+
+    values = [nat(0), nat(1), nat(0)]
+    strict = stack([encode(value) for value in values]).strict(strip=True)
+    assert decode(strict) == values
+    # S(S(...)) is absent in all rows
+    assert strict.children[1].children[0].children[1] is None
+
+    product = ProdTree(torch.tensor([[0.7], [0.3]]), [SumTree(torch.tensor([[0.9, 0.1], [0.2, 0.8]]), [None, None])])
+    assert torch.equal(product.strict().tensor, torch.tensor([[1.0], [0.0]]))
+
+
+def test_prune():
+    child = SumTree(torch.tensor([[0.6, 0.4], [0.5, 0.5]]), [None, None])
+    tree = SumTree(torch.tensor([[1.0, 0.0], [1e-4, 0.9999]]), [ProdTree(torch.ones(2, 1), [child]), None])
+    pruned = tree.prune()
+    # The second row of the operand isn't present in the tree
+    assert torch.equal(pruned.children[0].children[0].tensor, torch.tensor([[0.6, 0.4], [0.0, 0.0]]))
+    # Children absent in all rows are removed
+    absent = SumTree(torch.tensor([[1.0, 0.0]]), [None, ProdTree(torch.ones(1, 1), [child.select_rows([0])])])
+    assert absent.prune().children[1] is None
+
+
+def test_children_are_computed_on_access():
+    tree = stack([encode(nat(value)) for value in [0, 2]])
+    calls = []
+
+    def double(tensor):
+        calls.append(tensor.size())
+        return tensor * 2
+
+    doubled = tree.apply(double)
+    assert isinstance(doubled.children, LazyChildren)
+    assert len(calls) == 1
+    # Number and absence of children are known without computing them
+    assert len(doubled.children) == 2 and doubled.children.is_missing(0)
+    assert not doubled.children.is_forced(1)
+    child = doubled.children[1]
+    assert doubled.children[1] is child
+    assert len(calls) == 2
+    assert torch.equal(child.tensor, tree.children[1].tensor * 2)
+
+
+def test_force_computes_all_children():
+    tree = stack([encode(nat(value)) for value in [0, 2]])
+    factor = torch.tensor([[2.0], [1.0]])
+    doubled = (tree + tree).cmul(factor)
+    assert doubled.force() is doubled
+    nodes = [doubled]
+    while len(nodes) > 0:
+        node = nodes.pop()
+        assert not node._scales
+        if isinstance(node.children, LazyChildren):
+            assert all(node.children.is_forced(pos) for pos in range(len(node.children)))
+        nodes.extend(child for child in node.children if child is not None)
+    assert torch.equal(doubled.flatten(), (tree + tree).cmul(factor).flatten())
+
+
+def test_children_are_computed_in_their_gradient_mode():
+    weight = torch.ones(1, requires_grad=True)
+    tree = stack([encode(nat(value)) for value in [1, 2]])
+    with torch.no_grad():
+        scaled = tree.apply(lambda tensor: tensor * weight)
+    assert not scaled.children[1].tensor.requires_grad
+    scaled = tree.apply(lambda tensor: tensor * weight)
+    with torch.no_grad():
+        child = scaled.children[1]
+    assert child.tensor.requires_grad
+
+
+def test_factors_are_applied_on_read():
+    tree = _soft_bools()
+    factor = torch.tensor([[2.0], [3.0], [0.5]])
+    scaled = tree.cmul(factor).cmul(2)
+    # Nothing is multiplied until the tensor is read
+    assert scaled._tensor is tree.tensor
+    assert scaled.rows() == 3
+    assert torch.equal(scaled.tensor, tree.tensor * factor * 2)
+    assert scaled._scales == ()
+
+    weight = torch.tensor(2.0, requires_grad=True)
+    with torch.no_grad():
+        frozen = tree.cmul(weight)
+    assert not frozen.tensor.requires_grad
+    tree.cmul(weight).tensor.sum().backward()
+    assert weight.grad.item() == pytest.approx(tree.tensor.sum().item())
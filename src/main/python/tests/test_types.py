@@ -0,0 +1,31 @@
+import copy
+import pickle
+
+from runtime.modules.trainable import _weight_mask_entries
+from runtime.types import ExtSpec, LitSpec, ProdSpec, TypeSpec, VarSpec, substitute
+
+
+def test_equal_specifications_are_the_same_object():
+    n = TypeSpec([LitSpec(), ProdSpec([ExtSpec('N')])])
+    assert TypeSpec([LitSpec(), ProdSpec([ExtSpec('N')])]) is n
+    assert ExtSpec('Pair', a=ExtSpec('N'), b=VarSpec('b')) is ExtSpec('Pair', b=VarSpec('b'), a=ExtSpec('N'))
+    assert ExtSpec('Pair', a=ExtSpec('N')) is not ExtSpec('Pair', a=VarSpec('a'))
+    assert pickle.loads(pickle.dumps(n)) is n
+    assert copy.deepcopy(n) is n
+    assert {n: 1}[TypeSpec([LitSpec(), ProdSpec([ExtSpec('N')])])] == 1
+
+
+def test_substitute():
+    assert substitute(VarSpec('a'), {'a': VarSpec('b'), 'b': ExtSpec('N')}) is ExtSpec('N')
+    assert substitute(VarSpec('a'), {}) is VarSpec('a')
+    # Polymorphic instances bind variables to themselves
+    assert substitute(VarSpec('a'), {'a': VarSpec('a')}) is VarSpec('a')
+
+
+def test_weight_mask_entries_are_memoized():
+    from_type = ProdSpec([VarSpec('a'), ExtSpec('N')])
+    to_type = ProdSpec([ExtSpec('N'), VarSpec('a')])
+    entries, children = _weight_mask_entries({'a': VarSpec('a')}, from_type, to_type, 2, 2)
+    assert entries == ((0, 1), (1, 0))
+    assert children == ((False, True), (True, False))
+    assert _weight_mask_entries({'a': VarSpec('a')}, from_type, to_type, 2, 2)[0] is entries